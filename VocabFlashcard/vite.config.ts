@@ -12,6 +12,39 @@ export default defineConfig({
       configureServer(server) {
         server.middlewares.use(express.json());
 
+        // Answers are buffered per study session and forwarded to the
+        // backend's bulk review endpoint in batches
+        const REVIEW_BATCH_SIZE = 20;
+        const REVIEW_FLUSH_INTERVAL = 5000; // ms
+        const DUE_WORDS_LIMIT = 10; // Due word plus wrong options
+        const pendingReviews = new Map<string, object[]>();
+
+        const flushReviews = async (session_id: string) => {
+          const reviews = pendingReviews.get(session_id);
+          pendingReviews.delete(session_id);
+          if (!reviews || reviews.length === 0) return;
+          try {
+            await fetch(
+              `http://localhost:4999/api/study-sessions/${session_id}/reviews`,
+              {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ reviews }),
+              }
+            );
+          } catch (error) {
+            console.error(`error: Failed to flush reviews: ${error}`);
+          }
+        };
+        const flushAllReviews = () =>
+          Promise.all([...pendingReviews.keys()].map(flushReviews));
+
+        const flushTimer = setInterval(flushAllReviews, REVIEW_FLUSH_INTERVAL);
+        server.httpServer?.on("close", () => {
+          clearInterval(flushTimer);
+          flushAllReviews();
+        });
+
         // Add logging middleware
         server.middlewares.use(async (req, res, next) => {
           //const timestamp = new Date().toISOString();
@@ -25,8 +58,10 @@ export default defineConfig({
                   "http://localhost"
                 ).searchParams.get("group_id");
                 console.info(`info: Fetching words for group_id: ${group_id}`);
+                // Next due words only; one is asked, the others are used
+                // as wrong options
                 const response = await fetch(
-                  `http://localhost:4999/api/groups/${group_id}/words/raw`
+                  `http://localhost:4999/api/groups/${group_id}/due?limit=${DUE_WORDS_LIMIT}`
                 );
                 const vocabulary = await response.json();
                 const wordsArray = vocabulary.words;
@@ -41,23 +76,27 @@ export default defineConfig({
                     JSON.stringify({ error: "No words available" })
                   );
                 } else {
-                  const randomWord =
-                    wordsArray[Math.floor(Math.random() * wordsArray.length)];
+                  // Answers reach the scheduler in batches, so pick among
+                  // the due words rather than always asking the first one
+                  const dueWords = wordsArray.filter((w) => w.is_due);
+                  const candidates = dueWords.length ? dueWords : wordsArray;
+                  const dueWord =
+                    candidates[Math.floor(Math.random() * candidates.length)];
                   // Get three wrong Kanji options
                   const wrongKanjiOptions = wordsArray
-                    .filter((w) => w.kanji !== randomWord.kanji) // Exclude the correct one
+                    .filter((w) => w.kanji !== dueWord.kanji) // Exclude the correct one
                     .sort(() => Math.random() - 0.5) // Shuffle
                     .slice(0, 3) // Pick first 3 after shuffle
                     .map((w) => w.kanji); // Extract Kanji only
                   console.info(
-                    `info: Random word: ${JSON.stringify(randomWord)}`
+                    `info: Due word: ${JSON.stringify(dueWord)}`
                   );
                   console.info(
                     `info: kanji word: ${JSON.stringify(wrongKanjiOptions)}`
                   );
                   return res.end(
                     JSON.stringify({
-                      word: randomWord,
+                      word: dueWord,
                       wrongKanjiOptions: wrongKanjiOptions,
                     })
                   );
@@ -77,14 +116,16 @@ export default defineConfig({
                   body.answer.trim() === body.kanji.trim() ||
                   body.answer.trim() === body.romaji.trim();
                 console.info(`info: Correct value is: ${correct}`);
-                await fetch(
-                  `http://localhost:4999/api/study-sessions/${session_id}/review`,
-                  {
-                    method: "POST",
-                    headers: { "Content-Type": "application/json" },
-                    body: JSON.stringify({ word_id: body.word_id, correct }),
-                  }
-                );
+                const reviews = pendingReviews.get(session_id) ?? [];
+                reviews.push({
+                  word_id: body.word_id,
+                  correct,
+                  answered_at: new Date().toISOString(),
+                });
+                pendingReviews.set(session_id, reviews);
+                if (reviews.length >= REVIEW_BATCH_SIZE) {
+                  flushReviews(session_id);
+                }
 
                 return res.end(
                   JSON.stringify({
@@ -1,7 +1,14 @@
 from flask import Flask, g
-from flask_cors import CORS
 from config import Config, TestConfig, DevelopmentConfig
 from lib.db import Db
+from lib.cache import ResponseCache
+from lib.cors import OriginRegistry
+from lib.jobs import JobRunner
+from lib.membership import MembershipIndex
+from lib.profiler import QueryProfiler
+from lib.sessions import SessionSweeper
+from lib.snapshot import SnapshotReplica
+from lib.serialization import json_provider
 import logging
 from logging.handlers import RotatingFileHandler
 import os
@@ -12,53 +19,115 @@ import routes.groups
 import routes.study_sessions
 import routes.dashboard
 import routes.study_activities
+import routes.admin
+import routes.exports
+import routes.jobs
 
-def get_allowed_origins(app):
-    try:
-        cursor = app.db.cursor()
-        cursor.execute('SELECT url FROM study_activities')
-        urls = cursor.fetchall()
-        # Convert URLs to origins (e.g., https://example.com/app -> https://example.com)
-        origins = set()
-        for url in urls:
-            try:
-                from urllib.parse import urlparse
-                parsed = urlparse(url['url'])
-                origin = f"{parsed.scheme}://{parsed.netloc}"
-                origins.add(origin)
-            except:
-                continue
-        return list(origins) if origins else ["*"]
-    except:
-        return ["*"]  # Fallback to allow all origins if there's an error
-
-def create_app(test_config=None):
+def create_app(test_config=None, config_class=None):
     app = Flask(__name__)
 
-    if test_config is None:
+    if config_class is not None:
+        # Explicit configuration, e.g. ProductionConfig from wsgi.py
+        app.config.from_object(config_class)
+    elif test_config is None:
         # Use development config by default
         app.config.from_object(DevelopmentConfig)
     else:
         # Use test config for testing
         app.config.from_object(TestConfig)
     
+    app.json = json_provider(app.config['JSON_PROVIDER'])(app)
+
     # Setup logging
     setup_logging(app)
     
     # Initialize database using config
-    app.db = Db(database=app.config['DATABASE'])
+    app.db = Db(
+        database=app.config['DATABASE'],
+        pool_size=app.config['DB_POOL_SIZE'],
+        pool_timeout=app.config['DB_POOL_TIMEOUT'],
+        pragmas=app.config['DB_PRAGMAS']
+    )
     
+    if app.config['QUERY_PROFILING']:
+        app.db.profiler = QueryProfiler(slow_threshold_ms=app.config['SLOW_QUERY_THRESHOLD_MS'])
+        app.db.profiler.init_app(app)
+
+    app.cache = ResponseCache(
+        max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+        ttl=app.config['RESPONSE_CACHE_TTL'],
+        db=app.db
+    )
+
+    # Close idle study sessions in the background
+    if app.config['SESSION_SWEEP_INTERVAL'] > 0:
+        app.session_sweeper = SessionSweeper(
+            app.db,
+            interval=app.config['SESSION_SWEEP_INTERVAL'],
+            idle_minutes=app.config['SESSION_IDLE_TIMEOUT_MINUTES'],
+            on_sweep=lambda closed: app.cache.bump('study_sessions')
+        ).start()
+
     # Log database initialization
     app.logger.info(f"Database initialized: {app.config['DATABASE']}")
-      
-    # Single CORS configuration
-    CORS(app, resources={
-        r"/api/*": {
-            "origins": "*",
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
-        }
-    })
+
+    if app.config['AUTO_MIGRATE']:
+        applied = app.db.migrate()
+        if applied is None:
+            app.logger.warning("Database has no tables yet, skipping migrations (run `invoke init-db`)")
+        elif applied:
+            app.logger.info(f"Applied migrations: {', '.join(applied)}")
+
+    # Analytics routes read a periodic read-only copy of the database; the
+    # first copy is taken now so they use it from the first request
+    if app.config['DB_SNAPSHOT']:
+        database = app.config['DATABASE']
+        app.db.snapshot = SnapshotReplica(
+            app.db,
+            app.config['DB_SNAPSHOT_PATH'] or f"{os.path.splitext(database)[0]}.snapshot.db",
+            interval=app.config['DB_SNAPSHOT_INTERVAL'],
+            max_age=app.config['DB_SNAPSHOT_MAX_AGE'],
+            pool_size=app.config['DB_POOL_SIZE'],
+            pool_timeout=app.config['DB_POOL_TIMEOUT'],
+            pragmas=app.config['DB_PRAGMAS']
+        )
+        try:
+            app.db.snapshot.refresh()
+        except Exception as e:
+            app.logger.error(f"Initial database snapshot failed, analytics read the live database: {str(e)}")
+        app.db.snapshot.start()
+
+    # CORS for /api/*: configured origins plus the study activity origins,
+    # resolved once and applied by a single after_request hook
+    app.cors = OriginRegistry(
+        app.db,
+        app.cache,
+        static_origins=app.config['CORS_ORIGINS'],
+        ttl=app.config['CORS_ORIGINS_TTL'],
+        methods=app.config['CORS_METHODS'],
+        allow_headers=app.config['CORS_ALLOW_HEADERS'],
+        max_age=app.config['CORS_MAX_AGE']
+    )
+    app.cors.init_app(app)
+
+    # Group membership (words in a group, groups of a word, set queries)
+    # answered from memory instead of joins over word_groups
+    app.membership = MembershipIndex(app.db, app.cache, ttl=app.config['GROUP_MEMBERSHIP_TTL'])
+    app.membership.init_app(app)
+
+    # Maintenance jobs (history reset, group deletes, recounts) run here in
+    # small write transactions instead of inside the request
+    app.jobs = JobRunner(
+        app.db,
+        batch_size=app.config['JOB_BATCH_SIZE'],
+        pause=app.config['JOB_BATCH_PAUSE'],
+        poll_interval=app.config['JOB_POLL_INTERVAL'],
+        stale_after=app.config['JOB_STALE_AFTER'],
+        on_batch=lambda tables: app.cache.bump(*tables),
+        membership=app.membership
+    )
+    if app.config['JOB_WORKER']:
+        app.jobs.start()
 
     # Register database connection management
     app.teardown_appcontext(app.db.close)
@@ -70,8 +139,26 @@ def create_app(test_config=None):
     routes.dashboard.load(app)
     routes.study_activities.load(app)
     routes.vocabulary.load(app)
+    if app.config['ADMIN_ENDPOINTS']:
+        routes.admin.load(app)
+    routes.exports.load(app)
+    routes.jobs.load(app)
     return app
 
+def shutdown_app(app):
+    """Stop background work and close the database once requests are drained.
+
+    A running job stops after its current batch and is requeued. Closing the
+    pool waits for the writer lane, so a review batch that is still being
+    committed finishes before the connections go away.
+    """
+    app.jobs.stop()
+    sweeper = getattr(app, 'session_sweeper', None)
+    if sweeper is not None:
+        sweeper.stop()
+    app.db.close_all()
+    app.logger.info("Database connections closed")
+
 def setup_logging(app):
     # Create formatter
     formatter = logging.Formatter(app.config['LOG_FORMAT'])
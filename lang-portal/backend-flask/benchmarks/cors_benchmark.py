@@ -0,0 +1,109 @@
+"""Per-request CORS overhead: flask-cors (CORS() + @cross_origin) vs lib/cors.py.
+
+Usage: python benchmarks/cors_benchmark.py [--requests 2000] [--repeat 10]
+
+Each variant serves the same trivial /api route through the full WSGI stack
+with an Origin header; the overhead is the time per request minus the time
+of the same app without any CORS handling. flask-cors is no longer a
+dependency, its variant is skipped when it is not installed.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from lib.cache import ResponseCache
+from lib.cors import OriginRegistry
+from lib.db import Db
+
+ORIGIN = 'http://localhost:8080'
+METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
+HEADERS = ['Content-Type', 'Authorization']
+
+def bare_app(decorator=None):
+  app = Flask(__name__)
+  def view():
+    return jsonify({'ok': True})
+  if decorator:
+    view = decorator(view)
+  app.route('/api/ping')(view)
+  return app
+
+def without_cors(database):
+  return bare_app()
+
+def with_flask_cors(database):
+  """What app.py did: CORS() on /api/* plus @cross_origin() on every route"""
+  from flask_cors import CORS, cross_origin
+  app = bare_app(cross_origin())
+  CORS(app, resources={r"/api/*": {"origins": "*", "methods": METHODS, "allow_headers": HEADERS}})
+  return app
+
+def with_registry(database):
+  app = bare_app()
+  app.cors = OriginRegistry(
+    Db(database=database),
+    ResponseCache(),
+    static_origins=['http://localhost:5173'],
+    methods=METHODS,
+    allow_headers=HEADERS
+  )
+  app.cors.init_app(app)
+  return app
+
+def run_us(client, requests, preflight=False):
+  """Microseconds per request for one batch"""
+  headers = {'Origin': ORIGIN}
+  method = 'GET'
+  if preflight:
+    headers['Access-Control-Request-Method'] = 'POST'
+    method = 'OPTIONS'
+  start = time.perf_counter()
+  for _ in range(requests):
+    client.open('/api/ping', method=method, headers=headers)
+  return (time.perf_counter() - start) / requests * 1e6
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--requests', type=int, default=2000)
+  parser.add_argument('--repeat', type=int, default=10)
+  args = parser.parse_args()
+
+  variants = [('no CORS', without_cors), ('flask-cors', with_flask_cors), ('lib/cors.py', with_registry)]
+  try:
+    import flask_cors  # noqa: F401
+  except ImportError:
+    print('flask-cors is not installed, skipping its variant')
+    variants = [variant for variant in variants if variant[0] != 'flask-cors']
+
+  with tempfile.TemporaryDirectory() as directory:
+    database = os.path.join(directory, 'cors.db')
+    conn = sqlite3.connect(database)
+    conn.execute('CREATE TABLE study_activities (id INTEGER PRIMARY KEY, url TEXT)')
+    conn.executemany('INSERT INTO study_activities (url) VALUES (?)', [(f'http://localhost:{8080 + i}/app',) for i in range(20)])
+    conn.commit()
+    conn.close()
+
+    clients = [(name, build(database).test_client()) for name, build in variants]
+    # Variants are interleaved and the best batch kept, so machine noise
+    # hits every variant alike
+    best = {}
+    for _ in range(args.repeat):
+      for name, client in clients:
+        for preflight in (False, True):
+          elapsed = run_us(client, args.requests, preflight)
+          best[name, preflight] = min(best.get((name, preflight), elapsed), elapsed)
+
+    print(f"{'variant':<14}{'GET us':>10}{'overhead':>10}{'OPTIONS us':>12}{'overhead':>10}")
+    for name, _ in clients:
+      get, options = best[name, False], best[name, True]
+      print(f"{name:<14}{get:>10.1f}{get - best['no CORS', False]:>10.1f}"
+            f"{options:>12.1f}{options - best['no CORS', True]:>10.1f}")
+
+if __name__ == '__main__':
+  main()
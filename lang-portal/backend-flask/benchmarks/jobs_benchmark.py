@@ -0,0 +1,84 @@
+"""Request write latency while the study history is reset: one DELETE vs a job.
+
+Usage: python benchmarks/jobs_benchmark.py [--sessions 5000] [--reviews-per-session 100] [--batch-size 1000]
+
+A client thread keeps creating study sessions (a writer-lane request) while
+the history is reset, first with the old single-transaction DELETEs, then
+with the reset_study_history job on a copy of the same database. Reported:
+how long the reset took and the latency of the requests made meanwhile.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from load_test import InProcess, percentile, seed
+
+def measure(app, reset):
+  """Run `reset` while a client writes; returns (reset seconds, request latencies)"""
+  samples = []
+  done = threading.Event()
+
+  def client():
+    client = app.test_client()
+    while not done.is_set():
+      start = time.perf_counter()
+      client.post('/api/study-sessions', json={'group_id': 1, 'study_activity_id': 1})
+      samples.append((start, time.perf_counter() - start))
+      time.sleep(0.002)
+
+  thread = threading.Thread(target=client)
+  thread.start()
+  time.sleep(0.2)
+  started = time.perf_counter()
+  reset(app)
+  finished = time.perf_counter()
+  done.set()
+  thread.join()
+  # Every request that overlapped the reset, including one stuck behind it
+  return finished - started, sorted(elapsed for start, elapsed in samples if start < finished and start + elapsed > started)
+
+def single_delete(app):
+  with app.db.writer() as cursor:
+    cursor.execute('DELETE FROM word_review_items')
+    cursor.execute('DELETE FROM study_sessions')
+
+def reset_job(app):
+  response = app.test_client().post('/api/study-sessions/reset')
+  app.jobs.wait(response.get_json()['job']['id'], timeout=3600)
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--words', type=int, default=2000)
+  parser.add_argument('--groups', type=int, default=10)
+  parser.add_argument('--sessions', type=int, default=5000)
+  parser.add_argument('--reviews-per-session', type=int, default=100)
+  parser.add_argument('--batch-size', type=int, default=Config.JOB_BATCH_SIZE)
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as directory:
+    database = os.path.join(directory, 'jobs.db')
+    seed(database, directory, args, random.Random(1))
+    print(f"{args.sessions * args.reviews_per_session} reviews in {args.sessions} sessions")
+    print(f"{'reset':<16}{'seconds':>9}{'requests':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, reset in (('single DELETE', single_delete), ('job', reset_job)):
+      copy = os.path.join(directory, f'{name.replace(" ", "_")}.db')
+      shutil.copy(database, copy)
+      transport = InProcess(copy, cache=True)
+      transport.app.jobs.batch_size = args.batch_size
+      try:
+        seconds, latencies = measure(transport.app, reset)
+      finally:
+        transport.close()
+      print(f"{name:<16}{seconds:>9.2f}{len(latencies):>10}{percentile(latencies, 0.5) * 1000:>9.1f}"
+            f"{percentile(latencies, 0.99) * 1000:>9.1f}{latencies[-1] * 1000:>9.1f}")
+
+if __name__ == '__main__':
+  main()
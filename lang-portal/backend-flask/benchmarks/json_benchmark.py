@@ -0,0 +1,98 @@
+"""Serialization cost of /api/words pages: sqlite3.Row + stdlib vs row mapper + orjson.
+
+Usage: python benchmarks/json_benchmark.py [--sizes 50 500 5000] [--runs 50]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from lib.serialization import OrjsonProvider, row_mapper
+
+# Columns of the /api/words page query
+PAGE_SQL = '''
+  WITH RECURSIVE series(value) AS (
+    SELECT 1 UNION ALL SELECT value + 1 FROM series WHERE value < ?
+  )
+  SELECT
+    value as id,
+    '語' || value as kanji,
+    'go' || value as romaji,
+    'word ' || value as english,
+    value % 7 as correct_count,
+    value % 3 as wrong_count,
+    '2024-01-15 09:00:00' as last_reviewed,
+    '1::Core Verbs,2::Core Adjectives' as groups
+  FROM series
+'''
+
+FIELDS = ['id', 'kanji', 'romaji', 'english', 'correct_count', 'wrong_count', 'last_reviewed', 'groups']
+
+def word_data(word, correct_count, wrong_count):
+  return {
+    'id': word['id'],
+    'kanji': word['kanji'],
+    'romaji': word['romaji'],
+    'english': word['english'],
+    'stats': {
+      'correct_count': correct_count,
+      'wrong_count': wrong_count,
+      'accuracy': round(correct_count / (correct_count + wrong_count) * 100, 2)
+        if (correct_count + wrong_count) > 0 else 0,
+      'last_reviewed': word['last_reviewed']
+    },
+    'groups': [
+      {'id': int(group_id), 'name': name}
+      for group_id, name in (group.split('::') for group in word['groups'].split(','))
+    ]
+  }
+
+def by_name(rows):
+  """What the route did: dict(sqlite3.Row) and lookups by column name"""
+  words = []
+  for row in rows:
+    word = dict(row)
+    words.append(word_data(word, word.get('correct_count', 0), word.get('wrong_count', 0)))
+  return words
+
+def by_index(rows):
+  to_dict = row_mapper(rows[0].keys(), {field: field for field in FIELDS})
+  words = []
+  for row in rows:
+    word = to_dict(row)
+    words.append(word_data(word, word['correct_count'], word['wrong_count']))
+  return words
+
+def cpu_ms(fn, runs):
+  start = time.process_time()
+  for _ in range(runs):
+    fn()
+  return (time.process_time() - start) / runs * 1000
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000])
+  parser.add_argument('--runs', type=int, default=50)
+  args = parser.parse_args()
+
+  conn = sqlite3.connect(':memory:')
+  conn.row_factory = sqlite3.Row
+  app = Flask(__name__)
+  default = DefaultJSONProvider(app)
+  fast = OrjsonProvider(app)
+
+  print(f"{'rows':>6}  {'Row + stdlib':>14}  {'mapper + orjson':>16}  speedup")
+  with app.app_context():
+    for size in args.sizes:
+      rows = conn.execute(PAGE_SQL, (size,)).fetchall()
+      before = cpu_ms(lambda: default.response({'words': by_name(rows)}).get_data(), args.runs)
+      after = cpu_ms(lambda: fast.response({'words': by_index(rows)}).get_data(), args.runs)
+      print(f"{size:>6}  {before:>12.3f}ms  {after:>14.3f}ms  {before / after:>6.1f}x")
+
+if __name__ == '__main__':
+  main()
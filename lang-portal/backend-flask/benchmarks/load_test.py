@@ -0,0 +1,334 @@
+"""Load test for the lang-portal API.
+
+Seeds a synthetic database (words, groups, sessions and reviews), replays a
+weighted mix of read and write calls against create_app (in process, or a
+running server on the same database with --url) and reports throughput and
+p50/p95/p99 latency per endpoint. The database and the request sequence are
+derived from --seed, so two runs with the same options do the same work.
+Results can be saved as a baseline and later runs compared against it; the
+script exits non-zero when an endpoint's p95 regressed by more than
+--max-regression or an endpoint returned more errors than in the baseline.
+
+Usage:
+  python benchmarks/load_test.py [--words 20000] [--groups 20] [--sessions 2000]
+                                 [--reviews-per-session 20] [--requests 5000]
+                                 [--clients 8] [--seed 1] [--no-cache]
+                                 [--database FILE [--seed-only | --url URL]]
+                                 [--save FILE] [--baseline FILE] [--max-regression 0.25]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.db import Db
+from seed_benchmark import write_seed_files
+
+# --- Seeding -----------------------------------------------------------------
+
+def seed(database, directory, args, rng):
+  """Seed words/groups, then sessions with reviews spread over 60 days"""
+  db = Db(database=database)
+  db.init(word_seeds=write_seed_files(directory, args.words, args.groups))
+  now = datetime.utcnow()
+  with db.pool.writer() as conn:
+    group_words = load_group_words(conn)
+    activities = [row[0] for row in conn.execute('SELECT id FROM study_activities ORDER BY id')]
+
+    conn.execute('BEGIN IMMEDIATE')
+    reviews = []
+    for _ in range(args.sessions):
+      group_id = rng.choice(list(group_words))
+      started = now - timedelta(minutes=rng.randrange(60 * 24 * 60))
+      session_id = conn.execute(
+        'INSERT INTO study_sessions (group_id, study_activity_id, created_at) VALUES (?, ?, ?)',
+        (group_id, rng.choice(activities), started.strftime('%Y-%m-%d %H:%M:%S'))
+      ).lastrowid
+      for index in range(args.reviews_per_session):
+        reviews.append((
+          rng.choice(group_words[group_id]),
+          session_id,
+          rng.random() < 0.75,
+          (started + timedelta(seconds=10 * index)).strftime('%Y-%m-%d %H:%M:%S')
+        ))
+    conn.executemany(
+      'INSERT INTO word_review_items (word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?)',
+      reviews
+    )
+    conn.commit()
+  db.close_all()
+
+def load_group_words(conn):
+  group_words = {}
+  for group_id, word_id in conn.execute('SELECT group_id, word_id FROM word_groups ORDER BY group_id, word_id'):
+    group_words.setdefault(group_id, []).append(word_id)
+  return group_words
+
+def load_data(database, rng):
+  """Ids and search terms the request builders pick from"""
+  db = Db(database=database)
+  with db.pool.connection() as conn:
+    data = {
+      'group_words': load_group_words(conn),
+      'activities': [row[0] for row in conn.execute('SELECT id FROM study_activities ORDER BY id')],
+      'sessions': [row[0] for row in conn.execute('SELECT id FROM study_sessions ORDER BY id')],
+    }
+    romaji = [row[0] for row in conn.execute('SELECT romaji FROM words ORDER BY id')]
+  db.close_all()
+  data['romaji'] = rng.sample(romaji, min(200, len(romaji)))
+  return data
+
+# --- Request mix -------------------------------------------------------------
+
+def words_page(rng, data):
+  sort_by = rng.choice(['kanji', 'romaji', 'english', 'correct_count', 'wrong_count'])
+  return 'GET', f"/api/words?page={rng.randint(1, 20)}&sort_by={sort_by}&order={rng.choice(['asc', 'desc'])}", None
+
+def words_search(rng, data):
+  return 'GET', f"/api/words/search?q={rng.choice(data['romaji'])[:rng.randint(2, 5)]}", None
+
+def group_words(rng, data):
+  return 'GET', f"/api/groups/{rng.choice(list(data['group_words']))}/words?page={rng.randint(1, 3)}", None
+
+def group_due(rng, data):
+  return 'GET', f"/api/groups/{rng.choice(list(data['group_words']))}/due?limit=10", None
+
+def session_stats(rng, data):
+  return 'GET', f"/api/study-sessions/stats?range={rng.choice(['all', 'today', 'week', 'month'])}", None
+
+def session_detail(rng, data):
+  return 'GET', f"/api/study-sessions/{rng.choice(data['sessions'])}", None
+
+def create_session(rng, data):
+  body = {'group_id': rng.choice(list(data['group_words'])), 'study_activity_id': rng.choice(data['activities'])}
+  return 'POST', '/api/study-sessions', body
+
+def review_batch(rng, data):
+  session_id = rng.choice(data['sessions'])
+  words = [word for words in data['group_words'].values() for word in words[:50]]
+  return 'POST', f'/api/study-sessions/{session_id}/reviews', {'reviews': [
+    {'word_id': rng.choice(words), 'correct': rng.random() < 0.75} for _ in range(10)
+  ]}
+
+def close_session(rng, data):
+  return 'POST', f"/api/study-sessions/{rng.choice(data['sessions'])}/close", None
+
+# (endpoint, weight, request builder)
+MIX = [
+  ('GET /api/words', 15, words_page),
+  ('GET /api/words/search', 10, words_search),
+  ('GET /api/groups', 5, lambda rng, data: ('GET', '/api/groups', None)),
+  ('GET /api/groups/:id/words', 5, group_words),
+  ('GET /api/groups/:id/due', 10, group_due),
+  ('GET /api/dashboard/stats', 10, lambda rng, data: ('GET', '/api/dashboard/stats', None)),
+  ('GET /api/study-sessions', 5, lambda rng, data: ('GET', f'/api/study-sessions?page={rng.randint(1, 20)}', None)),
+  ('GET /api/study-sessions/:id', 5, session_detail),
+  ('GET /api/study-sessions/stats', 5, session_stats),
+  ('POST /api/study-sessions', 3, create_session),
+  ('POST /api/study-sessions/:id/reviews', 15, review_batch),
+  ('POST /api/study-sessions/:id/close', 2, close_session),
+]
+
+# --- Transports --------------------------------------------------------------
+
+class InProcess:
+  """Calls create_app through Flask test clients, one per thread"""
+
+  def __init__(self, database, cache, snapshot=False):
+    from app import create_app
+    from config import ProductionConfig
+
+    class LoadTestConfig(ProductionConfig):
+      DATABASE = database
+      SESSION_SWEEP_INTERVAL = 0
+      RESPONSE_CACHE_TTL = ProductionConfig.RESPONSE_CACHE_TTL if cache else 0
+      DB_SNAPSHOT = snapshot
+      # Slow-query warnings would drown the report; errors still show
+      LOG_LEVEL = 'ERROR'
+
+    self.app = create_app(config_class=LoadTestConfig)
+    self._local = threading.local()
+
+  def request(self, method, path, body):
+    client = getattr(self._local, 'client', None)
+    if client is None:
+      client = self._local.client = self.app.test_client()
+    return client.open(path, method=method, json=body).status_code
+
+  def close(self):
+    from app import shutdown_app
+    shutdown_app(self.app)
+
+class Http:
+  """Calls a running server over keep-alive connections, one per thread"""
+
+  def __init__(self, url):
+    parsed = urlparse(url)
+    self.host, self.port = parsed.hostname, parsed.port or 80
+    self._local = threading.local()
+
+  def request(self, method, path, body):
+    for attempt in range(2):
+      conn = getattr(self._local, 'conn', None)
+      if conn is None:
+        conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+      try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+      except (OSError, http.client.HTTPException):
+        # An idle keep-alive connection may have been closed; retry once
+        conn.close()
+        self._local.conn = None
+    return None
+
+  def close(self):
+    pass
+
+# --- Run and report ----------------------------------------------------------
+
+def percentile(values, fraction):
+  return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run(transport, data, args):
+  """Replay args.requests requests; request i is always built from seed + i"""
+  names = [name for name, _, _ in MIX]
+  weights = [weight for _, weight, _ in MIX]
+  builders = {name: builder for name, _, builder in MIX}
+  results = {name: {'latencies': [], 'errors': 0} for name in names}
+  lock = threading.Lock()
+  counter = iter(range(args.requests))
+
+  def client():
+    while True:
+      with lock:
+        index = next(counter, None)
+      if index is None:
+        return
+      rng = random.Random(args.seed * 1000003 + index)
+      name = rng.choices(names, weights)[0]
+      method, path, body = builders[name](rng, data)
+      start = time.perf_counter()
+      status = transport.request(method, path, body)
+      elapsed = time.perf_counter() - start
+      with lock:
+        results[name]['latencies'].append(elapsed)
+        if status is None or status >= 400:
+          results[name]['errors'] += 1
+
+  started = time.perf_counter()
+  threads = [threading.Thread(target=client) for _ in range(args.clients)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  wall = time.perf_counter() - started
+
+  report = {'wall_seconds': wall, 'requests': args.requests, 'rps': args.requests / wall, 'endpoints': {}}
+  for name, result in results.items():
+    latencies = sorted(result['latencies'])
+    if not latencies:
+      continue
+    report['endpoints'][name] = {
+      'count': len(latencies),
+      'errors': result['errors'],
+      'rps': len(latencies) / wall,
+      'p50_ms': percentile(latencies, 0.50) * 1000,
+      'p95_ms': percentile(latencies, 0.95) * 1000,
+      'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+  return report
+
+def print_report(report, baseline=None):
+  print(f"{'endpoint':<40}{'count':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        + (f"{'p95 vs base':>13}" if baseline else ''))
+  for name, stats in report['endpoints'].items():
+    line = (f"{name:<40}{stats['count']:>7}{stats['errors']:>5}{stats['rps']:>9.1f}"
+            f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+    base = (baseline or {}).get('endpoints', {}).get(name)
+    if base:
+      line += f"{(stats['p95_ms'] / base['p95_ms'] - 1) * 100:>+12.0f}%"
+    print(line)
+  print(f"total: {report['requests']} requests in {report['wall_seconds']:.2f}s ({report['rps']:.1f} req/s)")
+
+def regressions(report, baseline, max_regression):
+  """Endpoints whose p95 grew by more than max_regression, or that started failing"""
+  failed = []
+  for name, stats in report['endpoints'].items():
+    base = baseline['endpoints'].get(name)
+    if base is None:
+      continue
+    if stats['p95_ms'] > base['p95_ms'] * (1 + max_regression):
+      failed.append(f"{name}: p95 {base['p95_ms']:.2f}ms -> {stats['p95_ms']:.2f}ms")
+    if stats['errors'] > base['errors']:
+      failed.append(f"{name}: errors {base['errors']} -> {stats['errors']}")
+  return failed
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--words', type=int, default=20000)
+  parser.add_argument('--groups', type=int, default=20)
+  parser.add_argument('--sessions', type=int, default=2000)
+  parser.add_argument('--reviews-per-session', type=int, default=20)
+  parser.add_argument('--requests', type=int, default=5000)
+  parser.add_argument('--clients', type=int, default=8)
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--no-cache', action='store_true', help='disable the response cache (in process only)')
+  parser.add_argument('--snapshot', action='store_true', help='serve the analytics routes from the database snapshot (in process only)')
+  parser.add_argument('--database', help='seed this file (replacing it) and keep it, instead of a temporary one')
+  parser.add_argument('--seed-only', action='store_true', help='seed --database and exit')
+  parser.add_argument('--url', help='load a running server on --database (already seeded) instead of create_app')
+  parser.add_argument('--save', help='write the report to this JSON file')
+  parser.add_argument('--baseline', help='compare with a report saved by --save')
+  parser.add_argument('--max-regression', type=float, default=0.25)
+  args = parser.parse_args()
+  if (args.url or args.seed_only) and not args.database:
+    parser.error('--url and --seed-only need --database')
+
+  with tempfile.TemporaryDirectory() as directory:
+    database = args.database or os.path.join(directory, 'load_test.db')
+    if not args.url:
+      for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(database + suffix):
+          os.remove(database + suffix)
+      start = time.perf_counter()
+      seed(database, directory, args, random.Random(args.seed))
+      print(f"seeded {args.words} words, {args.groups} groups, {args.sessions} sessions, "
+            f"{args.sessions * args.reviews_per_session} reviews in {time.perf_counter() - start:.1f}s")
+      if args.seed_only:
+        return
+    data = load_data(database, random.Random(args.seed))
+    transport = Http(args.url) if args.url else InProcess(database, cache=not args.no_cache, snapshot=args.snapshot)
+    try:
+      report = run(transport, data, args)
+    finally:
+      transport.close()
+
+  baseline = None
+  if args.baseline:
+    with open(args.baseline) as file:
+      baseline = json.load(file)
+  print_report(report, baseline)
+  if args.save:
+    with open(args.save, 'w') as file:
+      json.dump(report, file, indent=2)
+  if baseline:
+    failed = regressions(report, baseline, args.max_regression)
+    for failure in failed:
+      print(f"REGRESSION {failure}")
+    if failed:
+      sys.exit(1)
+
+if __name__ == '__main__':
+  main()
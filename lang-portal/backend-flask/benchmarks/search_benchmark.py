@@ -0,0 +1,91 @@
+"""Time /api/words/search lookups against a synthetic 200k-word table.
+
+Usage: python benchmarks/search_benchmark.py [--words 200000] [--runs 200]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.db import Db
+from lib.search import match_query
+
+SYLLABLES = ['ka', 'ki', 'ku', 'ke', 'ko', 'sa', 'shi', 'su', 'ta', 'chi', 'na', 'ni', 'ha', 'ma', 'mi', 'ra', 'ri', 'yo']
+KANA = 'かきくけこさしすたちなにはまみらりよ'
+KANJI = '日月火水木金土山川田人口目耳手足力気天雨'
+ENGLISH = ['water', 'mountain', 'river', 'person', 'sky', 'rain', 'tree', 'fire', 'gold', 'hand',
+           'day', 'month', 'eye', 'ear', 'field', 'power', 'spirit', 'mouth', 'earth', 'foot']
+
+# Same statement as the route
+SEARCH_SQL = '''
+  SELECT w.id, w.kanji, w.romaji, w.english, words_fts.rank as rank
+  FROM words_fts
+  JOIN words w ON w.id = words_fts.rowid
+  WHERE words_fts MATCH ?
+  ORDER BY words_fts.rank, w.id
+  LIMIT ? OFFSET ?
+'''
+
+def synthetic_words(count, rng):
+  words = []
+  for i in range(count):
+    syllables = rng.randint(2, 4)
+    picks = [rng.randrange(len(SYLLABLES)) for _ in range(syllables)]
+    words.append({
+      'kanji': ''.join(rng.choice(KANJI) for _ in range(2)) + ''.join(KANA[p] for p in picks[:2]) + str(i),
+      'romaji': ''.join(SYLLABLES[p] for p in picks) + str(i),
+      'english': f'{rng.choice(ENGLISH)} {rng.choice(ENGLISH)} {i}',
+      'parts': []
+    })
+  return words
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--words', type=int, default=200000)
+  parser.add_argument('--runs', type=int, default=200)
+  args = parser.parse_args()
+  rng = random.Random(42)
+
+  with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, 'words.json')
+    words = synthetic_words(args.words, rng)
+    with open(path, 'w', encoding='utf-8') as file:
+      json.dump(words, file)
+    db = Db(database=os.path.join(directory, 'benchmark.db'))
+    start = time.perf_counter()
+    db.init(word_seeds=[('Benchmark', path)])
+    print(f"setup:    {args.words} words seeded and indexed in {time.perf_counter() - start:.2f}s")
+
+    # Lookups the way a search box sends them: a whole word, the first few
+    # characters of one, kana typed in the other script, and two terms
+    queries = {
+      'exact romaji': lambda: rng.choice(words)['romaji'],
+      'romaji prefix': lambda: rng.choice(words)['romaji'][:5],
+      'kanji prefix': lambda: rng.choice(words)['kanji'][:3],
+      'katakana': lambda: ''.join(chr(ord(c) + 0x60) if 'ぁ' <= c <= 'ゖ' else c
+                                  for c in rng.choice(words)['kanji'][:4]),
+      'two terms': lambda: ' '.join(rng.choice(words)['english'].split()[::2]),
+    }
+    with db.pool.connection() as conn:
+      for name, make_query in queries.items():
+        timings = []
+        rows = 0
+        for _ in range(args.runs):
+          match = match_query(make_query())
+          start = time.perf_counter()
+          rows += len(conn.execute(SEARCH_SQL, (match, 21, 0)).fetchall())
+          timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"{name + ':':<16}p50 {statistics.median(timings):.3f}ms  "
+              f"p99 {timings[int(len(timings) * 0.99) - 1]:.3f}ms  "
+              f"({rows / args.runs:.1f} rows/query)")
+    db.close_all()
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,55 @@
+"""Seed a throwaway database with synthetic words and report the load rate.
+
+Usage: python benchmarks/seed_benchmark.py [--words 100000] [--groups 10]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.db import Db
+
+def write_seed_files(directory, words, groups):
+  per_group = -(-words // groups)
+  seeds = []
+  for group in range(groups):
+    path = os.path.join(directory, f'group_{group}.json')
+    start = group * per_group
+    with open(path, 'w', encoding='utf-8') as file:
+      json.dump([
+        {
+          'kanji': f'語{i}',
+          'romaji': f'go{i}',
+          'english': f'word {i}',
+          'parts': [{'kanji': '語', 'romaji': ['go']}]
+        }
+        for i in range(start, min(start + per_group, words))
+      ], file)
+    seeds.append((f'Group {group}', path))
+  return seeds
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--words', type=int, default=100000)
+  parser.add_argument('--groups', type=int, default=10)
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as directory:
+    seeds = write_seed_files(directory, args.words, args.groups)
+    db = Db(database=os.path.join(directory, 'benchmark.db'))
+    start = time.perf_counter()
+    report = db.init(word_seeds=seeds)
+    total = time.perf_counter() - start
+    db.close_all()
+
+  print(f"seed:     {report['words']} words, {report['word_groups']} links "
+        f"in {report['seconds']:.2f}s ({report['rows_per_sec']:,.0f} rows/sec)")
+  print(f"migrate:  {total - report['seconds']:.2f}s (indexes, triggers, rollup backfill)")
+  print(f"total:    {total:.2f}s")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,67 @@
+"""Compare the old and the fragment-splicing encoding of a word list.
+
+Usage: python benchmarks/serialization_benchmark.py [--words 1000] [--runs 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from lib.serialization import array, compact, splice
+
+def synthetic_rows(count):
+  return [{
+    'id': i,
+    'kanji': f'語{i}',
+    'romaji': f'go{i}',
+    'english': f'word {i}',
+    'parts': compact([{'kanji': '語', 'romaji': ['go']}, {'kanji': str(i), 'romaji': [str(i)]}]),
+    'correct_count': i % 7,
+    'wrong_count': i % 3,
+  } for i in range(count)]
+
+def parse_and_jsonify(rows):
+  """What the list endpoints did: json.loads every parts column, then jsonify"""
+  return jsonify({'words': [{
+    'id': row['id'],
+    'kanji': row['kanji'],
+    'romaji': row['romaji'],
+    'english': row['english'],
+    'parts': json.loads(row['parts']),
+    'stats': {'correct_count': row['correct_count'], 'wrong_count': row['wrong_count']}
+  } for row in rows]}).get_data()
+
+def spliced(rows):
+  return splice({}, words=array([splice({
+    'id': row['id'],
+    'kanji': row['kanji'],
+    'romaji': row['romaji'],
+    'english': row['english'],
+    'stats': {'correct_count': row['correct_count'], 'wrong_count': row['wrong_count']}
+  }, parts=row['parts']) for row in rows]))
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--words', type=int, default=1000)
+  parser.add_argument('--runs', type=int, default=200)
+  args = parser.parse_args()
+
+  rows = synthetic_rows(args.words)
+  app = Flask(__name__)
+  with app.app_context():
+    assert json.loads(parse_and_jsonify(rows)) == json.loads(spliced(rows))
+    results = {}
+    for name, encode in (('json.loads + jsonify', parse_and_jsonify), ('spliced fragments', spliced)):
+      start = time.process_time()
+      for _ in range(args.runs):
+        encode(rows)
+      results[name] = (time.process_time() - start) / args.runs * 1000
+      print(f"{name + ':':<22}{results[name]:.3f}ms CPU per {args.words}-word response")
+  print(f"speedup:              {results['json.loads + jsonify'] / results['spliced fragments']:.1f}x")
+
+if __name__ == '__main__':
+  main()
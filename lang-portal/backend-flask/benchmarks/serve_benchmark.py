@@ -0,0 +1,144 @@
+"""Throughput of the development server vs gunicorn on the same database.
+
+Usage: python benchmarks/serve_benchmark.py [--clients 16] [--seconds 10] [--workers N]
+
+Both servers run the same app against a throwaway seeded database and get
+the same read-heavy request mix, with one review batch every tenth request.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lib.db import Db
+
+READS = [
+  '/api/words?page=1',
+  '/api/groups',
+  '/api/groups/1/words/raw',
+  '/api/groups/1/due?limit=10',
+  '/api/study-sessions/stats',
+  '/api/dashboard/stats',
+]
+
+DEV_SERVER = '''
+import os
+from config import Config
+Config.DATABASE = os.environ['BENCHMARK_DATABASE']
+from app import create_app
+create_app().run(debug=True, use_reloader=False, port=int(os.environ['BENCHMARK_PORT']))
+'''
+
+def production_app():
+  """gunicorn target: the wsgi.py app on the benchmark database"""
+  from config import Config, ProductionConfig
+  Config.DATABASE = os.environ['BENCHMARK_DATABASE']
+  from app import create_app
+  return create_app(config_class=ProductionConfig)
+
+def wait_until_up(port, timeout=30):
+  deadline = time.monotonic() + timeout
+  while time.monotonic() < deadline:
+    try:
+      conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+      conn.request('GET', '/api/groups')
+      conn.getresponse().read()
+      return
+    except OSError:
+      time.sleep(0.2)
+  raise RuntimeError(f'Server on port {port} did not come up')
+
+def load(port, clients, seconds, session_id):
+  """Run `clients` keep-alive clients for `seconds`, return (requests, errors, latencies)"""
+  latencies = []
+  errors = [0]
+  lock = threading.Lock()
+  stop = time.monotonic() + seconds
+  reviews = json.dumps({'reviews': [{'word_id': 1, 'correct': True}] * 5})
+
+  def client(index):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    local = []
+    count = index
+    while time.monotonic() < stop:
+      count += 1
+      start = time.perf_counter()
+      try:
+        if count % 10 == 0:
+          conn.request('POST', f'/api/study-sessions/{session_id}/reviews', reviews,
+                       {'Content-Type': 'application/json'})
+        else:
+          conn.request('GET', READS[count % len(READS)])
+        response = conn.getresponse()
+        response.read()
+        if response.status >= 400:
+          with lock:
+            errors[0] += 1
+      except (OSError, http.client.HTTPException):
+        with lock:
+          errors[0] += 1
+        conn.close()
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+      local.append(time.perf_counter() - start)
+    with lock:
+      latencies.extend(local)
+
+  threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return len(latencies), errors[0], sorted(latencies)
+
+def run(name, command, env, port, args):
+  process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+  try:
+    wait_until_up(port)
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('POST', '/api/study-sessions', json.dumps({'group_id': 1, 'study_activity_id': 1}),
+                 {'Content-Type': 'application/json'})
+    session_id = json.loads(conn.getresponse().read())['session']['id']
+    requests, errors, latencies = load(port, args.clients, args.seconds, session_id)
+  finally:
+    process.terminate()
+    process.wait(timeout=60)
+  print(f"{name + ':':<12}{requests / args.seconds:>8.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:>7.1f}ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:>7.1f}ms  "
+        f"errors {errors}")
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--clients', type=int, default=16)
+  parser.add_argument('--seconds', type=int, default=10)
+  parser.add_argument('--workers', type=int, default=None, help='gunicorn workers (default: gunicorn.conf.py)')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as directory:
+    database = os.path.join(directory, 'benchmark.db')
+    db = Db(database=database)
+    db.init()
+    db.close_all()
+
+    env = dict(os.environ, BENCHMARK_DATABASE=database, BENCHMARK_PORT='5101', PYTHONPATH=ROOT)
+    run('dev server', [sys.executable, '-c', DEV_SERVER], env, 5101, args)
+
+    if args.workers:
+      env['GUNICORN_WORKERS'] = str(args.workers)
+    env['GUNICORN_BIND'] = '127.0.0.1:5102'
+    env['GUNICORN_LOG_LEVEL'] = 'warning'
+    env['GUNICORN_ACCESS_LOG'] = ''
+    run('gunicorn', [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                     '--pythonpath', 'benchmarks', 'serve_benchmark:production_app()'], env, 5102, args)
+
+if __name__ == '__main__':
+  main()
@@ -16,6 +16,77 @@ class Config:
     DATABASE = os.path.join(BASE_DIR, 'JapaneseDB.db')
     TESTING = False
 
+    # Connection pool configuration
+    DB_POOL_SIZE = 8  # Max pooled reader connections per process
+    DB_POOL_TIMEOUT = 20  # Seconds to wait for a free connection
+    DB_PRAGMAS = {
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -16000,  # Negative value = KiB
+    }
+
+    # Snapshot mode (see lib/snapshot.py): the analytics routes read a copy of
+    # the database made every DB_SNAPSHOT_INTERVAL seconds with the backup
+    # API, and the live database when the copy is older than DB_SNAPSHOT_MAX_AGE
+    DB_SNAPSHOT = False
+    DB_SNAPSHOT_PATH = None  # Defaults to <DATABASE>.snapshot.db next to the database
+    DB_SNAPSHOT_INTERVAL = 30  # Seconds between copies
+    DB_SNAPSHOT_MAX_AGE = 120  # Seconds of staleness the analytics routes accept
+
+    # Apply pending sql/migrations on startup (already applied versions are skipped)
+    AUTO_MIGRATE = True
+
+    # Max age (seconds) of the time-windowed dashboard values (active groups, streak)
+    DASHBOARD_WINDOW_MAX_AGE = 60
+
+    # In-process cache for read endpoints (see lib/cache.py); 0 disables it
+    RESPONSE_CACHE_MAX_ENTRIES = 512
+    RESPONSE_CACHE_TTL = 30  # Seconds, bounds staleness for tables without generation triggers
+
+    # /api/admin/* (routes/admin.py): pool, cache, profiler, snapshot and
+    # index stats plus a few maintenance actions. They have no auth, so
+    # ProductionConfig leaves them out
+    ADMIN_ENDPOINTS = True
+
+    # Per-request query profiling (see lib/profiler.py, GET /api/admin/queries)
+    QUERY_PROFILING = True
+    SLOW_QUERY_THRESHOLD_MS = 100  # Statements slower than this get EXPLAIN QUERY PLAN logged
+
+    # Study sessions without reviews for this long are closed by the sweeper
+    SESSION_IDLE_TIMEOUT_MINUTES = 30
+    SESSION_SWEEP_INTERVAL = 300  # Seconds between sweeps, 0 disables the sweeper
+
+    # Max number of reviews accepted by POST /api/study-sessions/:id/reviews
+    REVIEW_BATCH_MAX_ITEMS = 1000
+
+    # JSON encoder behind jsonify(): 'orjson' (falls back to 'default' when
+    # orjson is not installed) or Flask's 'default' stdlib provider
+    JSON_PROVIDER = 'orjson'
+
+    # Rows fetched per round trip by the streaming exports
+    EXPORT_FETCH_SIZE = 500
+
+    # Background jobs (see lib/jobs.py): rows per write transaction and the
+    # pause between transactions, during which request writes get the lane
+    JOB_BATCH_SIZE = 1000
+    JOB_BATCH_PAUSE = 0.01  # Seconds
+    JOB_POLL_INTERVAL = 1  # Seconds between checks for queued or stale jobs
+    JOB_STALE_AFTER = 60  # Seconds without a heartbeat before a running job is taken over
+    JOB_WORKER = True  # Start the runner at startup; it also starts on the first submit
+
+    # In-memory word <-> group index (see lib/membership.py), rebuilt when the
+    # groups or word_groups cache generation changes, or after this many
+    # seconds for changes made outside the app
+    GROUP_MEMBERSHIP_TTL = 300
+
+    # Browser origins allowed to call /api/* (see lib/cors.py). The origins of
+    # the study_activities urls are added to these; every origin is allowed
+    # when both are empty
+    CORS_ORIGINS = ['http://localhost:5173', 'http://127.0.0.1:5173']
+    CORS_ORIGINS_TTL = 60  # Seconds before the activity origins are re-read
+    CORS_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
+    CORS_ALLOW_HEADERS = ['Content-Type', 'Authorization']
+    CORS_MAX_AGE = 600  # Seconds browsers may cache a preflight response
+
     # Logging configuration
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     LOG_FILE = os.path.join(LOGS_DIR, f'app.log')
@@ -34,6 +105,9 @@ def configure_logging(app):
 
 class TestConfig(Config):
     TESTING = True
+    AUTO_MIGRATE = False
+    SESSION_SWEEP_INTERVAL = 0
+    JOB_WORKER = False
     DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 
                            'instance', 'test_JapaneseDB.db')
 
@@ -51,4 +125,9 @@ class TestConfig(Config):
 
 class DevelopmentConfig(Config):
     DEBUG = True
-    LOG_LEVEL = 'DEBUG'
\ No newline at end of file
+    LOG_LEVEL = 'DEBUG'
+
+class ProductionConfig(Config):
+    DEBUG = False
+    LOG_LEVEL = 'INFO'
+    ADMIN_ENDPOINTS = False
@@ -0,0 +1,46 @@
+# Gunicorn settings for `gunicorn -c gunicorn.conf.py wsgi:app`.
+# Any of them can be overridden from the environment (GUNICORN_* below) or
+# on the command line.
+import multiprocessing
+import os
+
+from config import Config
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:4999')
+
+# SQLite takes one writer at a time across processes, so a few processes
+# with threads go further than many single-threaded ones. Each thread can
+# hold one pooled connection, hence threads = DB_POOL_SIZE. The caches of
+# every worker follow writes made by the others through the table
+# generations kept in SQLite (lib/cache.py). The per-worker session
+# sweepers and job runners coordinate through the database, and snapshot
+# copies are written to a temp file and renamed into place.
+workers = int(os.environ.get('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2, 4)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', Config.DB_POOL_SIZE))
+
+# Build the app (and its pool) in each worker, never in the master
+preload_app = False
+
+timeout = 60
+keepalive = 5
+
+# On SIGTERM/SIGHUP workers stop accepting connections and get this long to
+# finish in-flight requests before they are killed
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers now and then to cap memory growth
+max_requests = 5000
+max_requests_jitter = 500
+
+# GUNICORN_ACCESS_LOG= (empty) turns the access log off
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+def worker_exit(server, worker):
+  """Runs in the worker after its last request: stop the sweeper, close the pool"""
+  from app import shutdown_app
+  app = getattr(worker, 'wsgi', None)
+  if app is not None and hasattr(app, 'db'):
+    shutdown_app(app)
@@ -0,0 +1,153 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from flask import Response, current_app, request
+
+# In-process response cache for read endpoints.
+#
+# Entries are keyed by path + query args and remember the generation of
+# every table the view reads, so an entry is dropped as soon as any of its
+# tables changes. A table's generation is the sum of two counters:
+#
+# - table_generations in the database (migration 0015), bumped by triggers
+#   in the writing transaction, so writes made by other worker processes,
+#   jobs and invoke tasks are seen on the next read;
+# - an in-process counter bumped by cache.bump('groups'), for writes the
+#   triggers do not track (the database is not migrated yet, tests writing
+#   around the routes).
+#
+# The TTL is a backstop for tables without triggers.
+
+CacheEntry = namedtuple('CacheEntry', ['body', 'mimetype', 'etag', 'generations', 'expires'])
+
+class ResponseCache:
+  def __init__(self, max_entries=512, ttl=30, db=None):
+    self.db = db  # lib.db.Db holding table_generations, None for in-process generations only
+    self.max_entries = max_entries
+    self.ttl = ttl
+    self._entries = OrderedDict()
+    self._generations = {}
+    self._lock = threading.Lock()
+    self._stats = {
+      'hits': 0,
+      'misses': 0,
+      'invalidations': 0,
+      'evictions': 0,
+      'not_modified': 0,
+    }
+
+  @property
+  def enabled(self):
+    return self.max_entries > 0 and self.ttl > 0
+
+  def shared_generations(self, cursor=None):
+    """table -> generation from table_generations, read on `cursor` (inside a
+    write transaction) or else on the request's connection"""
+    if self.db is None:
+      return {}
+    try:
+      if cursor is not None:
+        return dict(cursor.execute('SELECT name, generation FROM table_generations').fetchall())
+      with self.db.reader() as conn:
+        return dict(conn.execute('SELECT name, generation FROM table_generations').fetchall())
+    except sqlite3.OperationalError:
+      return {}  # Not migrated yet
+
+  def generations(self, tables, shared=None):
+    """Generation of each of `tables`; `shared` is a shared_generations() result already read"""
+    if shared is None:
+      shared = self.shared_generations()
+    with self._lock:
+      return tuple(shared.get(table, 0) + self._generations.get(table, 0) for table in tables)
+
+  def bump(self, *tables):
+    """Invalidate this process's entries that depend on one of `tables`"""
+    with self._lock:
+      for table in tables:
+        self._generations[table] = self._generations.get(table, 0) + 1
+
+  def get(self, key, generations):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and (entry.generations != generations or entry.expires < time.monotonic()):
+        del self._entries[key]
+        self._stats['invalidations'] += 1
+        entry = None
+      if entry is None:
+        self._stats['misses'] += 1
+        return None
+      self._entries.move_to_end(key)
+      self._stats['hits'] += 1
+      return entry
+
+  def set(self, key, entry):
+    with self._lock:
+      self._entries[key] = entry
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+        self._stats['evictions'] += 1
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def stats(self):
+    shared = self.shared_generations()
+    with self._lock:
+      stats = dict(self._stats)
+      stats.update({
+        'size': len(self._entries),
+        'max_entries': self.max_entries,
+        'ttl': self.ttl,
+        'generations': {table: shared.get(table, 0) + self._generations.get(table, 0)
+                        for table in shared.keys() | self._generations.keys()},
+      })
+    return stats
+
+  def cached(self, *tables):
+    """Cache successful GET responses of a view that reads `tables`"""
+    def decorator(view):
+      @wraps(view)
+      def wrapper(*args, **kwargs):
+        if not self.enabled or request.method != 'GET':
+          return view(*args, **kwargs)
+
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        # Snapshot before rendering so a write that lands meanwhile makes
+        # the stored entry stale instead of hiding the change
+        generations = self.generations(tables)
+        entry = self.get(key, generations)
+        cache_status = 'HIT'
+        if entry is None:
+          response = current_app.make_response(view(*args, **kwargs))
+          if response.status_code != 200:
+            return response
+          body = response.get_data()
+          entry = CacheEntry(
+            body=body,
+            mimetype=response.mimetype,
+            etag=hashlib.sha1(body).hexdigest(),
+            generations=generations,
+            expires=time.monotonic() + self.ttl
+          )
+          self.set(key, entry)
+          cache_status = 'MISS'
+        return self.respond(entry, cache_status)
+      return wrapper
+    return decorator
+
+  def respond(self, entry, cache_status):
+    response = Response(entry.body, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    # Let clients keep their copy but always revalidate it with If-None-Match
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Cache'] = cache_status
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+      with self._lock:
+        self._stats['not_modified'] += 1
+    return response
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+from flask import request
+
+# CORS for /api/*, applied once per response by an after_request hook.
+#
+# The allowed origins are the configured CORS_ORIGINS plus the origin of
+# every study activity url (the activity apps call the API from the
+# browser). They are resolved once into a frozenset, so a request only
+# pays for a set lookup. The set is rebuilt when the 'study_activities'
+# cache generation moves, which the table_generations triggers do for
+# writes made by any process (lib/cache.py), or after `ttl` seconds. When
+# no origin is known at all every origin is allowed, as before.
+
+WILDCARD = '*'
+
+def origin_of(url):
+  """'https://example.com/app?x=1' -> 'https://example.com', None if not absolute"""
+  try:
+    parsed = urlparse(url.strip())
+  except (AttributeError, ValueError):
+    return None
+  if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+    return None
+  return f'{parsed.scheme}://{parsed.netloc}'.lower()
+
+class OriginRegistry:
+  def __init__(self, db, cache, static_origins=(), ttl=60, methods=(), allow_headers=(), max_age=600):
+    self.db = db
+    self.cache = cache
+    self.static_origins = frozenset(filter(None, (origin_of(origin) for origin in static_origins)))
+    self.ttl = ttl
+    self.preflight_headers = {
+      'Access-Control-Allow-Methods': ', '.join(methods),
+      'Access-Control-Allow-Headers': ', '.join(allow_headers),
+      'Access-Control-Max-Age': str(max_age),
+    }
+    self._origins = None
+    self._generation = None
+    self._expires = 0.0
+    self._lock = threading.Lock()
+    self._stats = {'refreshes': 0, 'refresh_errors': 0, 'allowed': 0, 'rejected': 0}
+    self.logger = logging.getLogger(__name__)
+
+  def init_app(self, app):
+    self.logger = app.logger
+    self.refresh()
+    app.after_request(self.apply)
+
+  def load(self):
+    """Origins of the study activity urls"""
+    with self.db.reader() as conn:
+      rows = conn.execute('SELECT url FROM study_activities').fetchall()
+    return frozenset(filter(None, (origin_of(row[0] or '') for row in rows)))
+
+  def refresh(self):
+    generation = self.cache.generations(('study_activities',))
+    try:
+      origins = self.static_origins | self.load()
+    except Exception as e:
+      # No database (yet): keep the last good set, or the static origins
+      with self._lock:
+        self._stats['refresh_errors'] += 1
+      self.logger.warning(f"Could not load study activity origins: {str(e)}")
+      origins = self._origins if self._origins is not None else self.static_origins
+    with self._lock:
+      self._origins = origins or frozenset([WILDCARD])
+      self._generation = generation
+      self._expires = time.monotonic() + self.ttl
+      self._stats['refreshes'] += 1
+    return self._origins
+
+  def origins(self):
+    if self._generation != self.cache.generations(('study_activities',)) or self._expires < time.monotonic():
+      return self.refresh()
+    return self._origins
+
+  def allowed_origin(self, origin):
+    """Value for Access-Control-Allow-Origin, None if `origin` is not allowed"""
+    origins = self.origins()
+    if WILDCARD in origins:
+      return WILDCARD
+    return origin if origin.lower() in origins else None
+
+  def apply(self, response):
+    origin = request.headers.get('Origin')
+    if origin is None or not request.path.startswith('/api/'):
+      return response
+    response.vary.add('Origin')
+    allowed = self.allowed_origin(origin)
+    with self._lock:
+      self._stats['allowed' if allowed else 'rejected'] += 1
+    if allowed is None:
+      return response
+    response.headers['Access-Control-Allow-Origin'] = allowed
+    if request.method == 'OPTIONS' and 'Access-Control-Request-Method' in request.headers:
+      response.headers.update(self.preflight_headers)
+    return response
+
+  def stats(self):
+    origins = self.origins()
+    with self._lock:
+      stats = dict(self._stats)
+      stats.update({
+        'origins': sorted(origins),
+        'static_origins': sorted(self.static_origins),
+        'ttl': self.ttl,
+        'expires_in': max(0.0, self._expires - time.monotonic()),
+      })
+    return stats
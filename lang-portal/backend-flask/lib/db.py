@@ -1,135 +1,115 @@
-import sqlite3
-import json
-import os
-from flask import g
+from contextlib import contextmanager
+from flask import g, has_request_context
+from lib.pool import ConnectionPool
+from lib.migrations import apply_migrations
+from lib.seed import seed_database
 
 class Db:
-  def __init__(self, database):
-        self.database = database
-        self.connection = None
+  def __init__(self, database, pool_size=8, pool_timeout=20, pragmas=None, profiler=None):
+    self.database = database
+    self.profiler = profiler  # lib.profiler.QueryProfiler, wraps the cursors handed out below
+    self.snapshot = None  # lib.snapshot.SnapshotReplica in snapshot mode, see analytics()
+    self.pool = ConnectionPool(
+      database,
+      size=pool_size,
+      timeout=pool_timeout,
+      pragmas=pragmas
+    )
 
   def get(self):
     if 'db' not in g:
-      g.db = sqlite3.connect(self.database, timeout=20)  # Add timeout
-      g.db.row_factory = sqlite3.Row  # Return rows as dictionaries
+      g.db = self.pool.acquire()  # Pooled connection, pragmas already applied
     return g.db
 
   def commit(self):
     self.get().commit()
 
+  # Connection for reads made by shared components (CORS origins, the
+  # membership index) that run both inside requests and at startup. Inside
+  # a request it is the request's own connection: taking a second pool slot
+  # there can wait out the pool timeout while this request holds the first.
+  @contextmanager
+  def reader(self):
+    if has_request_context():
+      yield self.get()
+    else:
+      with self.pool.connection() as conn:
+        yield conn
+
   def cursor(self):
-    return self.get().cursor()
+    cursor = self.get().cursor()
+    return self.profiler.wrap(cursor) if self.profiler else cursor
+
+  # Connection for the analytics routes: the read-only snapshot while it
+  # is within its staleness window, else the live database (get())
+  def analytics(self):
+    if 'analytics_db' not in g:
+      g.analytics_db = self.snapshot.acquire() if self.snapshot else None
+    if g.analytics_db is None:
+      return self.get()
+    return g.analytics_db[1]
+
+  def analytics_cursor(self):
+    cursor = self.analytics().cursor()
+    return self.profiler.wrap(cursor) if self.profiler else cursor
 
   def close(self, e=None):
     db = g.pop('db', None)
     if db is not None:
-      db.close()
-
-  # Function to load SQL from a file
-  def sql(self, filepath):
-    print(f"Loading SQL from: {filepath}")
-    with open('sql/' + filepath, 'r') as file:
-      return file.read()
-
-  # Function to load the words from a JSON file
-  def load_json(self, filepath):
-    print(f"Loading JSON from: {filepath}")
-    with open(filepath, 'r') as file:
-      return json.load(file)
-
-  def setup_tables(self,cursor):
-    # Create the necessary tables
-    cursor.execute(self.sql('setup/create_table_words.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_word_reviews.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_word_review_items.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_groups.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_word_groups.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_study_activities.sql'))
-    self.get().commit()
-
-    cursor.execute(self.sql('setup/create_table_study_sessions.sql'))
-    self.get().commit()
-
-  def import_study_activities_json(self,cursor,data_json_path):
-    study_actvities = self.load_json(data_json_path)
-    for activity in study_actvities:
-      cursor.execute('''
-      INSERT INTO study_activities (name,url,preview_url) VALUES (?,?,?)
-      ''', (activity['name'],activity['url'],activity['preview_url'],))
-    self.get().commit()
-
-  def import_word_json(self,cursor,group_name,data_json_path):
-      # Insert a new group
-      cursor.execute('''
-        INSERT INTO groups (name) VALUES (?)
-      ''', (group_name,))
-      self.get().commit()
-
-      # Get the ID of the group
-      cursor.execute('SELECT id FROM groups WHERE name = ?', (group_name,))
-      core_verbs_group_id = cursor.fetchone()[0]
-
-      # Insert some sample words (verbs) from JSON file and associate with the group
-      words = self.load_json(data_json_path)
-
-      for word in words:
-        # Insert the word into the words table
-        cursor.execute('''
-          INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, ?)
-        ''', (word['kanji'], word['romaji'], word['english'], json.dumps(word['parts'])))
-        
-        # Get the last inserted word's ID
-        word_id = cursor.lastrowid
-
-        # Insert the word-group relationship into word_groups table
-        cursor.execute('''
-          INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)
-        ''', (word_id, core_verbs_group_id))
-      self.get().commit()
-
-      # Update the words_count in the groups table by counting all words in the group
-      cursor.execute('''
-        UPDATE groups
-        SET words_count = (
-          SELECT COUNT(*) FROM word_groups WHERE group_id = ?
-        )
-        WHERE id = ?
-      ''', (core_verbs_group_id, core_verbs_group_id))
-
-      self.get().commit()
-
-      print(f"Successfully added {len(words)} verbs to the '{group_name}' group.")
-
-  # Initialize the database with sample data
-  def init(self, app):
-    with app.app_context():
-      cursor = self.cursor()
-      self.setup_tables(cursor)
-      self.import_word_json(
-        cursor=cursor,
-        group_name='Core Verbs',
-        data_json_path='seed/data_verbs.json'
-      )
-      self.import_word_json(
-        cursor=cursor,
-        group_name='Core Adjectives',
-        data_json_path='seed/data_adjectives.json'
-      )
-
-      self.import_study_activities_json(
-        cursor=cursor,
-        data_json_path='seed/study_activities.json'
-      )
+      self.pool.release(db)
+    checkout = g.pop('analytics_db', None)
+    if checkout is not None:
+      pool, conn = checkout
+      pool.release(conn)
+
+  # Run a write transaction on the single writer connection. Commits on
+  # success and rolls back if the block raises. The cursor is closed before
+  # the writer lock is released: a cursor left for the garbage collector
+  # resets its cached statement later, possibly while another thread is
+  # running that same statement on the shared connection.
+  @contextmanager
+  def writer(self):
+    with self.pool.writer() as conn:
+      cursor = conn.cursor()
+      if self.profiler:
+        cursor = self.profiler.wrap(cursor)
+      try:
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+          yield cursor
+          conn.commit()
+        except Exception:
+          conn.rollback()
+          raise
+      finally:
+        cursor.close()
+
+  # Apply pending migrations from sql/migrations on the writer connection.
+  # Skipped until the base tables exist (see init).
+  def migrate(self):
+    with self.pool.writer() as conn:
+      row = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'words'"
+      ).fetchone()
+      if row[0] == 0:
+        return None
+      return apply_migrations(conn)
+
+  def stats(self):
+    return self.pool.stats()
+
+  def close_all(self):
+    if self.snapshot:
+      self.snapshot.close()
+    self.pool.close()
+
+  # Create, seed (see lib/seed.py) and migrate the database. Returns the
+  # seeding report with row counts and rows/sec.
+  def init(self, app=None, word_seeds=None):
+    with self.pool.writer() as conn:
+      report = seed_database(conn, word_seeds=word_seeds)
+    self.migrate()
+    return report
 
 # Create an instance of the Db class
 # db = Db()
@@ -0,0 +1,111 @@
+import json
+from itertools import islice
+from lib.serialization import compact
+
+# Set-based vocabulary import. Words are staged in a temp table and merged
+# into words/word_groups with a handful of statements, so the cost of an
+# import no longer grows with one round trip (and commit) per word.
+
+STAGING_TABLE = 'vocab_staging'
+# Rows are staged this many at a time, so an import never builds one
+# executemany over the whole upload
+STAGE_CHUNK = 1000
+
+class InvalidWord(ValueError):
+  pass
+
+def parse_word(item):
+  """Validate one vocabulary item and return its (kanji, romaji, english, parts) row"""
+  if not isinstance(item, dict):
+    raise InvalidWord('Vocabulary item must be an object')
+  fields = [item.get('kanji'), item.get('romaji'), item.get('english')]
+  if not all(isinstance(value, str) and value.strip() for value in fields):
+    raise InvalidWord('Missing required vocabulary fields')
+  parts = item.get('parts')
+  if parts is not None and not isinstance(parts, list):
+    raise InvalidWord('parts must be a list')
+  return (*fields, compact(parts))
+
+def read_ndjson(stream):
+  """Yield the parse_word row of each line of an NDJSON body, skipping
+  blank lines. Lines are decoded and validated one at a time, so neither
+  the raw body nor the decoded objects are held in memory."""
+  for number, line in enumerate(stream, start=1):
+    line = line.strip()
+    if not line:
+      continue
+    try:
+      item = json.loads(line)
+    except ValueError:
+      raise InvalidWord(f"Invalid JSON on line {number}")
+    try:
+      yield parse_word(item)
+    except InvalidWord as e:
+      raise InvalidWord(f"{str(e)} on line {number}")
+
+def import_words(cursor, group_name, rows):
+  """Merge `rows` (any iterable of parse_word rows) into words and link
+  them to the group `group_name`.
+
+  Must run inside a write transaction (see Db.writer). Duplicate words,
+  within the batch or against the table, are folded on the
+  (kanji, romaji, english) natural key. Returns the group id and counts.
+  """
+  cursor.execute(f'''
+    CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+      kanji TEXT NOT NULL,
+      romaji TEXT NOT NULL,
+      english TEXT NOT NULL,
+      parts TEXT NOT NULL
+    )
+  ''')
+  cursor.execute(f'DELETE FROM {STAGING_TABLE}')
+  rows = iter(rows)
+  while True:
+    chunk = list(islice(rows, STAGE_CHUNK))
+    if not chunk:
+      break
+    cursor.executemany(
+      f'INSERT INTO {STAGING_TABLE} (kanji, romaji, english, parts) VALUES (?, ?, ?, ?)',
+      chunk
+    )
+
+  cursor.execute('SELECT id FROM groups WHERE name = ? ORDER BY id LIMIT 1', (group_name,))
+  group = cursor.fetchone()
+  if group:
+    group_id = group[0]
+  else:
+    cursor.execute('INSERT INTO groups (name, words_count) VALUES (?, 0)', (group_name,))
+    group_id = cursor.lastrowid
+
+  # WHERE true keeps the parser from reading ON CONFLICT as a join clause
+  cursor.execute(f'''
+    INSERT INTO words (kanji, romaji, english, parts)
+    SELECT kanji, romaji, english, parts FROM {STAGING_TABLE} WHERE true
+    ORDER BY rowid
+    ON CONFLICT(kanji, romaji, english) DO NOTHING
+  ''')
+  words_added = cursor.rowcount
+
+  cursor.execute(f'''
+    INSERT OR IGNORE INTO word_groups (word_id, group_id)
+    SELECT DISTINCT w.id, ?
+    FROM {STAGING_TABLE} s
+    JOIN words w ON w.kanji = s.kanji AND w.romaji = s.romaji AND w.english = s.english
+  ''', (group_id,))
+  links_added = cursor.rowcount
+
+  cursor.execute('''
+    UPDATE groups
+    SET words_count = (
+      SELECT COUNT(*) FROM word_groups WHERE group_id = ?
+    )
+    WHERE id = ?
+  ''', (group_id, group_id))
+  cursor.execute(f'DELETE FROM {STAGING_TABLE}')
+
+  return {
+    'group_id': group_id,
+    'words_added': words_added,
+    'links_added': links_added
+  }
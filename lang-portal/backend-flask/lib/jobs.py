@@ -0,0 +1,426 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import lib.srs as srs
+
+# Background jobs for maintenance work that is too big for a request.
+#
+# A job is a row in the jobs table (migration 0011). Routes submit it and
+# answer 202 with the job; a JobRunner thread claims queued jobs and runs
+# their handler. Handlers do their work in small write transactions through
+# Job.batch(): each batch is one trip through the writer lane that also
+# saves the job's progress and heartbeat, and the runner pauses between
+# batches so request writes (review batches) get the writer lane in
+# between. Handlers must be resumable: a job interrupted by shutdown is
+# requeued, and one whose heartbeat went stale (its process died) is
+# claimed again by the next runner that polls. Handlers that change groups
+# or their links record it on job.changes (lib/membership.py), which the
+# runner applies to the membership index after each batch commits.
+
+logger = logging.getLogger(__name__)
+
+# kind -> (handler, tables bumped in the response cache after every batch)
+HANDLERS = {}
+
+FINISHED = ('succeeded', 'failed')
+
+# Groups recounted per transaction by recount_words_count
+RECOUNT_GROUPS_PER_BATCH = 100
+
+class UnknownJobKind(ValueError):
+  pass
+
+class JobInterrupted(Exception):
+  """Raised between batches when the runner is stopping"""
+
+def job(kind, tables=()):
+  """Register a handler for `kind`. It gets a Job and returns a JSON-able result"""
+  def decorator(fn):
+    HANDLERS[kind] = (fn, tuple(tables))
+    return fn
+  return decorator
+
+def job_dict(row):
+  return {
+    'id': row['id'],
+    'kind': row['kind'],
+    'params': json.loads(row['params']),
+    'status': row['status'],
+    'progress': row['progress'],
+    'total': row['total'],
+    'result': json.loads(row['result']) if row['result'] is not None else None,
+    'error': row['error'],
+    'attempts': row['attempts'],
+    'created_at': row['created_at'],
+    'started_at': row['started_at'],
+    'finished_at': row['finished_at'],
+  }
+
+class Job:
+  """A claimed job, handed to its handler"""
+
+  def __init__(self, runner, row):
+    self.runner = runner
+    self.id = row['id']
+    self.kind = row['kind']
+    self.params = json.loads(row['params'])
+    self.progress = row['progress']
+    self.total = row['total']
+    self.batch_size = runner.batch_size
+    self.changes = None  # Membership changes of the current batch
+
+  def advance(self, rows):
+    self.progress += rows
+
+  def count(self, sql, params=()):
+    """Run a COUNT query outside the writer lane (used for `total`)"""
+    with self.runner.db.pool.connection() as conn:
+      return conn.execute(sql, params).fetchone()[0]
+
+  @contextmanager
+  def batch(self):
+    """One write transaction of the job; progress and heartbeat are saved with it"""
+    if self.runner.stopping:
+      raise JobInterrupted()
+    membership = self.runner.membership
+    with self.runner.db.writer() as cursor:
+      self.changes = membership.changes(cursor) if membership else None
+      yield cursor
+      cursor.execute('''
+        UPDATE jobs SET progress = ?, total = ?, heartbeat_at = CURRENT_TIMESTAMP WHERE id = ?
+      ''', (self.progress, self.total, self.id))
+      if self.changes:
+        self.changes.seal(cursor)
+    self.runner.after_batch(self)
+
+class JobRunner:
+  """Background thread running queued jobs one at a time"""
+
+  def __init__(self, db, batch_size=1000, pause=0.01, poll_interval=1.0, stale_after=60, on_batch=None,
+               membership=None):
+    self.db = db
+    self.membership = membership  # lib.membership.MembershipIndex, takes job.changes after each batch
+    self.batch_size = batch_size
+    self.pause = pause
+    self.poll_interval = poll_interval
+    self.stale_after = stale_after
+    self.on_batch = on_batch
+    self._stop = threading.Event()
+    self._wake = threading.Event()
+    self._lock = threading.Lock()
+    self._thread = None
+
+  @property
+  def stopping(self):
+    return self._stop.is_set()
+
+  def submit(self, kind, params=None):
+    """Queue a job, or return the unfinished job with the same kind and params"""
+    if kind not in HANDLERS:
+      raise UnknownJobKind(f'Unknown job kind: {kind}')
+    params = json.dumps(params or {}, sort_keys=True)
+    with self.db.writer() as cursor:
+      cursor.execute('''
+        SELECT id FROM jobs
+        WHERE kind = ? AND params = ? AND status IN ('queued', 'running')
+        ORDER BY id LIMIT 1
+      ''', (kind, params))
+      row = cursor.fetchone()
+      if row is None:
+        cursor.execute('INSERT INTO jobs (kind, params) VALUES (?, ?)', (kind, params))
+        job_id = cursor.lastrowid
+      else:
+        job_id = row['id']
+    self.start()
+    self._wake.set()
+    return self.get(job_id)
+
+  def get(self, job_id):
+    with self.db.pool.connection() as conn:
+      row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return job_dict(row) if row else None
+
+  def list(self, status=None, limit=50):
+    sql = 'SELECT * FROM jobs'
+    params = []
+    if status:
+      sql += ' WHERE status = ?'
+      params.append(status)
+    sql += ' ORDER BY id DESC LIMIT ?'
+    params.append(limit)
+    with self.db.pool.connection() as conn:
+      return [job_dict(row) for row in conn.execute(sql, params).fetchall()]
+
+  def wait(self, job_id, timeout=30):
+    """Block until the job has finished (or `timeout` seconds passed); returns it"""
+    deadline = time.monotonic() + timeout
+    while True:
+      job = self.get(job_id)
+      if job is None or job['status'] in FINISHED or time.monotonic() > deadline:
+        return job
+      time.sleep(0.01)
+
+  # --- Worker ---------------------------------------------------------------
+
+  def claimable(self):
+    """Cheap read-only check before taking the writer lane to claim"""
+    with self.db.pool.connection() as conn:
+      return conn.execute('''
+        SELECT 1 FROM jobs
+        WHERE status = 'queued'
+          OR (status = 'running' AND heartbeat_at < datetime('now', ?))
+        LIMIT 1
+      ''', (f'-{int(self.stale_after)} seconds',)).fetchone() is not None
+
+  def claim(self):
+    with self.db.writer() as cursor:
+      # Jobs of a process that died mid-run
+      cursor.execute('''
+        UPDATE jobs SET status = 'queued'
+        WHERE status = 'running' AND heartbeat_at < datetime('now', ?)
+      ''', (f'-{int(self.stale_after)} seconds',))
+      cursor.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1")
+      row = cursor.fetchone()
+      if row is None:
+        return None
+      cursor.execute('''
+        UPDATE jobs
+        SET
+          status = 'running',
+          attempts = attempts + 1,
+          started_at = COALESCE(started_at, CURRENT_TIMESTAMP),
+          heartbeat_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+      ''', (row['id'],))
+      return Job(self, row)
+
+  def execute(self, job):
+    handler = HANDLERS[job.kind][0]
+    status, result, error = 'succeeded', None, None
+    try:
+      result = handler(job)
+    except JobInterrupted:
+      status = 'queued'
+      logger.info(f"Job {job.id} ({job.kind}) interrupted at {job.progress} rows, requeued")
+    except Exception as e:
+      status, error = 'failed', str(e)
+      logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}", exc_info=True)
+    with self.db.writer() as cursor:
+      cursor.execute('''
+        UPDATE jobs
+        SET
+          status = ?,
+          progress = ?,
+          total = ?,
+          result = ?,
+          error = ?,
+          heartbeat_at = NULL,
+          finished_at = CASE WHEN ? = 'queued' THEN NULL ELSE CURRENT_TIMESTAMP END
+        WHERE id = ?
+      ''', (status, job.progress, job.total, json.dumps(result) if result is not None else None,
+            error, status, job.id))
+    if status == 'succeeded':
+      logger.info(f"Job {job.id} ({job.kind}) finished: {job.progress} rows")
+
+  def after_batch(self, job):
+    if self.on_batch:
+      self.on_batch(HANDLERS[job.kind][1])
+    if job.changes:
+      self.membership.apply(job.changes)
+    # Leave the writer lane to request writes before the next batch
+    self._stop.wait(self.pause)
+
+  def run(self):
+    while not self._stop.is_set():
+      job = None
+      try:
+        if self.claimable():
+          job = self.claim()
+      except sqlite3.OperationalError as e:
+        # Database not initialized (or migrated) yet
+        logger.debug(f"Job runner cannot poll: {str(e)}")
+      except Exception as e:
+        logger.error(f"Job runner poll failed: {str(e)}", exc_info=True)
+      if job is not None:
+        self.execute(job)
+        continue
+      self._wake.wait(self.poll_interval)
+      self._wake.clear()
+
+  def start(self):
+    with self._lock:
+      if self._thread is None and not self._stop.is_set():
+        self._thread = threading.Thread(target=self.run, name='job-runner', daemon=True)
+        self._thread.start()
+    return self
+
+  def stop(self):
+    """Stop after the current batch; an unfinished job is requeued"""
+    self._stop.set()
+    self._wake.set()
+    with self._lock:
+      thread, self._thread = self._thread, None
+    if thread is not None:
+      thread.join()
+
+# --- Jobs --------------------------------------------------------------------
+
+def placeholders(values):
+  return ','.join('?' * len(values))
+
+def delete_in_batches(job, table, where, params=()):
+  """Delete the rows of `table` matching `where`, job.batch_size per transaction"""
+  deleted = 0
+  while True:
+    with job.batch() as cursor:
+      cursor.execute(f'''
+        DELETE FROM {table}
+        WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)
+      ''', (*params, job.batch_size))
+      batch = cursor.rowcount
+      job.advance(batch)
+    deleted += batch
+    if batch < job.batch_size:
+      return deleted
+
+def delete_sessions(job, where, params=()):
+  """Delete the study sessions matching `where` together with their reviews.
+
+  Each transaction deletes about job.batch_size reviews (the review_count
+  rollup sizes the session batch), and a session is deleted in the same
+  transaction as its last reviews: a review recorded meanwhile either lands
+  in a session that is still there and is deleted with it, or is refused
+  (404) because the session is gone: the review routes check the session
+  inside their own write transaction. The review and session delete triggers keep
+  word_reviews, the dashboard totals and the session/daily rollups in step.
+  """
+  reviews = sessions = 0
+  while True:
+    with job.batch() as cursor:
+      cursor.execute(f'''
+        SELECT id, review_count FROM study_sessions WHERE {where} ORDER BY id LIMIT ?
+      ''', (*params, job.batch_size))
+      ids, budget = [], job.batch_size
+      for row in cursor.fetchall():
+        ids.append(row['id'])
+        budget -= row['review_count'] + 1
+        if budget <= 0:
+          break
+      if not ids:
+        return {'reviews_deleted': reviews, 'sessions_deleted': sessions}
+      cursor.execute(f'''
+        DELETE FROM word_review_items
+        WHERE rowid IN (
+          SELECT rowid FROM word_review_items WHERE study_session_id IN ({placeholders(ids)}) LIMIT ?
+        )
+      ''', (*ids, job.batch_size))
+      deleted_reviews = cursor.rowcount
+      cursor.execute(f'''
+        DELETE FROM study_sessions
+        WHERE id IN ({placeholders(ids)})
+          AND NOT EXISTS (SELECT 1 FROM word_review_items WHERE study_session_id = study_sessions.id)
+      ''', ids)
+      deleted_sessions = cursor.rowcount
+      job.advance(deleted_reviews + deleted_sessions)
+    reviews += deleted_reviews
+    sessions += deleted_sessions
+
+def reset_word_schedules(job):
+  """Put the schedules of words with no reviews left back to the SM-2 initial state"""
+  reset, last = 0, (0, 0)
+  while True:
+    with job.batch() as cursor:
+      cursor.execute('''
+        SELECT group_id, word_id FROM word_schedules
+        WHERE (group_id, word_id) > (?, ?)
+        ORDER BY group_id, word_id
+        LIMIT ?
+      ''', (*last, job.batch_size))
+      keys = [(row['group_id'], row['word_id']) for row in cursor.fetchall()]
+      if keys:
+        state = srs.initial_state()
+        cursor.execute('''
+          UPDATE word_schedules
+          SET ease = ?, interval_days = ?, repetitions = ?, lapses = ?,
+            last_reviewed_at = NULL, due_at = CURRENT_TIMESTAMP
+          WHERE (group_id, word_id) > (?, ?) AND (group_id, word_id) <= (?, ?)
+            AND last_reviewed_at IS NOT NULL
+            AND NOT EXISTS (
+              SELECT 1 FROM word_review_items r JOIN study_sessions s ON s.id = r.study_session_id
+              WHERE r.word_id = word_schedules.word_id AND s.group_id = word_schedules.group_id
+            )
+        ''', (state['ease'], state['interval_days'], state['repetitions'], state['lapses'], *last, *keys[-1]))
+        reset += cursor.rowcount
+    if len(keys) < job.batch_size:
+      return reset
+    last = keys[-1]
+
+@job('reset_study_history', tables=('study_sessions', 'word_review_items', 'word_schedules'))
+def reset_study_history(job):
+  """Delete the study sessions up to params['through_session_id'] (all of
+  them without it) with their reviews, and start their schedules over.
+
+  Sessions started after the reset was requested are kept, so a learner who
+  starts studying meanwhile does not lose the session under them.
+  """
+  through = job.params.get('through_session_id')
+  where, params = ('id <= ?', (through,)) if through is not None else ('1', ())
+  if job.total is None:
+    job.total = (job.count(f'''
+                   SELECT COUNT(*) FROM word_review_items
+                   WHERE study_session_id IN (SELECT id FROM study_sessions WHERE {where})
+                 ''', params)
+                 + job.count(f'SELECT COUNT(*) FROM study_sessions WHERE {where}', params))
+  result = delete_sessions(job, where, params)
+  result['schedules_reset'] = reset_word_schedules(job)
+  return result
+
+@job('delete_group', tables=('groups', 'word_groups', 'study_sessions', 'word_review_items'))
+def delete_group(job):
+  """Delete a group, then its study sessions (with their reviews) and word links"""
+  group_id = job.params['group_id']
+  if job.total is None:
+    job.total = (1 + job.count('SELECT COUNT(*) FROM word_groups WHERE group_id = ?', (group_id,))
+                 + job.count('SELECT COUNT(*) FROM study_sessions WHERE group_id = ?', (group_id,))
+                 + job.count('''
+                     SELECT COUNT(*) FROM word_review_items
+                     WHERE study_session_id IN (SELECT id FROM study_sessions WHERE group_id = ?)
+                   ''', (group_id,)))
+  # The group goes first so it disappears (and takes no new sessions) at once
+  with job.batch() as cursor:
+    cursor.execute('DELETE FROM groups WHERE id = ?', (group_id,))
+    job.advance(cursor.rowcount)
+    # The index skips its remaining links from now on
+    if job.changes:
+      job.changes.remove_group(group_id)
+  result = {'group_id': group_id}
+  result.update(delete_sessions(job, 'group_id = ?', (group_id,)))
+  result['links_deleted'] = delete_in_batches(job, 'word_groups', 'group_id = ?', (group_id,))
+  return result
+
+@job('recount_words_count', tables=('groups',))
+def recount_words_count(job):
+  """Recompute groups.words_count from word_groups"""
+  # Recounting is idempotent, a resumed job simply starts over
+  job.total = job.count('SELECT COUNT(*) FROM groups')
+  job.progress = 0
+  last_id, changed = 0, 0
+  while True:
+    with job.batch() as cursor:
+      cursor.execute('SELECT id FROM groups WHERE id > ? ORDER BY id LIMIT ?', (last_id, RECOUNT_GROUPS_PER_BATCH))
+      ids = [row['id'] for row in cursor.fetchall()]
+      if ids:
+        cursor.execute(f'''
+          UPDATE groups
+          SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id)
+          WHERE id IN ({','.join('?' * len(ids))})
+            AND words_count IS NOT (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id)
+        ''', ids)
+        changed += cursor.rowcount
+        job.advance(len(ids))
+    if len(ids) < RECOUNT_GROUPS_PER_BATCH:
+      return {'groups': job.progress, 'changed': changed}
+    last_id = ids[-1]
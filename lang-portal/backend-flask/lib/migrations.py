@@ -0,0 +1,62 @@
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql', 'migrations')
+
+# Migration files are named <version>_<name>.sql, e.g. 0001_hot_join_indexes.sql
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+def ensure_schema_table(conn):
+  conn.execute('''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+      version TEXT PRIMARY KEY,
+      name TEXT NOT NULL,
+      applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+  ''')
+  conn.commit()
+
+def list_migrations(migrations_dir=MIGRATIONS_DIR):
+  """Return (version, name, path) for every migration file in version order"""
+  migrations = []
+  for filename in os.listdir(migrations_dir):
+    match = MIGRATION_FILE.match(filename)
+    if match:
+      migrations.append((match.group(1), match.group(2), os.path.join(migrations_dir, filename)))
+  return sorted(migrations)
+
+def applied_versions(conn):
+  ensure_schema_table(conn)
+  return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+def pending_migrations(conn, migrations_dir=MIGRATIONS_DIR):
+  applied = applied_versions(conn)
+  return [m for m in list_migrations(migrations_dir) if m[0] not in applied]
+
+def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR):
+  """Apply pending migrations, each in its own transaction.
+
+  The version is recorded in the same transaction as the DDL, so a failed
+  migration leaves no trace and is retried on the next run.
+  """
+  applied = []
+  for version, name, path in pending_migrations(conn, migrations_dir):
+    logger.info(f"Applying migration {version}_{name}")
+    with open(path, 'r') as f:
+      migration_sql = f.read()
+    try:
+      conn.executescript('BEGIN;\n' + migration_sql)
+      conn.execute(
+        'INSERT INTO schema_migrations (version, name) VALUES (?, ?)',
+        (version, name)
+      )
+      conn.commit()
+    except Exception:
+      conn.rollback()
+      logger.error(f"Migration {version}_{name} failed", exc_info=True)
+      raise
+    applied.append(f"{version}_{name}")
+  return applied
@@ -0,0 +1,107 @@
+import base64
+import json
+
+# Keyset (cursor) pagination shared by the list endpoints.
+#
+# A page query is any SELECT that exposes a `sort_key` column and a unique
+# `id` column. Instead of LIMIT/OFFSET, the next page starts right after the
+# (sort_key, id) of the last row returned, so deep pages cost the same as
+# the first one. Cursors are opaque url-safe tokens.
+
+class InvalidCursor(ValueError):
+  pass
+
+def encode_cursor(sort_by, order, direction, sort_value, row_id):
+  payload = json.dumps({
+    's': sort_by,
+    'o': order,
+    'd': direction,
+    'v': sort_value,
+    'id': row_id
+  }, separators=(',', ':'), ensure_ascii=False)
+  return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+  try:
+    padded = token + '=' * (-len(token) % 4)
+    data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    if data['d'] not in ('next', 'prev'):
+      raise ValueError(data['d'])
+    return data
+  except Exception:
+    raise InvalidCursor('Invalid pagination cursor')
+
+def wants_cursor(args):
+  """Cursor mode is opt-in: ?pagination=cursor for the first page, ?cursor=... after"""
+  return 'cursor' in args or args.get('pagination') == 'cursor'
+
+def page_args(args, per_page=10, per_page_arg='per_page', max_per_page=100):
+  """(page, per_page) from the query string. Values that are not numbers
+  fall back to the defaults; page is at least 1 and per_page is kept
+  between 1 and max_per_page"""
+  page = max(1, args.get('page', 1, type=int))
+  per_page = min(max(1, args.get(per_page_arg, per_page, type=int)), max_per_page)
+  return page, per_page
+
+def include_total(args, default):
+  value = args.get('include_total')
+  if value is None:
+    return default
+  return value.lower() in ('1', 'true', 'yes')
+
+def keyset_page(cursor, base_query, params, sort_by, order, limit, token=None, columns='page.*'):
+  """Fetch one page of `base_query` ordered by (sort_key, id).
+
+  `columns` is the select list applied to the page rows only (aliased
+  `page`), which keeps per-row subqueries off the full result set.
+  Returns (rows, next_cursor, prev_cursor).
+  """
+  order = order.upper()
+  direction = 'next'
+  after = None
+  if token:
+    data = decode_cursor(token)
+    if data['s'] != sort_by or data['o'] != order:
+      raise InvalidCursor('Cursor does not match sort_by/order')
+    direction = data['d']
+    after = (data['v'], data['id'])
+
+  # Walking backwards means scanning in the opposite direction
+  ascending = (order == 'ASC') != (direction == 'prev')
+  op = '>' if ascending else '<'
+  scan = 'ASC' if ascending else 'DESC'
+  where = f'WHERE (k.sort_key, k.id) {op} (?, ?)' if after else ''
+
+  query = f'''
+    SELECT {columns}
+    FROM (
+      SELECT * FROM ({base_query}) k
+      {where}
+      ORDER BY k.sort_key {scan}, k.id {scan}
+      LIMIT ?
+    ) page
+    ORDER BY page.sort_key {order}, page.id {order}
+  '''
+  query_params = list(params) + (list(after) if after else []) + [limit + 1]
+  cursor.execute(query, query_params)
+  rows = cursor.fetchall()
+
+  # One extra row tells us whether there is anything beyond this page
+  has_more = len(rows) > limit
+  if has_more:
+    rows = rows[:limit] if direction == 'next' else rows[1:]
+
+  next_cursor = None
+  prev_cursor = None
+  if rows:
+    first, last = rows[0], rows[-1]
+    if direction == 'next':
+      if has_more:
+        next_cursor = encode_cursor(sort_by, order, 'next', last['sort_key'], last['id'])
+      if after:
+        prev_cursor = encode_cursor(sort_by, order, 'prev', first['sort_key'], first['id'])
+    else:
+      next_cursor = encode_cursor(sort_by, order, 'next', last['sort_key'], last['id'])
+      if has_more:
+        prev_cursor = encode_cursor(sort_by, order, 'prev', first['sort_key'], first['id'])
+  return rows, next_cursor, prev_cursor
@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Pragmas applied once when a connection is opened. WAL lets readers keep
+# going while the writer commits, and synchronous=NORMAL is safe under WAL
+# (only the last transactions can be lost on power failure, never corrupted).
+DEFAULT_PRAGMAS = {
+  'journal_mode': 'WAL',
+  'synchronous': 'NORMAL',
+  'temp_store': 'MEMORY',
+  'mmap_size': 256 * 1024 * 1024,
+  'cache_size': -16000,  # negative value = KiB, so ~16MB per connection
+}
+# A pragma given as None in `pragmas` is not applied at all
+
+class PoolTimeout(Exception):
+  pass
+
+class ConnectionPool:
+  def __init__(self, database, size=8, timeout=20, busy_timeout=20, pragmas=None, uri=False):
+    self.database = database
+    self.uri = uri
+    self.size = size
+    self.timeout = timeout
+    self.busy_timeout = busy_timeout
+    self.pragmas = dict(DEFAULT_PRAGMAS)
+    if pragmas:
+      self.pragmas.update(pragmas)
+
+    self._idle = []
+    self._created = 0
+    self._closed = False
+    self._cond = threading.Condition()
+
+    # The writer lane is a single dedicated connection guarded by a lock so
+    # that writes are serialized in-process instead of fighting over the
+    # SQLite write lock (and spinning on SQLITE_BUSY).
+    self._writer = None
+    self._writer_lock = threading.Lock()
+
+    self._stats = {
+      'checkouts': 0,
+      'waits': 0,
+      'wait_time': 0.0,
+      'max_wait_time': 0.0,
+      'timeouts': 0,
+      'writer_checkouts': 0,
+      'writer_waits': 0,
+      'writer_wait_time': 0.0,
+    }
+
+  def connect(self):
+    conn = sqlite3.connect(self.database, timeout=self.busy_timeout, check_same_thread=False, uri=self.uri)
+    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    for name, value in self.pragmas.items():
+      if value is None:
+        continue
+      conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+  def acquire(self):
+    start = time.perf_counter()
+    waited = False
+    with self._cond:
+      while True:
+        if self._closed:
+          raise PoolTimeout('Connection pool is closed')
+        if self._idle:
+          conn = self._idle.pop()
+          break
+        if self._created < self.size:
+          self._created += 1
+          conn = None
+          break
+        waited = True
+        remaining = self.timeout - (time.perf_counter() - start)
+        if remaining <= 0 or not self._cond.wait(remaining):
+          if not self._idle and self._created >= self.size:
+            self._record_checkout(time.perf_counter() - start, waited, timed_out=True)
+            raise PoolTimeout(f'No connection available after {self.timeout}s')
+      self._record_checkout(time.perf_counter() - start, waited)
+
+    if conn is None:
+      try:
+        conn = self.connect()
+      except Exception:
+        with self._cond:
+          self._created -= 1
+          self._cond.notify()
+        raise
+    return conn
+
+  def release(self, conn):
+    # Never hand out a connection with a half-finished transaction
+    if conn.in_transaction:
+      conn.rollback()
+    with self._cond:
+      if self._closed:
+        conn.close()
+        self._created -= 1
+        return
+      self._idle.append(conn)
+      self._cond.notify()
+
+  @contextmanager
+  def connection(self):
+    conn = self.acquire()
+    try:
+      yield conn
+    finally:
+      self.release(conn)
+
+  @contextmanager
+  def writer(self):
+    start = time.perf_counter()
+    waited = not self._writer_lock.acquire(blocking=False)
+    if waited and not self._writer_lock.acquire(timeout=self.timeout):
+      raise PoolTimeout(f'Writer lane busy for more than {self.timeout}s')
+    try:
+      elapsed = time.perf_counter() - start
+      with self._cond:
+        self._stats['writer_checkouts'] += 1
+        if waited:
+          self._stats['writer_waits'] += 1
+          self._stats['writer_wait_time'] += elapsed
+      if self._writer is None:
+        self._writer = self.connect()
+      yield self._writer
+    finally:
+      if self._writer is not None and self._writer.in_transaction:
+        self._writer.rollback()
+      self._writer_lock.release()
+
+  def _record_checkout(self, elapsed, waited, timed_out=False):
+    if timed_out:
+      self._stats['timeouts'] += 1
+    else:
+      self._stats['checkouts'] += 1
+    if waited:
+      self._stats['waits'] += 1
+      self._stats['wait_time'] += elapsed
+      self._stats['max_wait_time'] = max(self._stats['max_wait_time'], elapsed)
+
+  def stats(self):
+    with self._cond:
+      stats = dict(self._stats)
+      stats.update({
+        'size': self.size,
+        'open': self._created,
+        'idle': len(self._idle),
+        'in_use': self._created - len(self._idle),
+        'avg_wait_time': stats['wait_time'] / stats['waits'] if stats['waits'] else 0.0,
+      })
+    return stats
+
+  def close(self):
+    with self._cond:
+      self._closed = True
+      idle, self._idle = self._idle, []
+      self._created -= len(idle)
+      self._cond.notify_all()
+    for conn in idle:
+      conn.close()
+    with self._writer_lock:
+      if self._writer is not None:
+        self._writer.close()
+        self._writer = None
@@ -0,0 +1,204 @@
+import re
+import threading
+import time
+from collections import deque
+from flask import g, has_request_context, request
+
+# Request-level query profiler.
+#
+# Db.cursor() and Db.writer() hand out ProfiledCursor wrappers that time
+# every statement (execute plus the fetches that drain it) and count the
+# rows it returned. At the end of each request the statements are folded
+# into per-statement histograms, statements over the slow threshold get
+# their EXPLAIN QUERY PLAN logged, and a Server-Timing header is attached.
+# The plans are taken on a connection the request already holds: asking the
+# pool for another one there could wait out DB_POOL_TIMEOUT on a busy pool.
+
+# Histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+# Most distinct statements tracked; the IN (?, ?, ...) lists are collapsed
+# so the set of statements stays small
+MAX_STATEMENTS = 500
+
+WHITESPACE = re.compile(r'\s+')
+PLACEHOLDER_LIST = re.compile(r'\?(\s*,\s*\?)+')
+
+def normalize_sql(sql):
+  return PLACEHOLDER_LIST.sub('?, ...', WHITESPACE.sub(' ', sql).strip())
+
+def bucket_label(value, bounds):
+  for bound in bounds:
+    if value <= bound:
+      return f'<={bound}'
+  return '+Inf'
+
+def empty_histogram(bounds):
+  histogram = {f'<={bound}': 0 for bound in bounds}
+  histogram['+Inf'] = 0
+  return histogram
+
+class ProfiledCursor:
+  """sqlite3.Cursor proxy that records statements on the current request"""
+
+  def __init__(self, cursor):
+    self._cursor = cursor
+    self._entry = None
+
+  def _start(self, sql, params):
+    self._entry = {'sql': sql, 'params': params, 'seconds': 0.0, 'rows': 0, 'conn': self._cursor.connection}
+    if has_request_context():
+      g.setdefault('query_profile', []).append(self._entry)
+
+  def _timed(self, fn, *args):
+    start = time.perf_counter()
+    try:
+      return fn(*args)
+    finally:
+      if self._entry is not None:
+        self._entry['seconds'] += time.perf_counter() - start
+
+  def execute(self, sql, params=()):
+    self._start(sql, params)
+    self._timed(self._cursor.execute, sql, params)
+    return self
+
+  def executemany(self, sql, seq_of_params):
+    self._start(sql, None)
+    self._timed(self._cursor.executemany, sql, seq_of_params)
+    return self
+
+  def fetchone(self):
+    row = self._timed(self._cursor.fetchone)
+    if row is not None and self._entry is not None:
+      self._entry['rows'] += 1
+    return row
+
+  def fetchmany(self, size=None):
+    rows = self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+    if self._entry is not None:
+      self._entry['rows'] += len(rows)
+    return rows
+
+  def fetchall(self):
+    rows = self._timed(self._cursor.fetchall)
+    if self._entry is not None:
+      self._entry['rows'] += len(rows)
+    return rows
+
+  def __iter__(self):
+    while True:
+      row = self.fetchone()
+      if row is None:
+        return
+      yield row
+
+  def __getattr__(self, name):
+    return getattr(self._cursor, name)
+
+class QueryProfiler:
+  def __init__(self, slow_threshold_ms=100, slow_log_size=100):
+    self.slow_threshold = slow_threshold_ms / 1000
+    self._slow = deque(maxlen=slow_log_size)
+    self._lock = threading.Lock()
+    self.reset()
+
+  def reset(self):
+    with self._lock:
+      self._requests = 0
+      self._queries_per_request = empty_histogram(QUERY_COUNT_BUCKETS)
+      self._statements = {}
+      self._slow.clear()
+
+  def wrap(self, cursor):
+    return ProfiledCursor(cursor)
+
+  def init_app(self, app):
+    @app.before_request
+    def start_profile():
+      g.query_profile = []
+      g.request_started = time.perf_counter()
+
+    @app.after_request
+    def finish_profile(response):
+      queries = g.pop('query_profile', [])
+      total = time.perf_counter() - g.pop('request_started', time.perf_counter())
+      db_time = sum(entry['seconds'] for entry in queries)
+      slow = self.record(queries)
+      for entry in slow:
+        entry['plan'] = self.explain(app, entry)
+        entry['path'] = request.path
+        app.logger.warning(
+          f"Slow query ({entry['seconds'] * 1000:.1f}ms, {entry['rows']} rows) on {request.path}: "
+          f"{normalize_sql(entry['sql'])} | plan: {' / '.join(entry['plan'])}"
+        )
+        with self._lock:
+          self._slow.append({
+            'path': entry['path'],
+            'sql': normalize_sql(entry['sql']),
+            'ms': round(entry['seconds'] * 1000, 3),
+            'rows': entry['rows'],
+            'plan': entry['plan'],
+          })
+      response.headers.add(
+        'Server-Timing',
+        f'db;dur={db_time * 1000:.2f};desc="{len(queries)} queries", app;dur={total * 1000:.2f}'
+      )
+      return response
+
+  def record(self, queries):
+    """Fold one request's statements into the aggregates, return the slow ones"""
+    slow = []
+    with self._lock:
+      self._requests += 1
+      self._queries_per_request[bucket_label(len(queries), QUERY_COUNT_BUCKETS)] += 1
+      for entry in queries:
+        key = normalize_sql(entry['sql'])
+        stats = self._statements.get(key)
+        if stats is None:
+          if len(self._statements) >= MAX_STATEMENTS:
+            continue
+          stats = self._statements[key] = {
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'rows': 0,
+            'histogram': empty_histogram(BUCKETS_MS),
+          }
+        ms = entry['seconds'] * 1000
+        stats['count'] += 1
+        stats['total_ms'] += ms
+        stats['max_ms'] = max(stats['max_ms'], ms)
+        stats['rows'] += entry['rows']
+        stats['histogram'][bucket_label(ms, BUCKETS_MS)] += 1
+        if entry['seconds'] >= self.slow_threshold:
+          slow.append(entry)
+    return slow
+
+  def explain(self, app, entry):
+    if entry['params'] is None:  # executemany
+      return []
+    # Snapshot statements are explained on the snapshot; the rest (writer
+    # lane included) on the request's own connection
+    checkout = g.get('analytics_db')
+    conn = checkout[1] if checkout is not None and entry['conn'] is checkout[1] else app.db.get()
+    try:
+      rows = conn.execute(f"EXPLAIN QUERY PLAN {entry['sql']}", entry['params']).fetchall()
+      return [row['detail'] for row in rows]
+    except Exception as e:
+      return [f'EXPLAIN failed: {e}']
+
+  def stats(self, limit=20):
+    with self._lock:
+      statements = sorted(self._statements.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+      return {
+        'requests': self._requests,
+        'queries_per_request': dict(self._queries_per_request),
+        'slow_threshold_ms': self.slow_threshold * 1000,
+        'statements': [
+          dict(stats, sql=sql, avg_ms=stats['total_ms'] / stats['count'], histogram=dict(stats['histogram']))
+          for sql, stats in statements[:limit]
+        ],
+        'slow_queries': list(self._slow),
+      }
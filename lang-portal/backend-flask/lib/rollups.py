@@ -0,0 +1,171 @@
+from lib.sessions import RECOMPUTE_ROLLUPS
+
+# Rebuild and consistency checks for the tables that are maintained
+# incrementally by triggers (see sql/migrations).
+
+def rebuild_word_reviews(conn):
+  """Recompute word_reviews from word_review_items in one transaction"""
+  conn.execute('BEGIN IMMEDIATE')
+  try:
+    conn.execute('DELETE FROM word_reviews')
+    cursor = conn.execute('''
+      INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+      SELECT
+        word_id,
+        SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN correct = 1 THEN 0 ELSE 1 END),
+        MAX(created_at)
+      FROM word_review_items
+      GROUP BY word_id
+    ''')
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+  return cursor.rowcount
+
+def check_word_reviews(conn):
+  """Return the words whose rollup differs from the raw review items"""
+  rows = conn.execute('''
+    WITH expected AS (
+      SELECT
+        word_id,
+        SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) as correct_count,
+        SUM(CASE WHEN correct = 1 THEN 0 ELSE 1 END) as wrong_count
+      FROM word_review_items
+      GROUP BY word_id
+    )
+    SELECT
+      COALESCE(e.word_id, wr.word_id) as word_id,
+      e.correct_count as expected_correct,
+      e.wrong_count as expected_wrong,
+      wr.correct_count as actual_correct,
+      wr.wrong_count as actual_wrong
+    FROM expected e
+    LEFT JOIN word_reviews wr ON wr.word_id = e.word_id
+    WHERE wr.word_id IS NULL
+      OR wr.correct_count != e.correct_count
+      OR wr.wrong_count != e.wrong_count
+    UNION ALL
+    SELECT wr.word_id, 0, 0, wr.correct_count, wr.wrong_count
+    FROM word_reviews wr
+    WHERE NOT EXISTS (SELECT 1 FROM word_review_items wri WHERE wri.word_id = wr.word_id)
+  ''').fetchall()
+  return [dict(zip(
+    ['word_id', 'expected_correct', 'expected_wrong', 'actual_correct', 'actual_wrong'], row
+  )) for row in rows]
+
+def rebuild_dashboard_stats(conn):
+  """Recompute the dashboard_stats row and study_days from scratch"""
+  conn.execute('BEGIN IMMEDIATE')
+  try:
+    conn.execute('DELETE FROM dashboard_stats')
+    conn.execute('''
+      INSERT INTO dashboard_stats (
+        id, total_vocabulary, total_words_studied, mastered_words,
+        total_reviews, correct_reviews, total_sessions, last_session_id
+      )
+      SELECT
+        1,
+        (SELECT COUNT(*) FROM words),
+        (SELECT COUNT(*) FROM word_reviews),
+        (SELECT COUNT(*) FROM word_reviews
+         WHERE correct_count + wrong_count >= 5
+           AND correct_count * 1.0 / (correct_count + wrong_count) >= 0.8),
+        (SELECT COALESCE(SUM(correct_count + wrong_count), 0) FROM word_reviews),
+        (SELECT COALESCE(SUM(correct_count), 0) FROM word_reviews),
+        (SELECT COUNT(*) FROM study_sessions),
+        (SELECT id FROM study_sessions ORDER BY created_at DESC, id DESC LIMIT 1)
+    ''')
+    conn.execute('DELETE FROM study_days')
+    conn.execute('''
+      INSERT INTO study_days (study_date, session_count)
+      SELECT date(created_at), COUNT(*)
+      FROM study_sessions
+      GROUP BY date(created_at)
+    ''')
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+
+def rebuild_session_rollups(conn):
+  """Recompute the per-session counters and session_words from word_review_items"""
+  conn.execute('BEGIN IMMEDIATE')
+  try:
+    conn.execute(f'UPDATE study_sessions SET {RECOMPUTE_ROLLUPS}')
+    conn.execute('DELETE FROM session_words')
+    cursor = conn.execute('''
+      INSERT INTO session_words (study_session_id, word_id, review_count, correct_count)
+      SELECT
+        study_session_id,
+        word_id,
+        COUNT(*),
+        SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END)
+      FROM word_review_items
+      GROUP BY study_session_id, word_id
+    ''')
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+  return cursor.rowcount
+
+def rebuild_daily_stats(conn):
+  """Recompute the daily stats buckets from the session rollups"""
+  conn.execute('BEGIN IMMEDIATE')
+  try:
+    for table in ('daily_activity_stats', 'daily_group_stats', 'daily_words'):
+      conn.execute(f'DELETE FROM {table}')
+    conn.execute('''
+      INSERT INTO daily_activity_stats (stat_date, study_activity_id, session_count, review_count, correct_count)
+      SELECT date(created_at), study_activity_id, COUNT(*), SUM(review_count), SUM(correct_count)
+      FROM study_sessions
+      GROUP BY date(created_at), study_activity_id
+    ''')
+    conn.execute('''
+      INSERT INTO daily_group_stats (stat_date, group_id, session_count, review_count, correct_count)
+      SELECT date(created_at), group_id, COUNT(*), SUM(review_count), SUM(correct_count)
+      FROM study_sessions
+      GROUP BY date(created_at), group_id
+    ''')
+    cursor = conn.execute('''
+      INSERT INTO daily_words (stat_date, study_activity_id, group_id, word_id, review_count)
+      SELECT date(ss.created_at), ss.study_activity_id, ss.group_id, sw.word_id, SUM(sw.review_count)
+      FROM session_words sw
+      JOIN study_sessions ss ON ss.id = sw.study_session_id
+      GROUP BY date(ss.created_at), ss.study_activity_id, ss.group_id, sw.word_id
+    ''')
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+  return cursor.rowcount
+
+def dashboard_window_stats(conn):
+  """Time-windowed dashboard values that cannot be kept as plain counters.
+
+  Both queries are bounded: active groups scan the last 30 days of
+  study_sessions through idx_study_sessions_created_at, and the streak is
+  computed over study_days (one row per day) rather than all sessions.
+  """
+  active_groups = conn.execute('''
+    SELECT COUNT(DISTINCT group_id)
+    FROM study_sessions
+    WHERE created_at >= date('now', '-30 days')
+  ''').fetchone()[0]
+
+  # Days whose previous study day was exactly one day earlier
+  current_streak = conn.execute('''
+    WITH streak_calc AS (
+      SELECT 
+        study_date,
+        julianday(study_date) - julianday(lag(study_date, 1) over (order by study_date)) as days_diff
+      FROM study_days
+    )
+    SELECT COUNT(*)
+    FROM streak_calc
+    WHERE days_diff = 1 OR days_diff IS NULL
+  ''').fetchone()[0]
+
+  return {'active_groups': active_groups, 'current_streak': current_streak}
@@ -0,0 +1,46 @@
+import unicodedata
+
+# Query side of the words_fts index (migration 0009).
+#
+# User input is never passed to MATCH as is: every term is quoted, so FTS5
+# operators and column filters in it are plain text. The last term is a
+# prefix query (it is usually still being typed), the others match whole
+# tokens. Terms are NFKC normalized (full-width romaji and
+# half-width katakana fold to their usual forms) and kana terms match in
+# both hiragana and katakana, e.g. "こーひー" finds "コーヒー".
+
+MAX_TERMS = 8
+
+# Katakana ァ (U+30A1) to ヶ (U+30F6) sit 0x60 above their hiragana
+KATAKANA_FIRST = 0x30A1
+KATAKANA_LAST = 0x30F6
+KANA_OFFSET = 0x60
+
+def to_hiragana(text):
+  return ''.join(
+    chr(ord(char) - KANA_OFFSET) if KATAKANA_FIRST <= ord(char) <= KATAKANA_LAST else char
+    for char in text
+  )
+
+def to_katakana(text):
+  return ''.join(
+    chr(ord(char) + KANA_OFFSET) if KATAKANA_FIRST <= ord(char) + KANA_OFFSET <= KATAKANA_LAST else char
+    for char in text
+  )
+
+def normalize(text):
+  return unicodedata.normalize('NFKC', text).lower()
+
+def quote(term):
+  return '"' + term.replace('"', '""') + '"'
+
+def match_query(text):
+  """FTS5 MATCH expression for a search box string, None if it has no terms"""
+  terms = normalize(text or '').split()[:MAX_TERMS]
+  clauses = []
+  for index, term in enumerate(terms):
+    variants = list(dict.fromkeys([term, to_hiragana(term), to_katakana(term)]))
+    prefix = '*' if index == len(terms) - 1 else ''
+    clause = ' OR '.join(f'{quote(variant)}{prefix}' for variant in variants)
+    clauses.append(f'({clause})' if len(variants) > 1 else clause)
+  return ' AND '.join(clauses) or None
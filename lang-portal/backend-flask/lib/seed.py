@@ -0,0 +1,129 @@
+import json
+import os
+import time
+from lib.importer import parse_word
+
+# Seeding pipeline used by Db.init and `invoke init-db`. All seed files are
+# loaded in a single transaction with executemany; word ids are assigned
+# here so links can be bulk inserted without a lookup per word, and
+# secondary indexes are built once after the load instead of per row.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETUP_DIR = os.path.join(BASE_DIR, 'sql', 'setup')
+SEED_DIR = os.path.join(BASE_DIR, 'seed')
+
+# Base tables, in creation order
+SETUP_TABLES = [
+  'words',
+  'word_reviews',
+  'word_review_items',
+  'groups',
+  'word_groups',
+  'study_activities',
+  'study_sessions',
+]
+
+DEFAULT_WORD_SEEDS = [
+  ('Core Verbs', os.path.join(SEED_DIR, 'data_verbs.json')),
+  ('Core Adjectives', os.path.join(SEED_DIR, 'data_adjectives.json')),
+]
+DEFAULT_ACTIVITY_SEED = os.path.join(SEED_DIR, 'study_activities.json')
+
+class SeedError(Exception):
+  pass
+
+def load_json(filepath):
+  with open(filepath, 'r', encoding='utf-8') as file:
+    return json.load(file)
+
+def create_tables(conn):
+  for table in SETUP_TABLES:
+    with open(os.path.join(SETUP_DIR, f'create_table_{table}.sql'), 'r') as file:
+      conn.execute(file.read())
+
+def seed_database(conn, word_seeds=None, activities_path=DEFAULT_ACTIVITY_SEED):
+  """Create the base tables and load `word_seeds` ([(group_name, path), ...]).
+
+  Expects an empty words table. Words repeated within or across files are
+  stored once (first occurrence wins) and linked to every group they appear
+  in. Returns row counts and the load rate.
+  """
+  word_seeds = DEFAULT_WORD_SEEDS if word_seeds is None else word_seeds
+  start = time.perf_counter()
+
+  conn.execute('BEGIN IMMEDIATE')
+  try:
+    create_tables(conn)
+    if conn.execute('SELECT EXISTS (SELECT 1 FROM words)').fetchone()[0]:
+      raise SeedError('Database already has words, reset it before seeding')
+
+    # Drop secondary indexes (left behind by migrations if the database was
+    # emptied rather than recreated) and rebuild them after the load
+    indexes = conn.execute('''
+      SELECT name, sql FROM sqlite_master
+      WHERE type = 'index' AND sql IS NOT NULL
+        AND tbl_name IN ('words', 'groups', 'word_groups')
+    ''').fetchall()
+    for index in indexes:
+      conn.execute(f'DROP INDEX {index[0]}')
+
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'words'").fetchone()
+    next_word_id = (row[0] if row else 0) + 1
+
+    word_ids = {}
+    word_rows = []
+    link_rows = []
+    group_counts = []
+    for group_name, path in word_seeds:
+      group_id = conn.execute(
+        'INSERT INTO groups (name, words_count) VALUES (?, 0)', (group_name,)
+      ).lastrowid
+      linked = set()
+      for item in load_json(path):
+        word = parse_word(item)
+        word_id = word_ids.get(word[:3])
+        if word_id is None:
+          word_id = word_ids[word[:3]] = next_word_id
+          next_word_id += 1
+          word_rows.append((word_id, *word))
+        if word_id not in linked:
+          linked.add(word_id)
+          link_rows.append((word_id, group_id))
+      group_counts.append((len(linked), group_id))
+
+    conn.executemany(
+      'INSERT INTO words (id, kanji, romaji, english, parts) VALUES (?, ?, ?, ?, ?)',
+      word_rows
+    )
+    conn.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', link_rows)
+    conn.executemany('UPDATE groups SET words_count = ? WHERE id = ?', group_counts)
+
+    activity_rows = []
+    has_activities = conn.execute('SELECT EXISTS (SELECT 1 FROM study_activities)').fetchone()[0]
+    if activities_path and not has_activities:
+      activity_rows = [
+        (activity['name'], activity['url'], activity['preview_url'])
+        for activity in load_json(activities_path)
+      ]
+      conn.executemany(
+        'INSERT INTO study_activities (name, url, preview_url) VALUES (?, ?, ?)',
+        activity_rows
+      )
+
+    for index in indexes:
+      conn.execute(index[1])
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+
+  elapsed = time.perf_counter() - start
+  rows = len(word_rows) + len(link_rows) + len(group_counts) + len(activity_rows)
+  return {
+    'words': len(word_rows),
+    'word_groups': len(link_rows),
+    'groups': len(group_counts),
+    'study_activities': len(activity_rows),
+    'seconds': elapsed,
+    'rows_per_sec': rows / elapsed if elapsed else 0.0,
+  }
@@ -0,0 +1,100 @@
+import json
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+  import orjson
+except ImportError:  # pragma: no cover - the stdlib encoder is used instead
+  orjson = None
+
+# Response bodies built from pre-serialized JSON fragments.
+#
+# words.parts holds compact JSON (written by lib/importer.py and
+# normalized by migration 0010), so list endpoints splice it into the
+# output as is instead of parsing every row with json.loads and encoding
+# it again. Everything else is encoded with orjson when it is installed,
+# both here and for jsonify() through OrjsonProvider.
+
+# words.parts as a JSON fragment. Rows written by other tools may not hold
+# JSON; those are served as a JSON string (checked by SQLite, not Python).
+PARTS_FRAGMENT = "CASE WHEN json_valid({column}) THEN {column} ELSE json_quote({column}) END"
+
+# Dates go through Flask's default() as with the stdlib encoder
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+def parts_fragment(column='w.parts'):
+  return PARTS_FRAGMENT.format(column=column)
+
+def compact(value):
+  """Compact JSON text, the form word parts are stored in"""
+  return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+def dumps(value):
+  if orjson is not None:
+    return orjson.dumps(value, default=DefaultJSONProvider.default, option=ORJSON_OPTIONS)
+  return json.dumps(
+    value, separators=(',', ':'), ensure_ascii=False, default=DefaultJSONProvider.default
+  ).encode()
+
+class OrjsonProvider(DefaultJSONProvider):
+  """Flask JSON provider encoding with orjson, set up by create_app.
+
+  Output matches the default provider (sorted keys, indented in debug
+  mode) minus the trailing newline; parsing stays with the stdlib.
+  """
+
+  def dumps(self, obj, **kwargs):
+    if kwargs.get('indent') or kwargs.get('cls'):
+      return super().dumps(obj, **kwargs)
+    return self.encode(obj).decode()
+
+  def encode(self, obj):
+    option = ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+    return orjson.dumps(obj, default=self.default, option=option)
+
+  def response(self, *args, **kwargs):
+    obj = self._prepare_response_obj(args, kwargs)
+    if (self.compact is None and self._app.debug) or self.compact is False:
+      return super().response(obj)
+    return self._app.response_class(self.encode(obj), mimetype=self.mimetype)
+
+JSON_PROVIDERS = {
+  'default': DefaultJSONProvider,
+  'orjson': OrjsonProvider,
+}
+
+def json_provider(name):
+  """Provider class for the JSON_PROVIDER setting; orjson falls back to default if missing"""
+  if name == 'orjson' and orjson is None:
+    name = 'default'
+  return JSON_PROVIDERS[name]
+
+def row_mapper(columns, fields):
+  """Build a function turning rows into dicts by column index.
+
+  `columns` are the result columns in order (cursor.description names or
+  sqlite3.Row.keys()), `fields` maps output keys to column names. The
+  positions are resolved once, so each row costs one index per field
+  instead of a by-name sqlite3.Row lookup.
+  """
+  positions = {column: index for index, column in enumerate(columns)}
+  getters = [(key, positions[column]) for key, column in fields.items()]
+  return lambda row: {key: row[index] for key, index in getters}
+
+def splice(obj, **fragments):
+  """Encode the dict `obj` and add each fragment (JSON text or bytes) as a field"""
+  body = dumps(obj)
+  if not fragments:
+    return body
+  fields = b','.join(
+    dumps(key) + b':' + (fragment.encode() if isinstance(fragment, str) else fragment)
+    for key, fragment in fragments.items()
+  )
+  return body[:-1] + (b',' if len(body) > 2 else b'') + fields + b'}'
+
+def array(items):
+  """JSON array of already encoded items"""
+  return b'[' + b','.join(items) + b']'
+
+def json_response(body, status=200):
+  return Response(body, status=status, mimetype='application/json')
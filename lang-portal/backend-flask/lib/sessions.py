@@ -0,0 +1,107 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+# Study session lifecycle helpers shared by the session and group routes.
+#
+# A session is open from creation until it is closed explicitly
+# (POST /api/study-sessions/:id/close) or by the SessionSweeper after
+# SESSION_IDLE_TIMEOUT_MINUTES without reviews. review_count, correct_count
+# and last_activity_at are kept current by triggers (migration 0006) and
+# recomputed from word_review_items when the session is closed.
+
+logger = logging.getLogger(__name__)
+
+# End time reported for a session that was never closed and has no reviews
+FALLBACK_DURATION = timedelta(minutes=30)
+
+# Recompute the rollup columns of a session row from the raw review items
+RECOMPUTE_ROLLUPS = '''
+  review_count = (
+    SELECT COUNT(*) FROM word_review_items WHERE study_session_id = study_sessions.id
+  ),
+  correct_count = (
+    SELECT COUNT(*) FROM word_review_items WHERE study_session_id = study_sessions.id AND correct = 1
+  ),
+  last_activity_at = (
+    SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = study_sessions.id
+  )
+'''
+
+def fallback_end_time(start_time):
+  """start_time + FALLBACK_DURATION, in SQLite's DATETIME text format"""
+  if not start_time:
+    return start_time
+  return (datetime.fromisoformat(start_time) + FALLBACK_DURATION).strftime('%Y-%m-%d %H:%M:%S')
+
+def session_end_time(session):
+  """End time of a session row: when it was closed, else its last review"""
+  return session['ended_at'] or session['last_activity_at'] or fallback_end_time(session['created_at'])
+
+def close_session(cursor, session_id):
+  """Close an open session and persist its rollups (inside a write transaction).
+
+  Returns False if the session does not exist or was already closed.
+  """
+  cursor.execute(f'''
+    UPDATE study_sessions
+    SET
+      {RECOMPUTE_ROLLUPS},
+      ended_at = CURRENT_TIMESTAMP
+    WHERE id = ? AND ended_at IS NULL
+  ''', (session_id,))
+  return cursor.rowcount > 0
+
+def close_idle_sessions(cursor, idle_minutes):
+  """Close every open session idle for `idle_minutes`; it ends at its last review"""
+  cursor.execute(f'''
+    UPDATE study_sessions
+    SET
+      {RECOMPUTE_ROLLUPS},
+      ended_at = COALESCE(
+        (SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = study_sessions.id),
+        created_at
+      )
+    WHERE ended_at IS NULL
+      AND COALESCE(last_activity_at, created_at) < datetime('now', ?)
+  ''', (f'-{int(idle_minutes)} minutes',))
+  return cursor.rowcount
+
+class SessionSweeper:
+  """Background thread closing idle sessions every `interval` seconds"""
+
+  def __init__(self, db, interval=300, idle_minutes=30, on_sweep=None):
+    self.db = db
+    self.interval = interval
+    self.idle_minutes = idle_minutes
+    self.on_sweep = on_sweep
+    self._stop = threading.Event()
+    self._thread = None
+
+  def sweep(self):
+    with self.db.writer() as cursor:
+      closed = close_idle_sessions(cursor, self.idle_minutes)
+    if closed:
+      logger.info(f"Closed {closed} idle study sessions")
+      if self.on_sweep:
+        self.on_sweep(closed)
+    return closed
+
+  def run(self):
+    while not self._stop.wait(self.interval):
+      try:
+        self.sweep()
+      except Exception as e:
+        logger.error(f"Session sweep failed: {str(e)}", exc_info=True)
+
+  def start(self):
+    if self._thread is None:
+      self._thread = threading.Thread(target=self.run, name='session-sweeper', daemon=True)
+      self._thread.start()
+    return self
+
+  def stop(self):
+    self._stop.set()
+    if self._thread is not None:
+      self._thread.join()
+      self._thread = None
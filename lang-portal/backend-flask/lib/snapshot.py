@@ -0,0 +1,183 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from lib.pool import ConnectionPool, PoolTimeout
+
+# Read-only snapshot of the database for the analytics endpoints.
+#
+# The stats routes read wide ranges of the rollup tables and compete with
+# review writes for the same file. In snapshot mode (DB_SNAPSHOT) a
+# background thread copies the database every DB_SNAPSHOT_INTERVAL seconds
+# with the SQLite backup API and those routes read the copy instead
+# (Db.analytics_cursor). A copy is made in a single backup step, i.e. inside
+# one read transaction of the source, so it is consistent; under WAL that
+# read transaction does not block the writer lane. The copy is written to a
+# temporary file of the process next to the snapshot and renamed over it,
+# so several workers can take copies at once; readers open it immutable:
+# connections still reading the previous copy keep their file until they
+# are released.
+#
+# A snapshot older than DB_SNAPSHOT_MAX_AGE seconds (the staleness window)
+# is not used: reads fall back to the live database until the next copy.
+
+logger = logging.getLogger(__name__)
+
+# The copy is never written to, so no journal and no locking
+SNAPSHOT_PRAGMAS = {
+  'journal_mode': None,
+  'synchronous': None,
+  'query_only': 1,
+}
+
+class SnapshotReplica:
+  """Periodic backup-API copy of `db` at `path`, with its own reader pool"""
+
+  def __init__(self, db, path, interval=30, max_age=120, pool_size=8, pool_timeout=20, pragmas=None):
+    self.db = db
+    self.path = path
+    self.interval = interval
+    self.max_age = max_age
+    self.pool_size = pool_size
+    self.pool_timeout = pool_timeout
+    self.pragmas = dict(pragmas or {})
+    self.pragmas.update(SNAPSHOT_PRAGMAS)
+    self.pool = None
+    self.taken_at = None  # time.monotonic() of the current copy
+    self._lock = threading.Lock()
+    self._refresh_lock = threading.Lock()
+    self._stop = threading.Event()
+    self._thread = None
+    self._stats = {
+      'copies': 0,
+      'failures': 0,
+      'reads': 0,
+      'fallbacks': 0,
+      'last_copy_seconds': None,
+      'max_copy_seconds': 0.0,
+      'total_copy_seconds': 0.0,
+      'pages': None,
+    }
+
+  def age(self):
+    """Seconds since the current copy was taken, None before the first one"""
+    with self._lock:
+      return None if self.taken_at is None else time.monotonic() - self.taken_at
+
+  def refresh(self):
+    """Copy the database now and switch readers to the new copy"""
+    with self._refresh_lock:
+      # A temporary file of this process only: with several workers every
+      # process takes its own copies, and each rename is atomic
+      fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(self.path)),
+        prefix=f'{os.path.basename(self.path)}.',
+        suffix='.tmp'
+      )
+      os.close(fd)
+      start = time.perf_counter()
+      try:
+        target = sqlite3.connect(tmp)
+        try:
+          with self.db.pool.connection() as source:
+            # The copy shows the database as of the start of the backup
+            taken_at = time.monotonic()
+            source.backup(target)
+          # The copy inherits WAL from the source; a standalone file is
+          # wanted, and the page count comes for free while it is open
+          target.execute('PRAGMA journal_mode = DELETE')
+          pages = target.execute('PRAGMA page_count').fetchone()[0]
+        finally:
+          target.close()
+        os.replace(tmp, self.path)
+      except Exception:
+        if os.path.exists(tmp):
+          os.remove(tmp)
+        with self._lock:
+          self._stats['failures'] += 1
+        raise
+      elapsed = time.perf_counter() - start
+
+      pool = ConnectionPool(
+        f'file:{self.path}?mode=ro&immutable=1',
+        size=self.pool_size,
+        timeout=self.pool_timeout,
+        pragmas=self.pragmas,
+        uri=True
+      )
+      with self._lock:
+        previous, self.pool = self.pool, pool
+        self.taken_at = taken_at
+        self._stats['copies'] += 1
+        self._stats['pages'] = pages
+        self._stats['last_copy_seconds'] = elapsed
+        self._stats['max_copy_seconds'] = max(self._stats['max_copy_seconds'], elapsed)
+        self._stats['total_copy_seconds'] += elapsed
+    if previous is not None:
+      # Connections still checked out are closed when they are released
+      previous.close()
+    logger.debug(f"Database snapshot taken in {elapsed * 1000:.1f} ms ({pages} pages)")
+    return elapsed
+
+  def acquire(self):
+    """A connection to a fresh enough copy as (pool, conn), or None"""
+    with self._lock:
+      pool = self.pool
+      fresh = (pool is not None and self.taken_at is not None
+               and time.monotonic() - self.taken_at <= self.max_age)
+      self._stats['reads' if fresh else 'fallbacks'] += 1
+    if not fresh:
+      return None
+    try:
+      return pool, pool.acquire()
+    except PoolTimeout:
+      # Closed by a refresh meanwhile, or busy: the live database will do
+      with self._lock:
+        self._stats['reads'] -= 1
+        self._stats['fallbacks'] += 1
+      return None
+
+  def run(self):
+    while not self._stop.wait(self.interval):
+      try:
+        self.refresh()
+      except Exception as e:
+        logger.error(f"Database snapshot failed: {str(e)}", exc_info=True)
+
+  def start(self):
+    if self._thread is None:
+      self._thread = threading.Thread(target=self.run, name='db-snapshot', daemon=True)
+      self._thread.start()
+    return self
+
+  def stop(self):
+    self._stop.set()
+    if self._thread is not None:
+      self._thread.join()
+      self._thread = None
+
+  def close(self):
+    self.stop()
+    with self._lock:
+      pool, self.pool = self.pool, None
+      self.taken_at = None
+    if pool is not None:
+      pool.close()
+
+  def stats(self):
+    age = self.age()
+    with self._lock:
+      stats = dict(self._stats)
+      pool = self.pool
+    stats.update({
+      'path': self.path,
+      'interval': self.interval,
+      'max_age': self.max_age,
+      'age_seconds': age,
+      'fresh': age is not None and age <= self.max_age,
+      'avg_copy_seconds': stats['total_copy_seconds'] / stats['copies'] if stats['copies'] else 0.0,
+      'pool': pool.stats() if pool is not None else None,
+    })
+    return stats
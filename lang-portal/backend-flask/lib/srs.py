@@ -0,0 +1,90 @@
+import math
+from datetime import datetime, timedelta
+
+# Spaced repetition (SM-2) for the per-group word schedules.
+#
+# word_schedules is updated by the trg_word_schedules_review trigger
+# (migration 0008) on every review; the functions below are the
+# same algorithm in Python, used to replay the review history when the
+# schedules have to be rebuilt. Keep the two in sync.
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+# 100 years; keeps due dates inside what SQLite's datetime() can represent
+MAX_INTERVAL_DAYS = 36500
+
+# Reviews are pass/fail, graded as SM-2 qualities 4 and 2. The E-Factor
+# change for quality q is 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02).
+CORRECT_EASE_DELTA = 0.0
+WRONG_EASE_DELTA = -0.32
+
+DEFAULT_DUE_LIMIT = 10
+MAX_DUE_LIMIT = 100
+
+def initial_state():
+  return {'ease': INITIAL_EASE, 'interval_days': 0, 'repetitions': 0, 'lapses': 0, 'last_reviewed_at': None}
+
+def next_state(state, correct, reviewed_at):
+  """Schedule after one review; reviewed_at is a SQLite DATETIME string"""
+  if correct:
+    if state['repetitions'] == 0:
+      interval = 1
+    elif state['repetitions'] == 1:
+      interval = 6
+    else:
+      # ROUND() in SQLite rounds half away from zero
+      interval = min(MAX_INTERVAL_DAYS, int(math.floor(state['interval_days'] * state['ease'] + 0.5)))
+    ease = state['ease'] + CORRECT_EASE_DELTA
+    repetitions = state['repetitions'] + 1
+    lapses = state['lapses']
+  else:
+    interval = 1
+    ease = max(MIN_EASE, state['ease'] + WRONG_EASE_DELTA)
+    repetitions = 0
+    lapses = state['lapses'] + 1
+  return {
+    'ease': ease,
+    'interval_days': interval,
+    'repetitions': repetitions,
+    'lapses': lapses,
+    'last_reviewed_at': reviewed_at,
+  }
+
+def due_at(state):
+  reviewed = datetime.fromisoformat(state['last_reviewed_at'])
+  return (reviewed + timedelta(days=state['interval_days'])).strftime('%Y-%m-%d %H:%M:%S')
+
+def rebuild_word_schedules(conn):
+  """Reset word_schedules from word_groups and replay every review into it"""
+  conn.execute('BEGIN IMMEDIATE')
+  try:
+    conn.execute('DELETE FROM word_schedules')
+    conn.execute('''
+      INSERT INTO word_schedules (group_id, word_id)
+      SELECT DISTINCT group_id, word_id FROM word_groups
+    ''')
+    states = {}
+    reviews = conn.execute('''
+      SELECT ss.group_id, wri.word_id, wri.correct, wri.created_at
+      FROM word_review_items wri
+      JOIN study_sessions ss ON ss.id = wri.study_session_id
+      JOIN word_groups wg ON wg.group_id = ss.group_id AND wg.word_id = wri.word_id
+      ORDER BY wri.id
+    ''')
+    for group_id, word_id, correct, created_at in reviews:
+      key = (group_id, word_id)
+      states[key] = next_state(states.get(key) or initial_state(), correct == 1, created_at)
+    conn.executemany('''
+      UPDATE word_schedules
+      SET ease = ?, interval_days = ?, repetitions = ?, lapses = ?, last_reviewed_at = ?, due_at = ?
+      WHERE group_id = ? AND word_id = ?
+    ''', [
+      (s['ease'], s['interval_days'], s['repetitions'], s['lapses'], s['last_reviewed_at'], due_at(s),
+       group_id, word_id)
+      for (group_id, word_id), s in states.items()
+    ])
+    conn.commit()
+  except Exception:
+    conn.rollback()
+    raise
+  return len(states)
@@ -1,31 +1,44 @@
 import sqlite3
-import os
+import sys
 
-def run_migrations():
+from config import Config
+from lib.migrations import apply_migrations, list_migrations, applied_versions
+
+def run_migrations(db_path=None):
     # Connect to the database
-    db_path = os.path.join(os.path.dirname(__file__), 'word_bank.db')
+    db_path = db_path or Config.DATABASE
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     
     try:
-        # Get list of migration files
-        migrations_dir = os.path.join(os.path.dirname(__file__), 'sql', 'migrations')
-        migration_files = sorted([f for f in os.listdir(migrations_dir) if f.endswith('.sql')])
-        
-        # Run each migration
-        for migration_file in migration_files:
-            print(f"Running migration: {migration_file}")
-            with open(os.path.join(migrations_dir, migration_file)) as f:
-                migration_sql = f.read()
-                conn.executescript(migration_sql)
-                conn.commit()
-        
-        print("Migrations completed successfully")
+        # Only pending migrations are executed; applied versions are
+        # tracked in the schema_migrations table
+        applied = apply_migrations(conn)
+        for migration in applied:
+            print(f"Applied migration: {migration}")
+        if not applied:
+            print("Database schema is up to date")
+        else:
+            print("Migrations completed successfully")
     except Exception as e:
         print(f"Error running migrations: {str(e)}")
-        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def print_status(db_path=None):
+    db_path = db_path or Config.DATABASE
+    conn = sqlite3.connect(db_path)
+    try:
+        applied = applied_versions(conn)
+        for version, name, _ in list_migrations():
+            state = 'applied' if version in applied else 'pending'
+            print(f"{version}_{name}: {state}")
     finally:
         conn.close()
 
 if __name__ == '__main__':
-    run_migrations()
+    if '--status' in sys.argv:
+        print_status()
+    else:
+        run_migrations()
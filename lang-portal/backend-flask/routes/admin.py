@@ -0,0 +1,85 @@
+from flask import jsonify, request
+from routes.jobs import accepted
+
+def load(app):
+    @app.route('/api/admin/db/pool', methods=['GET'])
+    def get_db_pool_stats():
+        app.logger.info("Route hit: /api/admin/db/pool GET")
+        try:
+            return jsonify(app.db.stats())
+        except Exception as e:
+            app.logger.error(f"Error getting pool stats: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/admin/db/snapshot', methods=['GET'])
+    def get_db_snapshot_stats():
+        app.logger.info("Route hit: /api/admin/db/snapshot GET")
+        try:
+            if not app.db.snapshot:
+                return jsonify({"error": "Snapshot mode is disabled"}), 404
+            if request.args.get('refresh') == 'true':
+                app.db.snapshot.refresh()
+            return jsonify(app.db.snapshot.stats())
+        except Exception as e:
+            app.logger.error(f"Error getting snapshot stats: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/admin/cache', methods=['GET'])
+    def get_cache_stats():
+        app.logger.info("Route hit: /api/admin/cache GET")
+        try:
+            return jsonify(app.cache.stats())
+        except Exception as e:
+            app.logger.error(f"Error getting cache stats: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/admin/queries', methods=['GET'])
+    def get_query_stats():
+        app.logger.info("Route hit: /api/admin/queries GET")
+        try:
+            if not app.db.profiler:
+                return jsonify({"error": "Query profiling is disabled"}), 404
+            limit = request.args.get('limit', 20, type=int)
+            return jsonify(app.db.profiler.stats(limit=limit))
+        except Exception as e:
+            app.logger.error(f"Error getting query stats: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/admin/queries', methods=['DELETE'])
+    def reset_query_stats():
+        app.logger.info("Route hit: /api/admin/queries DELETE")
+        if not app.db.profiler:
+            return jsonify({"error": "Query profiling is disabled"}), 404
+        app.db.profiler.reset()
+        return '', 204
+
+    @app.route('/api/admin/cors', methods=['GET'])
+    def get_cors_origins():
+        app.logger.info("Route hit: /api/admin/cors GET")
+        try:
+            if request.args.get('refresh') == 'true':
+                app.cors.refresh()
+            return jsonify(app.cors.stats())
+        except Exception as e:
+            app.logger.error(f"Error getting CORS origins: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/admin/groups/membership', methods=['GET'])
+    def get_group_membership_stats():
+        app.logger.info("Route hit: /api/admin/groups/membership GET")
+        try:
+            if request.args.get('refresh') == 'true':
+                app.membership.refresh()
+            return jsonify(app.membership.stats())
+        except Exception as e:
+            app.logger.error(f"Error getting group membership stats: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/admin/groups/recount', methods=['POST'])
+    def recount_group_words():
+        app.logger.info("Route hit: /api/admin/groups/recount POST")
+        try:
+            return accepted(app.jobs.submit('recount_words_count'))
+        except Exception as e:
+            app.logger.error(f"Error queuing words_count recount: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
@@ -1,30 +1,45 @@
 from flask import jsonify, request
-from flask_cors import cross_origin
 from datetime import datetime, timedelta
+import threading
+import time
+from lib.rollups import dashboard_window_stats
 
 def load(app):
+    # active_groups and current_streak depend on the current date, so they
+    # are recomputed at most once per DASHBOARD_WINDOW_MAX_AGE seconds
+    # instead of being maintained by triggers.
+    window_cache = {'value': None, 'refreshed_at': 0.0}
+    window_lock = threading.Lock()
+
+    def get_window_stats(conn):
+        max_age = app.config['DASHBOARD_WINDOW_MAX_AGE']
+        with window_lock:
+            age = time.monotonic() - window_cache['refreshed_at']
+            if window_cache['value'] is None or age > max_age:
+                window_cache['value'] = dashboard_window_stats(conn)
+                window_cache['refreshed_at'] = time.monotonic()
+            return window_cache['value']
+
     @app.route('/api/dashboard/recent-session', methods=['GET'])
-    @cross_origin()
     def get_recent_session():
         app.logger.info("Route hit: /api/dashboard/recent-session GET")
         try:
             cursor = app.db.cursor()
             
-            # Get the most recent study session with activity name and results
+            # The most recent session id is maintained in dashboard_stats and
+            # its results in the study_sessions rollups (migration 0006)
             cursor.execute('''
                 SELECT 
                     ss.id,
                     ss.group_id,
                     sa.name as activity_name,
                     ss.created_at,
-                    COUNT(CASE WHEN wri.correct = 1 THEN 1 END) as correct_count,
-                    COUNT(CASE WHEN wri.correct = 0 THEN 1 END) as wrong_count
-                FROM study_sessions ss
+                    ss.correct_count,
+                    ss.review_count - ss.correct_count as wrong_count
+                FROM dashboard_stats ds
+                JOIN study_sessions ss ON ss.id = ds.last_session_id
                 JOIN study_activities sa ON ss.study_activity_id = sa.id
-                LEFT JOIN word_review_items wri ON ss.id = wri.study_session_id
-                GROUP BY ss.id
-                ORDER BY ss.created_at DESC
-                LIMIT 1
+                WHERE ds.id = 1
             ''')
             
             session = cursor.fetchone()
@@ -46,117 +61,35 @@ def load(app):
             return jsonify({"error": str(e)}), 500
 
     @app.route('/api/dashboard/stats', methods=['GET'])
-    @cross_origin()
     def get_study_stats():
         app.logger.info("Route hit: /api/dashboard/stats GET")
         try:
-            cursor = app.db.cursor()
-            
-            # Get total vocabulary count
-            cursor.execute('SELECT COUNT(*) as total_vocabulary FROM words')
-            total_vocabulary = cursor.fetchone()["total_vocabulary"]
+            # Served from the database snapshot in snapshot mode
+            cursor = app.db.analytics_cursor()
+            
+            # Counters are kept up to date by triggers (see
+            # sql/migrations/0003_dashboard_stats.sql)
+            cursor.execute('SELECT * FROM dashboard_stats WHERE id = 1')
+            stats = cursor.fetchone()
+            if not stats:
+                app.logger.error("dashboard_stats is empty, run `invoke rebuild-dashboard-stats`")
+                return jsonify({"error": "Dashboard statistics are not available"}), 500
 
-            # Get total unique words studied
-            cursor.execute('''
-                SELECT COUNT(DISTINCT word_id) as total_words
-                FROM word_review_items wri
-                JOIN study_sessions ss ON wri.study_session_id = ss.id
-            ''')
-            total_words = cursor.fetchone()["total_words"]
-            
-            # Get mastered words (words with >80% success rate and at least 5 attempts)
-            cursor.execute('''
-                WITH word_stats AS (
-                    SELECT 
-                        word_id,
-                        COUNT(*) as total_attempts,
-                        SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) * 1.0 / COUNT(*) as success_rate
-                    FROM word_review_items wri
-                    JOIN study_sessions ss ON wri.study_session_id = ss.id
-                    GROUP BY word_id
-                    HAVING total_attempts >= 5
-                )
-                SELECT COUNT(*) as mastered_words
-                FROM word_stats
-                WHERE success_rate >= 0.8
-            ''')
-            mastered_words = cursor.fetchone()["mastered_words"]
-            
             # Get overall success rate
-            cursor.execute('''
-                SELECT 
-                    SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) * 1.0 / COUNT(*) as success_rate
-                FROM word_review_items wri
-                JOIN study_sessions ss ON wri.study_session_id = ss.id
-            ''')
-            success_rate = cursor.fetchone()["success_rate"] or 0
-            
-            # Get total number of study sessions
-            cursor.execute('SELECT COUNT(*) as total_sessions FROM study_sessions')
-            total_sessions = cursor.fetchone()["total_sessions"]
-            
-            # Get number of groups with activity in the last 30 days
-            cursor.execute('''
-                SELECT COUNT(DISTINCT group_id) as active_groups
-                FROM study_sessions
-                WHERE created_at >= date('now', '-30 days')
-            ''')
-            active_groups = cursor.fetchone()["active_groups"]
-            
-            # Calculate current streak (consecutive days with at least one study session)
-            cursor.execute('''
-                WITH daily_sessions AS (
-                    SELECT 
-                        date(created_at) as study_date,
-                        COUNT(*) as session_count
-                    FROM study_sessions
-                    GROUP BY date(created_at)
-                ),
-                streak_calc AS (
-                    SELECT 
-                        study_date,
-                        julianday(study_date) - julianday(lag(study_date, 1) over (order by study_date)) as days_diff
-                    FROM daily_sessions
-                )
-                SELECT COUNT(*) as streak
-                FROM (
-                    SELECT study_date
-                    FROM streak_calc
-                    WHERE days_diff = 1 OR days_diff IS NULL
-                    ORDER BY study_date DESC
-                )
-            ''')
-            current_streak = cursor.fetchone()["streak"]
-            
-            # # Get top performing groups
-            # cursor.execute('''
-            #     SELECT 
-            #         g.id,
-            #         g.name,
-            #         COUNT(DISTINCT ss.id) as session_count,
-            #         COUNT(DISTINCT wri.word_id) as words_studied,
-            #         COALESCE(SUM(CASE WHEN wri.correct = 1 THEN 1 END), 0) as correct_count,
-            #         COALESCE(SUM(CASE WHEN wri.correct = 0 THEN 1 END), 0) as wrong_count
-            #     FROM groups g
-            #     LEFT JOIN study_sessions ss ON g.id = ss.group_id
-            #     LEFT JOIN word_review_items wri ON ss.id = wri.study_session_id
-            #     GROUP BY g.id, g.name
-            #     ORDER BY correct_count DESC
-            #     LIMIT 5
-            # ''')
-            
-            # top_groups = cursor.fetchone()["top_groups"]
-            
+            success_rate = 0
+            if stats["total_reviews"]:
+                success_rate = stats["correct_reviews"] * 1.0 / stats["total_reviews"]
+
+            window_stats = get_window_stats(app.db.analytics())
             
             return jsonify({
-                "total_vocabulary": total_vocabulary,
-                "total_words_studied": total_words,
-                "mastered_words": mastered_words,
+                "total_vocabulary": stats["total_vocabulary"],
+                "total_words_studied": stats["total_words_studied"],
+                "mastered_words": stats["mastered_words"],
                 "success_rate": success_rate,
-                "total_sessions": total_sessions,
-                "active_groups": active_groups,
-                "current_streak": current_streak,
-                # "top_groups": top_groups
+                "total_sessions": stats["total_sessions"],
+                "active_groups": window_stats["active_groups"],
+                "current_streak": window_stats["current_streak"],
             })
             
         except Exception as e:
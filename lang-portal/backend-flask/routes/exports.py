@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+from datetime import date
+from flask import Response, jsonify, request
+
+# Review history export. Rows are read from a dedicated pooled connection
+# in EXPORT_FETCH_SIZE chunks and written out as they arrive, so memory use
+# does not depend on the size of the history.
+
+REVIEW_COLUMNS = [
+    'id', 'created_at', 'correct',
+    'word_id', 'kanji', 'romaji', 'english',
+    'study_session_id', 'session_started_at',
+    'group_id', 'group_name',
+    'study_activity_id', 'activity_name'
+]
+
+REVIEW_EXPORT_SQL = '''
+    SELECT
+        wri.id,
+        wri.created_at,
+        wri.correct,
+        wri.word_id,
+        w.kanji,
+        w.romaji,
+        w.english,
+        wri.study_session_id,
+        ss.created_at as session_started_at,
+        ss.group_id,
+        g.name as group_name,
+        ss.study_activity_id,
+        sa.name as activity_name
+    FROM word_review_items wri
+    JOIN words w ON w.id = wri.word_id
+    JOIN study_sessions ss ON ss.id = wri.study_session_id
+    LEFT JOIN groups g ON g.id = ss.group_id
+    LEFT JOIN study_activities sa ON sa.id = ss.study_activity_id
+    {where}
+    ORDER BY wri.id
+'''
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def review_export_filters(args):
+    """Build the WHERE clause for the export filters; raises ValueError"""
+    conditions = []
+    params = []
+    if args.get('from'):
+        conditions.append('wri.created_at >= ?')
+        params.append(date.fromisoformat(args['from']).isoformat())
+    if args.get('to'):
+        conditions.append("wri.created_at < date(?, '+1 day')")
+        params.append(date.fromisoformat(args['to']).isoformat())
+    for arg, column in (('group_id', 'ss.group_id'),
+                        ('study_activity_id', 'ss.study_activity_id'),
+                        ('study_session_id', 'wri.study_session_id')):
+        if args.get(arg):
+            conditions.append(f'{column} = ?')
+            params.append(int(args[arg]))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return where, params
+
+def iter_rows(pool, sql, params, fetch_size):
+    """Yield result rows fetch_size at a time, holding one connection throughout"""
+    with pool.connection() as conn:
+        cursor = conn.execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+
+def ndjson_chunks(chunks):
+    for rows in chunks:
+        yield ''.join(
+            json.dumps({column: row[column] for column in REVIEW_COLUMNS}, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+def csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REVIEW_COLUMNS)
+    for rows in chunks:
+        writer.writerows(tuple(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def load(app):
+    @app.route('/api/exports/reviews', methods=['GET'])
+    def export_reviews():
+        app.logger.info("Route hit: /api/exports/reviews GET")
+        try:
+            export_format = request.args.get('format', 'ndjson')
+            if export_format not in EXPORT_FORMATS:
+                return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+            try:
+                where, params = review_export_filters(request.args)
+            except ValueError:
+                return jsonify({
+                    "error": "from/to must be dates in YYYY-MM-DD format, ids must be integers"
+                }), 400
+
+            # Nothing below runs until the response body is iterated
+            chunks = iter_rows(
+                app.db.pool,
+                REVIEW_EXPORT_SQL.format(where=where),
+                params,
+                app.config['EXPORT_FETCH_SIZE']
+            )
+            body = ndjson_chunks(chunks) if export_format == 'ndjson' else csv_chunks(chunks)
+            response = Response(body, mimetype=EXPORT_FORMATS[export_format])
+            response.headers['Content-Disposition'] = f'attachment; filename=reviews.{export_format}'
+            return response
+        except Exception as e:
+            app.logger.error(f"Error exporting reviews: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
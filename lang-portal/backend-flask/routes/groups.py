@@ -1,19 +1,22 @@
 from flask import request, jsonify, g
-from flask_cors import cross_origin
 import json
 from lib.db import Db
+from lib.pagination import InvalidCursor, keyset_page, wants_cursor, include_total, page_args
+from routes.jobs import accepted
+from lib.sessions import fallback_end_time
+from lib.serialization import array, json_response, parts_fragment, splice
+from lib.srs import DEFAULT_DUE_LIMIT, MAX_DUE_LIMIT
 
 def load(app):
   @app.route('/api/groups', methods=['GET'])
-  @cross_origin()
+  @app.cache.cached('groups')
   def get_groups():
     app.logger.info(f"Route hit: /api/groups GET")
     try:
       cursor = app.db.cursor()
 
       # Get the current page number from query parameters (default is 1)
-      page = int(request.args.get('page', 1))
-      groups_per_page = int(request.args.get('per_page', 10))
+      page, groups_per_page = page_args(request.args)
       offset = (page - 1) * groups_per_page
       app.logger.debug(f"Pagination params: page={page}, {groups_per_page}, Offset: {offset}")
 
@@ -28,20 +31,35 @@ def load(app):
       if order not in ['asc', 'desc']:
         order = 'asc'
 
+      use_cursor = wants_cursor(request.args)
+      with_total = include_total(request.args, default=not use_cursor)
+
       # Query to fetch groups with sorting and the cached word count
-      cursor.execute(f'''
-        SELECT id, name, words_count
-        FROM groups
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (groups_per_page, offset))
+      next_cursor = None
+      prev_cursor = None
+      if use_cursor:
+        groups, next_cursor, prev_cursor = keyset_page(
+          cursor,
+          f'SELECT id, name, words_count, {sort_by} as sort_key FROM groups',
+          [], sort_by, order, groups_per_page,
+          token=request.args.get('cursor')
+        )
+      else:
+        cursor.execute(f'''
+          SELECT id, name, words_count
+          FROM groups
+          ORDER BY {sort_by} {order}
+          LIMIT ? OFFSET ?
+        ''', (groups_per_page, offset))
 
-      groups = cursor.fetchall()
+        groups = cursor.fetchall()
 
       # Query the total number of groups
-      cursor.execute('SELECT COUNT(*) as count FROM groups')
-      total_groups = cursor.fetchone()['count']
-      total_pages = (total_groups + groups_per_page - 1) // groups_per_page
+      total_pages = None
+      if with_total:
+        cursor.execute('SELECT COUNT(*) as count FROM groups')
+        total_groups = cursor.fetchone()['count']
+        total_pages = (total_groups + groups_per_page - 1) // groups_per_page
 
       # Format the response
       groups_data = []
@@ -56,14 +74,17 @@ def load(app):
       return jsonify({
         'groups': groups_data,
         'total_pages': total_pages,
-        'current_page': page
+        'current_page': page,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
       })
+    except InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
     except Exception as e:
       app.logger.error(f"Error getting groups: {str(e)}", exc_info=True)
       return jsonify({"error": str(e)}), 500
     
   @app.route('/api/groups', methods=['POST'])
-  @cross_origin()
   def create_group():
     app.logger.info("Route hit: /api/groups POST")
     try:
@@ -73,15 +94,17 @@ def load(app):
       if not data or 'name' not in data:
         return jsonify({"error": "Name is required"}), 400
       
-      cursor = app.db.cursor()
-      
-      cursor.execute('''
-        INSERT INTO groups (name, words_count)
-        VALUES (?, 0)
-      ''', (data['name'],))
-      
-      app.db.commit()
-      group_id = cursor.lastrowid
+      with app.db.writer() as cursor:
+        changes = app.membership.changes(cursor)
+        cursor.execute('''
+          INSERT INTO groups (name, words_count)
+          VALUES (?, 0)
+        ''', (data['name'],))
+        group_id = cursor.lastrowid
+        changes.set_group(group_id, data['name'], ())
+        changes.seal(cursor)
+      app.cache.bump('groups')
+      app.membership.apply(changes)
       
       return jsonify({
         "id": group_id,
@@ -94,7 +117,6 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/groups/<int:group_id>', methods=['PUT'])
-  @cross_origin()
   def update_group(group_id):
     app.logger.info(f"Route hit: /api/groups/{group_id} PUT")
     try:
@@ -127,16 +149,17 @@ def load(app):
         app.logger.warning(f"Group name already exists: {data['name']}")
         return jsonify({"error": "Group name already exists"}), 409
                 
-      try:
-        # Start transaction
-        cursor.execute('BEGIN')
-                
+      with app.db.writer() as cursor:
+        changes = app.membership.changes(cursor)
         # Update group
         cursor.execute('''
           UPDATE groups 
           SET name = ?
           WHERE id = ?
         ''', (data['name'], group_id))
+        if cursor.rowcount:
+          changes.rename_group(group_id, data['name'])
+        changes.seal(cursor)
                 
         # Get updated group
         cursor.execute('''
@@ -151,21 +174,17 @@ def load(app):
         ''', (group_id,))
                 
         group = cursor.fetchone()
-        app.db.commit()
-                
-        app.logger.info(f"Updated group: {group_id}")
-        return jsonify({'group': dict(group)})
+      app.cache.bump('groups')
+      app.membership.apply(changes)
                 
-      except Exception as e:
-        app.db.get().rollback()
-        raise e
+      app.logger.info(f"Updated group: {group_id}")
+      return jsonify({'group': dict(group)})
                 
     except Exception as e:
       app.logger.error(f"Error updating group: {str(e)}", exc_info=True)
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/groups/<int:group_id>', methods=['DELETE'])
-  @cross_origin()
   def delete_group(group_id):
     app.logger.info(f"Route hit: /api/groups/{group_id} DELETE")
     try:
@@ -177,25 +196,10 @@ def load(app):
         app.logger.warning(f"Group not found: {group_id}")
         return jsonify({"error": "Group not found"}), 404
                 
-      try:
-        # Start transaction
-        cursor.execute('BEGIN')
-                
-        # Delete related records first
-        cursor.execute('DELETE FROM word_groups WHERE group_id = ?', (group_id,))
-        cursor.execute('DELETE FROM study_sessions WHERE group_id = ?', (group_id,))
-                
-        # Delete group
-        cursor.execute('DELETE FROM groups WHERE id = ?', (group_id,))
-                
-        app.db.commit()
-                
-        app.logger.info(f"Deleted group: {group_id}")
-        return '', 204
-                
-      except Exception as e:
-        app.db.get().rollback()
-        raise e
+      # The group, its links and sessions are deleted in batches by a job
+      job = app.jobs.submit('delete_group', {'group_id': group_id})
+      app.logger.info(f"Queued delete of group {group_id}: job {job['id']}")
+      return accepted(job)
                 
     except Exception as e:
       app.logger.error(f"Error deleting group: {str(e)}", exc_info=True)
@@ -203,7 +207,7 @@ def load(app):
 
 
   @app.route('/api/groups/<int:group_id>', methods=['GET'])
-  @cross_origin()
+  @app.cache.cached('groups')
   def get_group(group_id):
     try:
       cursor = app.db.cursor()
@@ -228,13 +232,12 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/groups/<int:id>/words', methods=['GET'])
-  @cross_origin()
   def get_group_words(id):
     try:
       cursor = app.db.cursor()
       
       # Get pagination parameters
-      page = int(request.args.get('page', 1))
+      page = max(1, request.args.get('page', 1, type=int))
       words_per_page = 10
       offset = (page - 1) * words_per_page
 
@@ -243,12 +246,21 @@ def load(app):
       order = request.args.get('order', 'asc')
 
       # Validate sort parameters
-      valid_columns = ['kanji', 'romaji', 'english', 'correct_count', 'wrong_count']
+      valid_columns = {
+        'kanji': 'w.kanji',
+        'romaji': 'w.romaji',
+        'english': 'w.english',
+        'correct_count': 'COALESCE(wr.correct_count, 0)',
+        'wrong_count': 'COALESCE(wr.wrong_count, 0)'
+      }
       if sort_by not in valid_columns:
         sort_by = 'kanji'
       if order not in ['asc', 'desc']:
         order = 'asc'
 
+      use_cursor = wants_cursor(request.args)
+      with_total = include_total(request.args, default=not use_cursor)
+
       # First, check if the group exists
       cursor.execute('SELECT name FROM groups WHERE id = ?', (id,))
       group = cursor.fetchone()
@@ -256,28 +268,49 @@ def load(app):
         return jsonify({"error": "Group not found"}), 404
 
       # Query to fetch words with pagination and sorting
-      cursor.execute(f'''
-        SELECT w.*, 
-               COALESCE(wr.correct_count, 0) as correct_count,
-               COALESCE(wr.wrong_count, 0) as wrong_count
-        FROM words w
-        JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN word_reviews wr ON w.id = wr.word_id
-        WHERE wg.group_id = ?
-        ORDER BY {sort_by} {order}
-        LIMIT ? OFFSET ?
-      ''', (id, words_per_page, offset))
-      
-      words = cursor.fetchall()
+      next_cursor = None
+      prev_cursor = None
+      if use_cursor:
+        words, next_cursor, prev_cursor = keyset_page(
+          cursor,
+          f'''
+            SELECT w.*,
+                   COALESCE(wr.correct_count, 0) as correct_count,
+                   COALESCE(wr.wrong_count, 0) as wrong_count,
+                   {valid_columns[sort_by]} as sort_key
+            FROM words w
+            JOIN word_groups wg ON w.id = wg.word_id
+            LEFT JOIN word_reviews wr ON w.id = wr.word_id
+            WHERE wg.group_id = ?
+          ''',
+          [id], sort_by, order, words_per_page,
+          token=request.args.get('cursor')
+        )
+      else:
+        cursor.execute(f'''
+          SELECT w.*, 
+                 COALESCE(wr.correct_count, 0) as correct_count,
+                 COALESCE(wr.wrong_count, 0) as wrong_count
+          FROM words w
+          JOIN word_groups wg ON w.id = wg.word_id
+          LEFT JOIN word_reviews wr ON w.id = wr.word_id
+          WHERE wg.group_id = ?
+          ORDER BY {sort_by} {order}
+          LIMIT ? OFFSET ?
+        ''', (id, words_per_page, offset))
+        
+        words = cursor.fetchall()
 
       # Get total words count for pagination
-      cursor.execute('''
-        SELECT COUNT(*) 
-        FROM word_groups 
-        WHERE group_id = ?
-      ''', (id,))
-      total_words = cursor.fetchone()[0]
-      total_pages = (total_words + words_per_page - 1) // words_per_page
+      total_pages = None
+      if with_total:
+        cursor.execute('''
+          SELECT COUNT(*) 
+          FROM word_groups 
+          WHERE group_id = ?
+        ''', (id,))
+        total_words = cursor.fetchone()[0]
+        total_pages = (total_words + words_per_page - 1) // words_per_page
 
       # Format the response
       words_data = []
@@ -294,14 +327,18 @@ def load(app):
       return jsonify({
         'words': words_data,
         'total_pages': total_pages,
-        'current_page': page
+        'current_page': page,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
       })
+    except InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
   # todo GET /groups/:id/words/raw
   @app.route('/api/groups/<int:id>/words/raw', methods=['GET'])
-  @cross_origin()
+  @app.cache.cached('groups', 'words', 'word_groups')
   def get_group_words_raw(id):
     app.logger.info(f"Route hit: /api/groups/{id}/words/raw GET")
     try:
@@ -314,13 +351,13 @@ def load(app):
         return jsonify({"error": "Group not found"}), 404
         
       # Get all words for the group
-      cursor.execute('''
+      cursor.execute(f'''
         SELECT 
         w.id,
         w.kanji,
         w.english,
         w.romaji,
-        w.parts
+        {parts_fragment()} as parts
         FROM words w
         JOIN word_groups wg ON w.id = wg.word_id
         WHERE wg.group_id = ?
@@ -328,21 +365,17 @@ def load(app):
         
       words = cursor.fetchall()
         
-      # Convert to list of dictionaries
-      words_data = [{
+      # parts is spliced in as the stored JSON, not re-encoded
+      words_data = [splice({
         'id': word['id'],
         'kanji': word['kanji'],
         'english': word['english'],
-        'romaji': word['romaji'],
-        'parts': word['parts']
-      } for word in words]
+        'romaji': word['romaji']
+      }, parts=word['parts']) for word in words]
         
       app.logger.info(f"Retrieved {len(words_data)} words for group {id}")
         
-      return jsonify({
-        'words': words_data,
-        'count': len(words_data)
-      })
+      return json_response(splice({'count': len(words_data)}, words=array(words_data)))
         
     except Exception as e:
         app.logger.error(f"Error getting raw words for group {id}: {str(e)}", exc_info=True)
@@ -350,14 +383,112 @@ def load(app):
       
   
 
+  @app.route('/api/groups/words', methods=['GET'])
+  def get_words_in_groups():
+    app.logger.info("Route hit: /api/groups/words GET")
+    try:
+      # Word ids in every group of ?all=1,2 and/or in any group of ?any=3,4,
+      # answered from the membership index bitmaps
+      try:
+        selected = {
+          name: [int(value) for value in request.args[name].split(',')]
+          for name in ('all', 'any') if request.args.get(name)
+        }
+      except ValueError:
+        return jsonify({"error": "all and any must be comma-separated group ids"}), 400
+      if not selected:
+        return jsonify({"error": "Pass the group ids in all and/or any"}), 400
+
+      missing = sorted({group_id for ids in selected.values() for group_id in ids
+                        if app.membership.words_in(group_id) is None})
+      if missing:
+        return jsonify({"error": "Group not found", "group_ids": missing}), 404
+
+      word_ids = app.membership.select(all_of=selected.get('all', ()), any_of=selected.get('any', ()))
+      return jsonify({'word_ids': list(word_ids), 'count': len(word_ids)})
+    except Exception as e:
+      app.logger.error(f"Error getting words in groups: {str(e)}", exc_info=True)
+      return jsonify({"error": str(e)}), 500
+
+  @app.route('/api/groups/<int:id>/due', methods=['GET'])
+  def get_group_due_words(id):
+    app.logger.info(f"Route hit: /api/groups/{id}/due GET")
+    try:
+      try:
+        limit = int(request.args.get('limit', DEFAULT_DUE_LIMIT))
+      except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+      if limit < 1 or limit > MAX_DUE_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_DUE_LIMIT}"}), 400
+
+      cursor = app.db.cursor()
+
+      cursor.execute('SELECT COUNT(*) as count FROM groups WHERE id = ?', (id,))
+      if cursor.fetchone()['count'] == 0:
+        app.logger.warning(f"Group not found: {id}")
+        return jsonify({"error": "Group not found"}), 404
+
+      # Next words in due order, straight off idx_word_schedules_due; words
+      # that are not due yet follow the overdue ones when there are fewer
+      # than `limit` of those
+      cursor.execute(f'''
+        SELECT
+          w.id,
+          w.kanji,
+          w.english,
+          w.romaji,
+          {parts_fragment()} as parts,
+          ws.due_at,
+          ws.interval_days,
+          ws.ease,
+          ws.repetitions,
+          ws.lapses,
+          ws.last_reviewed_at,
+          ws.due_at <= CURRENT_TIMESTAMP as is_due
+        FROM word_schedules ws
+        JOIN words w ON w.id = ws.word_id
+        WHERE ws.group_id = ?
+        ORDER BY ws.due_at, ws.word_id
+        LIMIT ?
+      ''', (id, limit))
+      words = cursor.fetchall()
+
+      cursor.execute('''
+        SELECT COUNT(*) as count
+        FROM word_schedules
+        WHERE group_id = ? AND due_at <= CURRENT_TIMESTAMP
+      ''', (id,))
+      due_count = cursor.fetchone()['count']
+
+      words_data = [splice({
+        'id': word['id'],
+        'kanji': word['kanji'],
+        'english': word['english'],
+        'romaji': word['romaji'],
+        'due_at': word['due_at'],
+        'is_due': bool(word['is_due']),
+        'is_new': word['last_reviewed_at'] is None,
+        'interval_days': word['interval_days'],
+        'ease': word['ease'],
+        'repetitions': word['repetitions'],
+        'lapses': word['lapses']
+      }, parts=word['parts']) for word in words]
+
+      return json_response(splice({
+        'count': len(words_data),
+        'due_count': due_count
+      }, words=array(words_data)))
+    except Exception as e:
+      app.logger.error(f"Error getting due words for group {id}: {str(e)}", exc_info=True)
+      return jsonify({"error": str(e)}), 500
+
   @app.route('/api/groups/<int:id>/study-sessions', methods=['GET'])
-  @cross_origin()
   def get_group_study_sessions(id):
     try:
       cursor = app.db.cursor()
       
       # Get pagination parameters
-      page = int(request.args.get('page', 1))
+      page = max(1, request.args.get('page', 1, type=int))
       sessions_per_page = 10
       offset = (page - 1) * sessions_per_page
 
@@ -376,51 +507,71 @@ def load(app):
 
       # Use mapped sort column or default to created_at
       sort_column = sort_mapping.get(sort_by, 'created_at')
+      if order not in ['asc', 'desc']:
+        order = 'desc'
+
+      use_cursor = wants_cursor(request.args)
+      with_total = include_total(request.args, default=not use_cursor)
 
       # Get total count for pagination
-      cursor.execute('''
-        SELECT COUNT(*)
-        FROM study_sessions
-        WHERE group_id = ?
-      ''', (id,))
-      total_sessions = cursor.fetchone()[0]
-      total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
+      total_pages = None
+      if with_total:
+        cursor.execute('''
+          SELECT COUNT(*)
+          FROM study_sessions
+          WHERE group_id = ?
+        ''', (id,))
+        total_sessions = cursor.fetchone()[0]
+        total_pages = (total_sessions + sessions_per_page - 1) // sessions_per_page
 
-      # Get study sessions for this group with dynamic calculations
-      cursor.execute(f'''
+      # Get study sessions for this group. Review counts and last activity
+      # come from the session rollups; closed sessions use their ended_at.
+      sessions_query = '''
         SELECT 
           s.id,
           s.group_id,
           s.study_activity_id,
           s.created_at as start_time,
-          (
-            SELECT MAX(created_at)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as last_activity_time,
+          COALESCE(s.ended_at, s.last_activity_at) as last_activity_time,
           a.name as activity_name,
           g.name as group_name,
-          (
-            SELECT COUNT(*)
-            FROM word_review_items
-            WHERE study_session_id = s.id
-          ) as review_count
+          s.review_count
         FROM study_sessions s
         JOIN study_activities a ON s.study_activity_id = a.id
         JOIN groups g ON s.group_id = g.id
         WHERE s.group_id = ?
-        ORDER BY {sort_column} {order}
-        LIMIT ? OFFSET ?
-      ''', (id, sessions_per_page, offset))
-      
-      sessions = cursor.fetchall()
+      '''
+
+      next_cursor = None
+      prev_cursor = None
+      if use_cursor:
+        # Sort keys over the columns of sessions_query
+        cursor_sort_keys = {
+          'startTime': 'start_time',
+          'endTime': "COALESCE(last_activity_time, '')",
+          'activityName': 'activity_name',
+          'groupName': 'group_name',
+          'reviewItemsCount': 'review_count'
+        }
+        sessions, next_cursor, prev_cursor = keyset_page(
+          cursor,
+          f'SELECT x.*, {cursor_sort_keys.get(sort_by, "start_time")} as sort_key FROM ({sessions_query}) x',
+          [id], sort_by, order, sessions_per_page,
+          token=request.args.get('cursor')
+        )
+      else:
+        cursor.execute(f'''
+          {sessions_query}
+          ORDER BY {sort_column} {order}
+          LIMIT ? OFFSET ?
+        ''', (id, sessions_per_page, offset))
+        
+        sessions = cursor.fetchall()
       sessions_data = []
       
       for session in sessions:
-        # If there's no last_activity_time, use start_time + 30 minutes
-        end_time = session["last_activity_time"]
-        if not end_time:
-            end_time = cursor.execute('SELECT datetime(?, "+30 minutes")', (session["start_time"],)).fetchone()[0]
+        # If there's no end time or activity yet, use start_time + 30 minutes
+        end_time = session["last_activity_time"] or fallback_end_time(session["start_time"])
         
         sessions_data.append({
           "id": session["id"],
@@ -436,7 +587,11 @@ def load(app):
       return jsonify({
         'study_sessions': sessions_data,
         'total_pages': total_pages,
-        'current_page': page
+        'current_page': page,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
       })
+    except InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
     except Exception as e:
       return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,39 @@
+from flask import jsonify, request
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+def accepted(job, message=None):
+    """202 response for a submitted job, pointing at its status endpoint"""
+    body = {"job": job}
+    if message:
+        body["message"] = message
+    response = jsonify(body)
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job['id']}"
+    return response
+
+def load(app):
+    @app.route('/api/jobs', methods=['GET'])
+    def get_jobs():
+        app.logger.info("Route hit: /api/jobs GET")
+        try:
+            status = request.args.get('status')
+            if status is not None and status not in STATUSES:
+                return jsonify({"error": f"status must be one of {', '.join(STATUSES)}"}), 400
+            limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+            return jsonify({"jobs": app.jobs.list(status=status, limit=limit)})
+        except Exception as e:
+            app.logger.error(f"Error getting jobs: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/jobs/<int:job_id>', methods=['GET'])
+    def get_job(job_id):
+        app.logger.info(f"Route hit: /api/jobs/{job_id} GET")
+        try:
+            job = app.jobs.get(job_id)
+            if job is None:
+                return jsonify({"error": "Job not found"}), 404
+            return jsonify({"job": job})
+        except Exception as e:
+            app.logger.error(f"Error getting job: {str(e)}", exc_info=True)
+            return jsonify({"error": str(e)}), 500
@@ -1,10 +1,10 @@
 from flask import jsonify, request
-from flask_cors import cross_origin
 import math
+from lib.pagination import page_args
 
 def load(app):
     @app.route('/api/study-activities', methods=['GET'])
-    @cross_origin()
+    @app.cache.cached('study_activities')
     def get_study_activities():
         app.logger.info("Route hit: /api/study-activities GET")
         try:
@@ -25,7 +25,6 @@ def load(app):
             return jsonify({"error": str(e)}), 500
 
     @app.route('/api/study-activities/<int:id>', methods=['GET'])
-    @cross_origin()
     def get_study_activity(id):
         cursor = app.db.cursor()
         cursor.execute('SELECT id, name, url, preview_url FROM study_activities WHERE id = ?', (id,))
@@ -42,7 +41,6 @@ def load(app):
         })
 
     @app.route('/api/study-activities/<int:id>/sessions', methods=['GET'])
-    @cross_origin()
     def get_study_activity_sessions(id):
         cursor = app.db.cursor()
         
@@ -52,8 +50,7 @@ def load(app):
             return jsonify({'error': 'Activity not found'}), 404
 
         # Get pagination parameters
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        page, per_page = page_args(request.args)
         offset = (page - 1) * per_page
 
         # Get total count
@@ -104,7 +101,7 @@ def load(app):
         })
 
     @app.route('/api/study-activities/<int:id>/launch', methods=['GET'])
-    @cross_origin()
+    @app.cache.cached('study_activities', 'groups')
     def get_study_activity_launch_data(id):
         cursor = app.db.cursor()
         
@@ -1,19 +1,48 @@
 from flask import request, jsonify, g
-from flask_cors import cross_origin
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
 import math
 import json
+from lib.pagination import InvalidCursor, keyset_page, wants_cursor, include_total, page_args
+from lib.serialization import array, json_response, parts_fragment, splice
+from lib.sessions import close_session, session_end_time
+from routes.jobs import accepted
+
+def parse_answered_at(value):
+  """Normalize an ISO 8601 timestamp to SQLite's CURRENT_TIMESTAMP format (UTC)"""
+  if value is None:
+    return None
+  if not isinstance(value, str):
+    raise ValueError(value)
+  answered_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+  if answered_at.tzinfo is not None:
+    answered_at = answered_at.astimezone(timezone.utc)
+  return answered_at.strftime('%Y-%m-%d %H:%M:%S')
+
+def stats_date_range(time_range, date_from=None, date_to=None):
+  """Resolve the stats range to inclusive (from, to) ISO dates, None = unbounded"""
+  if date_from or date_to:
+    return (
+      date.fromisoformat(date_from).isoformat() if date_from else None,
+      date.fromisoformat(date_to).isoformat() if date_to else None
+    )
+  # Same UTC calendar as SQLite's DATE('now')
+  today = datetime.now(timezone.utc).date()
+  if time_range == 'today':
+    return today.isoformat(), today.isoformat()
+  if time_range == 'week':
+    return (today - timedelta(days=7)).isoformat(), None
+  if time_range == 'month':
+    return (today - timedelta(days=30)).isoformat(), None
+  return None, None
 
 def load(app):
   @app.route('/api/study-sessions', methods=['GET'])
-  @cross_origin()
   def get_study_sessions():
     try:
       cursor = app.db.cursor()
       
       # Get pagination parameters
-      page = request.args.get('page', 1, type=int)
-      per_page = request.args.get('per_page', 10, type=int)
+      page, per_page = page_args(request.args)
       offset = (page - 1) * per_page
 
       # Get sorting parameters from the query string
@@ -26,8 +55,8 @@ def load(app):
         'group_name': 'g.name',
         'activity_name': 'sa.name',
         'start_time': 'ss.created_at',
-        'end_time': 'ss.created_at',
-        'review_items_count': 'review_items_count'
+        'end_time': 'COALESCE(ss.ended_at, ss.last_activity_at, ss.created_at)',
+        'review_items_count': 'ss.review_count'
       }
       
       # Validate sort_by parameter
@@ -42,17 +71,22 @@ def load(app):
         
 
         
+      use_cursor = wants_cursor(request.args)
+      with_total = include_total(request.args, default=not use_cursor)
+
       # Get total count
-      cursor.execute('''
-        SELECT COUNT(*) as count 
-        FROM study_sessions ss
-        JOIN groups g ON g.id = ss.group_id
-        JOIN study_activities sa ON sa.id = ss.study_activity_id
-      ''')
-      total_count = cursor.fetchone()['count']
+      total_count = None
+      if with_total:
+        cursor.execute('''
+          SELECT COUNT(*) as count 
+          FROM study_sessions ss
+          JOIN groups g ON g.id = ss.group_id
+          JOIN study_activities sa ON sa.id = ss.study_activity_id
+        ''')
+        total_count = cursor.fetchone()['count']
 
-      # Get paginated sessions
-      query = f'''
+      # Get paginated sessions, counts come from the session rollups
+      sessions_query = '''
         SELECT 
           ss.id,
           ss.group_id,
@@ -60,17 +94,39 @@ def load(app):
           sa.id as study_activity_id,
           sa.name as activity_name,
           ss.created_at,
-          COUNT(wri.id) as review_items_count
+          ss.ended_at,
+          ss.last_activity_at,
+          ss.review_count as review_items_count,
+          ss.correct_count
         FROM study_sessions ss
         JOIN groups g ON g.id = ss.group_id
         JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-        GROUP BY ss.id
-        ORDER BY {valid_columns[sort_by]} {order}
-        LIMIT ? OFFSET ?
       '''
-      cursor.execute(query, (per_page, offset))
-      sessions = cursor.fetchall()
+      next_cursor = None
+      prev_cursor = None
+      if use_cursor:
+        # Sort keys over the columns of sessions_query
+        cursor_sort_keys = {
+          'id': 'x.id',
+          'group_name': 'x.group_name',
+          'activity_name': 'x.activity_name',
+          'start_time': 'x.created_at',
+          'end_time': 'COALESCE(x.ended_at, x.last_activity_at, x.created_at)',
+          'review_items_count': 'x.review_items_count'
+        }
+        sessions, next_cursor, prev_cursor = keyset_page(
+          cursor,
+          f'SELECT x.*, {cursor_sort_keys[sort_by]} as sort_key FROM ({sessions_query}) x',
+          [], sort_by, order, per_page,
+          token=request.args.get('cursor')
+        )
+      else:
+        cursor.execute(f'''
+          {sessions_query}
+          ORDER BY {valid_columns[sort_by]} {order}, ss.id {order}
+          LIMIT ? OFFSET ?
+        ''', (per_page, offset))
+        sessions = cursor.fetchall()
 
       return jsonify({
         'items': [{
@@ -80,19 +136,24 @@ def load(app):
           'study_activity_id': session['study_activity_id'],
           'activity_name': session['activity_name'],
           'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time since we don't track end time
-          'review_items_count': session['review_items_count']
+          'end_time': session_end_time(session),
+          'status': 'closed' if session['ended_at'] else 'open',
+          'review_items_count': session['review_items_count'],
+          'correct_count': session['correct_count']
         } for session in sessions],
         'total': total_count,
         'page': page,
         'per_page': per_page,
-        'total_pages': math.ceil(total_count / per_page)
+        'total_pages': math.ceil(total_count / per_page) if total_count is not None else None,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
       })
+    except InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
     except Exception as e:
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study-sessions/<id>', methods=['GET'])
-  @cross_origin()
   def get_study_session(id):
     try:
       cursor = app.db.cursor()
@@ -106,13 +167,14 @@ def load(app):
           sa.id as study_activity_id,
           sa.name as activity_name,
           ss.created_at,
-          COUNT(wri.id) as review_items_count
+          ss.ended_at,
+          ss.last_activity_at,
+          ss.review_count as review_items_count,
+          ss.correct_count
         FROM study_sessions ss
         JOIN groups g ON g.id = ss.group_id
         JOIN study_activities sa ON sa.id = ss.study_activity_id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
         WHERE ss.id = ?
-        GROUP BY ss.id
       ''', (id,))
       
       session = cursor.fetchone()
@@ -120,20 +182,18 @@ def load(app):
         return jsonify({"error": "Study session not found"}), 404
 
       # Get pagination parameters
-      page = request.args.get('page', 1, type=int)
-      per_page = request.args.get('per_page', 10, type=int)
+      page, per_page = page_args(request.args)
       offset = (page - 1) * per_page
 
       # Get the words reviewed in this session with their review status
       cursor.execute('''
         SELECT 
           w.*,
-          COALESCE(SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END), 0) as session_correct_count,
-          COALESCE(SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END), 0) as session_wrong_count
-        FROM words w
-        JOIN word_review_items wri ON wri.word_id = w.id
-        WHERE wri.study_session_id = ?
-        GROUP BY w.id
+          sw.correct_count as session_correct_count,
+          sw.review_count - sw.correct_count as session_wrong_count
+        FROM session_words sw
+        JOIN words w ON w.id = sw.word_id
+        WHERE sw.study_session_id = ?
         ORDER BY w.kanji
         LIMIT ? OFFSET ?
       ''', (id, per_page, offset))
@@ -142,10 +202,9 @@ def load(app):
 
       # Get total count of words
       cursor.execute('''
-        SELECT COUNT(DISTINCT w.id) as count
-        FROM words w
-        JOIN word_review_items wri ON wri.word_id = w.id
-        WHERE wri.study_session_id = ?
+        SELECT COUNT(*) as count
+        FROM session_words
+        WHERE study_session_id = ?
       ''', (id,))
       
       total_count = cursor.fetchone()['count']
@@ -158,8 +217,10 @@ def load(app):
           'study_activity_id': session['study_activity_id'],
           'activity_name': session['activity_name'],
           'start_time': session['created_at'],
-          'end_time': session['created_at'],  # For now, just use the same time
-          'review_items_count': session['review_items_count']
+          'end_time': session_end_time(session),
+          'status': 'closed' if session['ended_at'] else 'open',
+          'review_items_count': session['review_items_count'],
+          'correct_count': session['correct_count']
         },
         'words': [{
           'id': word['id'],
@@ -178,26 +239,19 @@ def load(app):
       return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study-sessions/reset', methods=['POST'])
-  @cross_origin()
   def reset_study_sessions():
     try:
-      cursor = app.db.cursor()
-      
-      # First delete all word review items since they have foreign key constraints
-      cursor.execute('DELETE FROM word_review_items')
-      
-      # Then delete all study sessions
-      cursor.execute('DELETE FROM study_sessions')
-      
-      app.db.commit()
-      
-      return jsonify({"message": "Study history cleared successfully"}), 200
+      # Reviews, then sessions, are deleted in batches by a job; sessions
+      # started from now on are not part of the reset
+      with app.db.pool.connection() as conn:
+        through = conn.execute('SELECT COALESCE(MAX(id), 0) FROM study_sessions').fetchone()[0]
+      job = app.jobs.submit('reset_study_history', {'through_session_id': through})
+      return accepted(job, "Study history reset queued")
     except Exception as e:
       return jsonify({"error": str(e)}), 500
     
     # todo /api/study_sessions POST
   @app.route('/api/study-sessions', methods=['POST'])
-  @cross_origin()
   def create_study_session():
     app.logger.info("Route hit: /api/study-sessions POST")
     try:
@@ -225,14 +279,19 @@ def load(app):
         app.logger.error(f"Activity not found: {data['study_activity_id']}")
         return jsonify({"error": "Activity not found"}), 404
 
-      # Insert new study session
-      cursor.execute('''
-        INSERT INTO study_sessions (group_id, study_activity_id, created_at)
-        VALUES (?, ?, CURRENT_TIMESTAMP)
-        ''', (data['group_id'], data['study_activity_id']))
-            
-      session_id = cursor.lastrowid
-      app.db.commit()
+      # Insert new study session, unless a delete_group job removed the
+      # group since the check above
+      with app.db.writer() as writer:
+        writer.execute('''
+          INSERT INTO study_sessions (group_id, study_activity_id, created_at)
+          SELECT ?, ?, CURRENT_TIMESTAMP
+          WHERE EXISTS (SELECT 1 FROM groups WHERE id = ?)
+          ''', (data['group_id'], data['study_activity_id'], data['group_id']))
+        session_id = writer.lastrowid if writer.rowcount else None
+      if session_id is None:
+        app.logger.error(f"Group not found: {data['group_id']}")
+        return jsonify({"error": "Group not found"}), 404
+      app.cache.bump('study_sessions')
             
       # Return the created session
       cursor.execute('''
@@ -253,7 +312,8 @@ def load(app):
         'study_activity_id': session['study_activity_id'],
         'activity_name': session['activity_name'],
         'start_time': session['created_at'],
-        'end_time': session['created_at'],
+        'end_time': session_end_time(session),
+        'status': 'open',
         'review_items_count': 0
          }
       }), 201
@@ -266,7 +326,6 @@ def load(app):
     
   # todo POST /api/study_sessions/:id/
   @app.route('/api/study-sessions/<int:session_id>', methods=['PUT'])
-  @cross_origin()
   def update_study_session(session_id):
     app.logger.info(f"Route hit: /api/study-sessions/{session_id} PUT")
     try:
@@ -312,23 +371,21 @@ def load(app):
         return jsonify({"error": "Activity not found"}), 404
             
       # Update session
-      cursor.execute('''
-        UPDATE study_sessions 
-        SET group_id = ?, study_activity_id = ?
-        WHERE id = ?
-      ''', (data['group_id'], data['study_activity_id'], session_id))
-      app.db.commit()
+      with app.db.writer() as writer:
+        writer.execute('''
+          UPDATE study_sessions 
+          SET group_id = ?, study_activity_id = ?
+          WHERE id = ?
+        ''', (data['group_id'], data['study_activity_id'], session_id))
+      app.cache.bump('study_sessions')
       
       # Get updated session
       cursor.execute('''
-        SELECT s.*, g.name as group_name, a.name as activity_name,
-        COUNT(wri.id) as review_items_count
+        SELECT s.*, g.name as group_name, a.name as activity_name
         FROM study_sessions s
         JOIN groups g ON s.group_id = g.id
         JOIN study_activities a ON s.study_activity_id = a.id
-        LEFT JOIN word_review_items wri ON wri.study_session_id = s.id
         WHERE s.id = ?
-        GROUP BY s.id, s.group_id, g.name, a.name, s.created_at
       ''', (session_id,))
       session = cursor.fetchone()
 
@@ -344,8 +401,9 @@ def load(app):
           'study_activity_id': session['study_activity_id'],
           'activity_name': session['activity_name'],
           'start_time': session['created_at'],
-          'end_time': session['created_at'],
-          'review_items_count': session['review_items_count']
+          'end_time': session_end_time(session),
+          'status': 'closed' if session['ended_at'] else 'open',
+          'review_items_count': session['review_count']
         }
       }), 200
 
@@ -355,58 +413,109 @@ def load(app):
       return jsonify({"error": str(e)}), 500 
 
   @app.route('/api/study-sessions/stats', methods=['GET'])
-  @cross_origin()
   def get_study_sessions_stats():
     app.logger.info("Route hit: /api/study-sessions/stats GET")
     try:
-        cursor = app.db.cursor()
-        
-        # Get time range from query parameters
-        time_range = request.args.get('range', 'all')  # Options: all, today, week, month
-        
-        # Build date filter based on range
-        date_filter = ''
-        if time_range == 'today':
-            date_filter = "WHERE DATE(ss.created_at) = DATE('now')"
-        elif time_range == 'week':
-            date_filter = "WHERE DATE(ss.created_at) >= DATE('now', '-7 days')"
-        elif time_range == 'month':
-            date_filter = "WHERE DATE(ss.created_at) >= DATE('now', '-30 days')"
+        # Served from the database snapshot in snapshot mode
+        cursor = app.db.analytics_cursor()
         
-        # Get overall statistics
+        # Get time range from query parameters: a named range (all, today,
+        # week, month) or explicit from/to dates (YYYY-MM-DD, inclusive)
+        time_range = request.args.get('range', 'all')
+        try:
+            date_from, date_to = stats_date_range(
+                time_range, request.args.get('from'), request.args.get('to')
+            )
+        except ValueError:
+            return jsonify({"error": "from/to must be dates in YYYY-MM-DD format"}), 400
+        if request.args.get('from') or request.args.get('to'):
+            time_range = 'custom'
+
+        # Everything below sums daily buckets (see
+        # sql/migrations/0007_daily_stats.sql) instead of scanning sessions
+        # and review items, so the cost depends on the number of days only
+        conditions = []
+        params = []
+        if date_from:
+            conditions.append('stat_date >= ?')
+            params.append(date_from)
+        if date_to:
+            conditions.append('stat_date <= ?')
+            params.append(date_to)
+        range_filter = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        bounded = bool(conditions)
+
         cursor.execute(f'''
             SELECT 
-                COUNT(DISTINCT ss.id) as total_sessions,
-                COUNT(DISTINCT ss.group_id) as unique_groups,
-                COUNT(DISTINCT ss.study_activity_id) as unique_activities,
-                COUNT(DISTINCT wri.word_id) as unique_words,
-                COUNT(wri.id) as total_reviews,
-                SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END) as correct_reviews,
-                AVG(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END) * 100 as accuracy_rate,
-                MAX(ss.created_at) as last_session_date
-            FROM study_sessions ss
-            LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-            {date_filter}
-        ''')
+                COALESCE(SUM(session_count), 0) as total_sessions,
+                COUNT(DISTINCT CASE WHEN session_count > 0 THEN study_activity_id END) as unique_activities,
+                COALESCE(SUM(review_count), 0) as total_reviews,
+                COALESCE(SUM(correct_count), 0) as correct_reviews,
+                SUM(correct_count) * 100.0 / NULLIF(SUM(review_count), 0) as accuracy_rate
+            FROM daily_activity_stats
+            {range_filter}
+        ''', params)
         overall_stats = cursor.fetchone()
-        
+
+        cursor.execute(f'''
+            SELECT COUNT(DISTINCT group_id) as unique_groups
+            FROM daily_group_stats
+            {range_filter}{' AND' if bounded else 'WHERE'} session_count > 0
+        ''', params)
+        unique_groups = cursor.fetchone()['unique_groups']
+
+        cursor.execute(f'''
+            SELECT COUNT(DISTINCT word_id) as unique_words
+            FROM daily_words
+            {range_filter}
+        ''', params)
+        unique_words = cursor.fetchone()['unique_words']
+
+        # Sargable range on the raw column (idx_study_sessions_created_at)
+        cursor.execute('''
+            SELECT MAX(created_at) as last_session_date
+            FROM study_sessions
+            WHERE created_at >= ? AND created_at < date(?, '+1 day')
+        ''', (date_from or '0000-01-01', date_to or '9999-12-30'))
+        last_session_date = cursor.fetchone()['last_session_date']
+
+        words_reviewed = {}
+        for column in ('study_activity_id', 'group_id'):
+            cursor.execute(f'''
+                SELECT {column} as id, COUNT(DISTINCT word_id) as words_reviewed
+                FROM daily_words
+                {range_filter}
+                GROUP BY {column}
+            ''', params)
+            words_reviewed[column] = {row['id']: row['words_reviewed'] for row in cursor.fetchall()}
+
+        # Like before, a bounded range only lists activities/groups that
+        # have sessions in it; "all" lists every one of them
+        join = 'JOIN' if bounded else 'LEFT JOIN'
+
         # Get stats by activity
         cursor.execute(f'''
             SELECT 
                 sa.id as activity_id,
                 sa.name as activity_name,
-                COUNT(DISTINCT ss.id) as session_count,
-                COUNT(DISTINCT wri.word_id) as words_reviewed,
-                COUNT(wri.id) as total_reviews,
-                SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END) as correct_reviews,
-                ROUND(AVG(CASE WHEN wri.correct = 1 THEN 1.0 ELSE 0 END) * 100, 2) as accuracy_rate
+                COALESCE(d.session_count, 0) as session_count,
+                COALESCE(d.review_count, 0) as total_reviews,
+                COALESCE(d.correct_count, 0) as correct_reviews,
+                COALESCE(ROUND(d.correct_count * 100.0 / NULLIF(d.review_count, 0), 2), 0) as accuracy_rate
             FROM study_activities sa
-            LEFT JOIN study_sessions ss ON ss.study_activity_id = sa.id
-            LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-            {date_filter}
-            GROUP BY sa.id, sa.name
+            {join} (
+                SELECT
+                    study_activity_id,
+                    SUM(session_count) as session_count,
+                    SUM(review_count) as review_count,
+                    SUM(correct_count) as correct_count
+                FROM daily_activity_stats
+                {range_filter}
+                GROUP BY study_activity_id
+                HAVING SUM(session_count) > 0
+            ) d ON d.study_activity_id = sa.id
             ORDER BY session_count DESC
-        ''')
+        ''', params)
         activity_stats = cursor.fetchall()
         
         # Get stats by group
@@ -414,37 +523,43 @@ def load(app):
             SELECT 
                 g.id as group_id,
                 g.name as group_name,
-                COUNT(DISTINCT ss.id) as session_count,
-                COUNT(DISTINCT wri.word_id) as words_reviewed,
-                COUNT(wri.id) as total_reviews,
-                SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END) as correct_reviews,
-                ROUND(AVG(CASE WHEN wri.correct = 1 THEN 1.0 ELSE 0 END) * 100, 2) as accuracy_rate
+                COALESCE(d.session_count, 0) as session_count,
+                COALESCE(d.review_count, 0) as total_reviews,
+                COALESCE(d.correct_count, 0) as correct_reviews,
+                COALESCE(ROUND(d.correct_count * 100.0 / NULLIF(d.review_count, 0), 2), 0) as accuracy_rate
             FROM groups g
-            LEFT JOIN study_sessions ss ON ss.group_id = g.id
-            LEFT JOIN word_review_items wri ON wri.study_session_id = ss.id
-            {date_filter}
-            GROUP BY g.id, g.name
+            {join} (
+                SELECT
+                    group_id,
+                    SUM(session_count) as session_count,
+                    SUM(review_count) as review_count,
+                    SUM(correct_count) as correct_count
+                FROM daily_group_stats
+                {range_filter}
+                GROUP BY group_id
+                HAVING SUM(session_count) > 0
+            ) d ON d.group_id = g.id
             ORDER BY session_count DESC
-        ''')
+        ''', params)
         group_stats = cursor.fetchall()
-        
+
         # Format response
         response_data = {
             'overall': {
                 'total_sessions': overall_stats['total_sessions'],
-                'unique_groups': overall_stats['unique_groups'],
+                'unique_groups': unique_groups,
                 'unique_activities': overall_stats['unique_activities'],
-                'unique_words': overall_stats['unique_words'],
+                'unique_words': unique_words,
                 'total_reviews': overall_stats['total_reviews'],
                 'correct_reviews': overall_stats['correct_reviews'],
                 'accuracy_rate': round(overall_stats['accuracy_rate'] or 0, 2),
-                'last_session_date': overall_stats['last_session_date']
+                'last_session_date': last_session_date
             },
             'by_activity': [{
                 'id': stat['activity_id'],
                 'name': stat['activity_name'],
                 'session_count': stat['session_count'],
-                'words_reviewed': stat['words_reviewed'],
+                'words_reviewed': words_reviewed['study_activity_id'].get(stat['activity_id'], 0),
                 'total_reviews': stat['total_reviews'],
                 'correct_reviews': stat['correct_reviews'],
                 'accuracy_rate': stat['accuracy_rate']
@@ -453,12 +568,14 @@ def load(app):
                 'id': stat['group_id'],
                 'name': stat['group_name'],
                 'session_count': stat['session_count'],
-                'words_reviewed': stat['words_reviewed'],
+                'words_reviewed': words_reviewed['group_id'].get(stat['group_id'], 0),
                 'total_reviews': stat['total_reviews'],
                 'correct_reviews': stat['correct_reviews'],
                 'accuracy_rate': stat['accuracy_rate']
             } for stat in group_stats],
-            'time_range': time_range
+            'time_range': time_range,
+            'from': date_from,
+            'to': date_to
         }
         
         app.logger.info(f"Retrieved study session stats for time range: {time_range}")
@@ -469,7 +586,6 @@ def load(app):
         return jsonify({"error": str(e)}), 500
 
   @app.route('/api/study-sessions/<int:session_id>/words', methods=['GET'])
-  @cross_origin()
   def get_session_words(session_id):
     app.logger.info(f"Route hit: /api/study-sessions/{session_id}/words GET")
     try:
@@ -486,30 +602,35 @@ def load(app):
             return jsonify({"error": "Study session not found"}), 404
             
         # Get pagination parameters
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        page, per_page = page_args(request.args)
         offset = (page - 1) * per_page
         
+        use_cursor = wants_cursor(request.args)
+        with_total = include_total(request.args, default=not use_cursor)
+
         # Get total count
-        cursor.execute('''
-            SELECT COUNT(DISTINCT w.id) as count
-            FROM study_sessions ss
-            JOIN groups g ON ss.group_id = g.id
-            JOIN word_groups wg ON g.id = wg.group_id
-            JOIN words w ON wg.word_id = w.id
-            WHERE ss.id = ?
-        ''', (session_id,))
-        total_count = cursor.fetchone()['count']
-        total_pages = (total_count + per_page - 1) // per_page
+        total_count = None
+        total_pages = None
+        if with_total:
+            cursor.execute('''
+                SELECT COUNT(DISTINCT w.id) as count
+                FROM study_sessions ss
+                JOIN groups g ON ss.group_id = g.id
+                JOIN word_groups wg ON g.id = wg.group_id
+                JOIN words w ON wg.word_id = w.id
+                WHERE ss.id = ?
+            ''', (session_id,))
+            total_count = cursor.fetchone()['count']
+            total_pages = (total_count + per_page - 1) // per_page
         
         # Get words with review status
-        cursor.execute('''
+        words_query = f'''
             SELECT 
                 w.id,
                 w.kanji,
                 w.romaji,
                 w.english,
-                w.parts,
+                {parts_fragment()} as parts,
                 COUNT(DISTINCT CASE WHEN wri.correct = 1 THEN wri.id END) as correct_count,
                 COUNT(DISTINCT CASE WHEN wri.correct = 0 THEN wri.id END) as wrong_count,
                 MAX(wri.created_at) as last_reviewed_at
@@ -520,47 +641,64 @@ def load(app):
             LEFT JOIN word_review_items wri ON wri.word_id = w.id AND wri.study_session_id = ss.id
             WHERE ss.id = ?
             GROUP BY w.id, w.kanji, w.romaji, w.english, w.parts
-            ORDER BY last_reviewed_at DESC NULLS LAST, w.kanji
-            LIMIT ? OFFSET ?
-        ''', (session_id, per_page, offset))
-        
-        words = cursor.fetchall()
+        '''
+        next_cursor = None
+        prev_cursor = None
+        if use_cursor:
+            # Most recently reviewed first; ties (including never reviewed
+            # words, keyed as '') are broken by id instead of kanji
+            words, next_cursor, prev_cursor = keyset_page(
+                cursor,
+                f"SELECT x.*, COALESCE(x.last_reviewed_at, '') as sort_key FROM ({words_query}) x",
+                [session_id], 'last_reviewed_at', 'DESC', per_page,
+                token=request.args.get('cursor')
+            )
+        else:
+            cursor.execute(f'''
+                {words_query}
+                ORDER BY last_reviewed_at DESC NULLS LAST, w.kanji
+                LIMIT ? OFFSET ?
+            ''', (session_id, per_page, offset))
+            
+            words = cursor.fetchall()
         words_data = []
         
         for word in words:
-            word_data = {
+            # parts is spliced in as the stored JSON, not parsed per row
+            word_data = splice({
                 'id': word['id'],
                 'kanji': word['kanji'],
                 'romaji': word['romaji'],
                 'english': word['english'],
-                'parts': json.loads(word['parts']) if word['parts'] else None,
                 'stats': {
                     'correct_count': word['correct_count'],
                     'wrong_count': word['wrong_count'],
                     'last_reviewed_at': word['last_reviewed_at']
                 }
-            }
+            }, parts=word['parts'])
             words_data.append(word_data)
             
         app.logger.info(f"Retrieved {len(words_data)} words for session {session_id}")
         
-        return jsonify({
-            'words': words_data,
+        return json_response(splice({
             'pagination': {
                 'total_items': total_count,
                 'total_pages': total_pages,
                 'current_page': page,
-                'per_page': per_page
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
             }
-        })
+        }, words=array(words_data)))
         
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error retrieving session words: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
     
   # POST /study_sessions/:id/review
   @app.route('/api/study-sessions/<int:session_id>/review', methods=['POST'])    
-  @cross_origin()
   def review_session(session_id):
     app.logger.info(f"Route hit: /api/study-sessions/{session_id}/review POST")
     try:
@@ -582,30 +720,159 @@ def load(app):
         app.logger.warning(f"Invalid correct type: {data['correct']}")
         return jsonify({"error": "correct must be a boolean"}), 400
             
-      cursor = app.db.cursor()
-      
-      try:
-        # Start transaction
-        cursor.execute('BEGIN')
-            
-        # Insert review record
+      with app.db.writer() as cursor:
+        # Insert review record, unless the session does not exist (or a
+        # delete job removed it): checked in the write transaction itself
         cursor.execute('''
           INSERT INTO word_review_items 
           (word_id, study_session_id, correct, created_at)
-          VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (data['word_id'], session_id, data['correct']))
-            
-        app.db.commit()
-            
-        return jsonify({
-          "success": True,
-          "message": "Review recorded successfully"
-        })
+          SELECT ?, ?, ?, CURRENT_TIMESTAMP
+          WHERE EXISTS (SELECT 1 FROM study_sessions WHERE id = ?)
+        ''', (data['word_id'], session_id, data['correct'], session_id))
+        recorded = cursor.rowcount
+      if not recorded:
+        app.logger.warning(f"Study session not found: {session_id}")
+        return jsonify({"error": "Study session not found"}), 404
+      app.cache.bump('word_review_items')
             
-      except Exception as e:
-        app.db.get().rollback()
-        raise e
+      return jsonify({
+        "success": True,
+        "message": "Review recorded successfully"
+      })
 
     except Exception as e:
       app.logger.error(f"Error recording review: {str(e)}")
-      return jsonify({"error": str(e)}), 500     
\ No newline at end of file
+      return jsonify({"error": str(e)}), 500     
+
+  # POST /study_sessions/:id/reviews
+  @app.route('/api/study-sessions/<int:session_id>/reviews', methods=['POST'])
+  def review_session_batch(session_id):
+    app.logger.info(f"Route hit: /api/study-sessions/{session_id}/reviews POST")
+    try:
+      data = request.get_json(silent=True)
+      reviews = data.get('reviews') if isinstance(data, dict) else None
+      if not isinstance(reviews, list) or not reviews:
+        app.logger.warning("Missing reviews in batch")
+        return jsonify({"error": "reviews must be a non-empty list"}), 400
+
+      max_items = app.config['REVIEW_BATCH_MAX_ITEMS']
+      if len(reviews) > max_items:
+        app.logger.warning(f"Review batch too large: {len(reviews)}")
+        return jsonify({"error": f"At most {max_items} reviews per batch"}), 413
+
+      cursor = app.db.cursor()
+
+      # Check if session exists
+      cursor.execute('SELECT COUNT(*) as count FROM study_sessions WHERE id = ?', (session_id,))
+      if cursor.fetchone()['count'] == 0:
+        app.logger.warning(f"Study session not found: {session_id}")
+        return jsonify({"error": "Study session not found"}), 404
+
+      # Validate item shapes
+      results = {}
+      candidates = []
+      for index, item in enumerate(reviews):
+        error = None
+        answered_at = None
+        if not isinstance(item, dict):
+          error = "review must be an object"
+        elif not isinstance(item.get('word_id'), int) or isinstance(item.get('word_id'), bool):
+          error = "word_id must be an integer"
+        elif not isinstance(item.get('correct'), bool):
+          error = "correct must be a boolean"
+        else:
+          try:
+            answered_at = parse_answered_at(item.get('answered_at'))
+          except ValueError:
+            error = "answered_at must be an ISO 8601 timestamp"
+
+        if error:
+          results[index] = {
+            'index': index,
+            'word_id': item.get('word_id') if isinstance(item, dict) else None,
+            'status': 'invalid',
+            'error': error
+          }
+        else:
+          candidates.append((index, item['word_id'], item['correct'], answered_at))
+
+      # Check all referenced words in one pass (chunked to stay under the
+      # SQLite bound-parameter limit)
+      word_ids = sorted({word_id for _, word_id, _, _ in candidates})
+      existing_ids = set()
+      for start in range(0, len(word_ids), 500):
+        chunk = word_ids[start:start + 500]
+        cursor.execute(
+          f"SELECT id FROM words WHERE id IN ({','.join('?' * len(chunk))})",
+          chunk
+        )
+        existing_ids.update(row['id'] for row in cursor.fetchall())
+
+      rows = []
+      for index, word_id, correct, answered_at in candidates:
+        if word_id not in existing_ids:
+          results[index] = {
+            'index': index,
+            'word_id': word_id,
+            'status': 'error',
+            'error': "Word not found"
+          }
+          continue
+        rows.append((word_id, session_id, correct, answered_at))
+        results[index] = {'index': index, 'word_id': word_id, 'status': 'recorded'}
+
+      # Insert every valid review in a single transaction. The session is
+      # checked again inside it: a delete job may have removed it since the
+      # check above, and its reviews must not outlive it
+      if rows:
+        with app.db.writer() as writer:
+          writer.execute('SELECT 1 FROM study_sessions WHERE id = ?', (session_id,))
+          if writer.fetchone() is None:
+            app.logger.warning(f"Study session deleted before its reviews were recorded: {session_id}")
+            return jsonify({"error": "Study session not found"}), 404
+          writer.executemany('''
+            INSERT INTO word_review_items 
+            (word_id, study_session_id, correct, created_at)
+            VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+          ''', rows)
+        app.cache.bump('word_review_items')
+
+      app.logger.info(f"Recorded {len(rows)} of {len(reviews)} reviews for session {session_id}")
+
+      return jsonify({
+        "success": len(rows) == len(reviews),
+        "recorded": len(rows),
+        "rejected": len(reviews) - len(rows),
+        "results": [results[index] for index in range(len(reviews))]
+      })
+
+    except Exception as e:
+      app.logger.error(f"Error recording reviews: {str(e)}", exc_info=True)
+      return jsonify({"error": str(e)}), 500
+
+  # POST /study_sessions/:id/close
+  @app.route('/api/study-sessions/<int:session_id>/close', methods=['POST'])
+  def close_study_session(session_id):
+    app.logger.info(f"Route hit: /api/study-sessions/{session_id}/close POST")
+    try:
+      with app.db.writer() as cursor:
+        closed = close_session(cursor, session_id)
+        cursor.execute('SELECT id, created_at, ended_at FROM study_sessions WHERE id = ?', (session_id,))
+        session = cursor.fetchone()
+
+      if not session:
+        app.logger.warning(f"Study session not found: {session_id}")
+        return jsonify({"error": "Study session not found"}), 404
+      if closed:
+        app.cache.bump('study_sessions')
+
+      return jsonify({
+        "id": session["id"],
+        "start_time": session["created_at"],
+        "end_time": session["ended_at"],
+        "closed": closed
+      })
+
+    except Exception as e:
+      app.logger.error(f"Error closing study session: {str(e)}", exc_info=True)
+      return jsonify({"error": str(e)}), 500
@@ -1,40 +1,32 @@
 from flask import request, jsonify, g
-from flask_cors import cross_origin
 import json
 from math import ceil
+from lib.pagination import InvalidCursor, keyset_page, wants_cursor, include_total, page_args
+from lib.search import match_query
+from lib.serialization import row_mapper
 
 def load(app):
   # Endpoint: GET /api/words with pagination (50 words per page)
   @app.route('/api/words', methods=['GET'])
-  @cross_origin()
   def get_words():
     app.logger.info("Route hit: /api/words GET")
     try:
-      cursor = app.db.cursor()
-
-      # First, let's check the actual table structure
-      cursor.execute("PRAGMA table_info(words)")
-      columns = cursor.fetchall()
-      app.logger.debug(f"Words table columns: {[col['name'] for col in columns]}")
-        
-      # Get the current page number from query parameters (default is 1)
-      page = int(request.args.get('page', 1))
-      # Ensure page number is positive
-      page = max(1, page)
-      words_per_page = request.args.get('words_per_page', 50)
+      # Bound the page size: every row costs a rollup join and a groups lookup
+      page, words_per_page = page_args(request.args, 50, per_page_arg='words_per_page')
       offset = (page - 1) * words_per_page
 
       # Get sorting parameters from the query string
       sort_by = request.args.get('sort_by', 'kanji')  # Default to sorting by 'kanji'
       order = request.args.get('order', 'asc').upper()  # Default to ascending order
 
-      # Define valid columns mapping
+      # Define valid columns mapping. Review counts come from the word_reviews
+      # rollup, which is kept up to date by triggers on word_review_items.
       valid_columns = {
         'kanji': 'w.kanji',
         'romaji': 'w.romaji',
         'english': 'w.english',
-        'correct_count': 'COALESCE(SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END), 0)',
-        'wrong_count': 'COALESCE(SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END), 0)'
+        'correct_count': 'COALESCE(wr.correct_count, 0)',
+        'wrong_count': 'COALESCE(wr.wrong_count, 0)'
       }
         
       # Validate sort_by parameter
@@ -46,72 +38,91 @@ def load(app):
       if order not in ['ASC', 'DESC']:
         app.logger.warning(f"Invalid sort order: {order}, defaulting to ASC")
         order = 'ASC'
-        
+
+      # Sorting by review counts ranks every word by its rollup, which is
+      # served from the database snapshot in snapshot mode
+      if sort_by in ('correct_count', 'wrong_count'):
+        cursor = app.db.analytics_cursor()
+      else:
+        cursor = app.db.cursor()
+
+      # Keyset mode is opt-in (?pagination=cursor / ?cursor=...), and the
+      # total count can be skipped with ?include_total=false
+      use_cursor = wants_cursor(request.args)
+      with_total = include_total(request.args, default=not use_cursor)
 
       # Get total count for pagination
-      cursor.execute('SELECT COUNT(*) as count FROM words')
-      total_count = cursor.fetchone()['count']
-      total_pages = ceil(total_count / words_per_page)
+      total_count = None
+      total_pages = None
+      if with_total:
+        cursor.execute('SELECT COUNT(*) as count FROM words')
+        total_count = cursor.fetchone()['count']
+        total_pages = ceil(total_count / words_per_page)
         
-      # Build the query with review statistics
-      query = f'''
+      # Page through words + rollup; their groups come from the in-memory
+      # membership index (lib/membership.py) instead of a per-row subquery
+      base_query = f'''
         SELECT 
           w.id,
           w.kanji,
           w.romaji,
           w.english,
-          COALESCE(SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END), 0) as correct_count,
-          COALESCE(SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END), 0) as wrong_count,
-          COALESCE(MAX(wri.created_at), '') as last_reviewed,
-          GROUP_CONCAT(DISTINCT g.id || '::' || g.name) as groups
+          COALESCE(wr.correct_count, 0) as correct_count,
+          COALESCE(wr.wrong_count, 0) as wrong_count,
+          COALESCE(wr.last_reviewed, '') as last_reviewed,
+          {valid_columns[sort_by]} as sort_key
         FROM words w
-        LEFT JOIN word_review_items wri ON w.id = wri.word_id
-        LEFT JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN groups g ON wg.group_id = g.id
-        GROUP BY w.id, w.kanji, w.romaji, w.english
-        ORDER BY {valid_columns[sort_by]} {order}
-        LIMIT ? OFFSET ?
+        LEFT JOIN word_reviews wr ON w.id = wr.word_id
       '''
-        
-      app.logger.debug(f"Executing query with sort_by={sort_by}, order={order}, "
-                      f"limit={words_per_page}, offset={offset}")
-        
-      cursor.execute(query, (words_per_page, offset))
-      words = cursor.fetchall()
 
-      # Process the results
+      next_cursor = None
+      prev_cursor = None
+      if use_cursor:
+        words, next_cursor, prev_cursor = keyset_page(
+          cursor, base_query, [], sort_by, order, words_per_page,
+          token=request.args.get('cursor')
+        )
+      else:
+        app.logger.debug(f"Executing query with sort_by={sort_by}, order={order}, "
+                        f"limit={words_per_page}, offset={offset}")
+        cursor.execute(f'''
+          {base_query}
+          ORDER BY sort_key {order}, w.id {order}
+          LIMIT ? OFFSET ?
+        ''', (words_per_page, offset))
+        words = cursor.fetchall()
+
+      # Process the results. Columns are read by position (resolved once
+      # per page) rather than by name on every sqlite3.Row
+      to_dict = row_mapper(words[0].keys(), {
+        'id': 'id',
+        'kanji': 'kanji',
+        'romaji': 'romaji',
+        'english': 'english',
+        'correct_count': 'correct_count',
+        'wrong_count': 'wrong_count',
+        'last_reviewed': 'last_reviewed'
+      }) if words else None
+      word_rows = [to_dict(word) for word in words]
+      groups = app.membership.groups_for(word['id'] for word in word_rows)
       words_data = []
-      for word in words:
-        # Convert SQLite Row to dict
-        word_dict = dict(word)
-        # Process groups
-        groups = []
-        if word_dict.get('groups'):  # Use get() with default None
-          for group_str in word_dict['groups'].split(','):
-            try:
-              group_id, group_name = group_str.split('::')
-              groups.append({
-                'id': int(group_id),
-                'name': group_name
-              })
-            except ValueError as e:
-              app.logger.error(f"Error splitting group string: {group_str}, error: {str(e)}")
-              continue # Skip malformed group data
+      for word_dict in word_rows:
+        correct_count = word_dict['correct_count'] or 0
+        wrong_count = word_dict['wrong_count'] or 0
         # Build word data
         word_data = {
-          'id': word_dict.get('id'),
-          'kanji': word_dict.get('kanji'),
-          'romaji': word_dict.get('romaji'),
-          'english': word_dict.get('english'),
+          'id': word_dict['id'],
+          'kanji': word_dict['kanji'],
+          'romaji': word_dict['romaji'],
+          'english': word_dict['english'],
           'stats': {
-            'correct_count': word_dict.get('correct_count', 0),
-            'wrong_count': word_dict.get('wrong_count', 0),
-            'accuracy': round(word_dict.get('correct_count', 0) / 
-              (word_dict.get('correct_count', 0) + word_dict.get('wrong_count', 0)) * 100, 2) 
-              if (word_dict.get('correct_count', 0) + word_dict.get('wrong_count', 0)) > 0 else 0,
-            'last_reviewed': word_dict.get('last_reviewed', '')
+            'correct_count': correct_count,
+            'wrong_count': wrong_count,
+            'accuracy': round(correct_count / (correct_count + wrong_count) * 100, 2)
+              if (correct_count + wrong_count) > 0 else 0,
+            'last_reviewed': word_dict['last_reviewed'] or ''
           },
-          'groups': groups
+          'groups': groups[word_dict['id']]
         }
         words_data.append(word_data)
       app.logger.info(f"Retrieved {len(words_data)} words (page {page} of {total_pages})")
@@ -121,38 +132,82 @@ def load(app):
                 'total_items': total_count,
                 'total_pages': total_pages,
                 'current_page': page,
-                'per_page': words_per_page
+                'per_page': words_per_page,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
             },
             'sorting': {
                 'sort_by': sort_by,
                 'order': order
             }
         }) 
+    except InvalidCursor as e:
+      return jsonify({"error": str(e)}), 400
     except Exception as e:
       app.logger.error(f"Error retrieving words: {str(e)}", exc_info=True)
       return jsonify({"error": str(e)}), 500
     finally:
       app.db.close()
 
+  # Endpoint: GET /api/words/search?q=... ranked prefix search over words_fts
+  @app.route('/api/words/search', methods=['GET'])
+  @app.cache.cached('words')
+  def search_words():
+    app.logger.info("Route hit: /api/words/search GET")
+    try:
+      match = match_query(request.args.get('q'))
+      if match is None:
+        return jsonify({"error": "q is required"}), 400
+
+      page, per_page = page_args(request.args, 20)
+
+      # One extra row tells whether there is a next page without counting
+      # every match
+      cursor = app.db.cursor()
+      cursor.execute('''
+        SELECT w.id, w.kanji, w.romaji, w.english, words_fts.rank as rank
+        FROM words_fts
+        JOIN words w ON w.id = words_fts.rowid
+        WHERE words_fts MATCH ?
+        ORDER BY words_fts.rank, w.id
+        LIMIT ? OFFSET ?
+      ''', (match, per_page + 1, (page - 1) * per_page))
+      words = cursor.fetchall()
+
+      return jsonify({
+        'words': [{
+          'id': word['id'],
+          'kanji': word['kanji'],
+          'romaji': word['romaji'],
+          'english': word['english'],
+          'rank': word['rank']
+        } for word in words[:per_page]],
+        'pagination': {
+          'current_page': page,
+          'per_page': per_page,
+          'has_more': len(words) > per_page
+        },
+        'query': request.args.get('q')
+      })
+    except Exception as e:
+      app.logger.error(f"Error searching words: {str(e)}", exc_info=True)
+      return jsonify({"error": str(e)}), 500
+
   # Endpoint: GET /words/:id to get a single word with its details
   @app.route('/api/words/<int:word_id>', methods=['GET'])
-  @cross_origin()
   def get_word(word_id):
     try:
       cursor = app.db.cursor()
       
-      # Query to fetch the word and its details
+      # Query to fetch the word and its review counts; its groups come from
+      # the membership index, as in get_words
       cursor.execute('''
         SELECT w.id, w.kanji, w.romaji, w.english,
                COALESCE(r.correct_count, 0) AS correct_count,
-               COALESCE(r.wrong_count, 0) AS wrong_count,
-               GROUP_CONCAT(DISTINCT g.id || '::' || g.name) as groups
+               COALESCE(r.wrong_count, 0) AS wrong_count
         FROM words w
         LEFT JOIN word_reviews r ON w.id = r.word_id
-        LEFT JOIN word_groups wg ON w.id = wg.word_id
-        LEFT JOIN groups g ON wg.group_id = g.id
         WHERE w.id = ?
-        GROUP BY w.id
       ''', (word_id,))
       
       word = cursor.fetchone()
@@ -160,15 +215,7 @@ def load(app):
       if not word:
         return jsonify({"error": "Word not found"}), 404
       
-      # Parse the groups string into a list of group objects
-      groups = []
-      if word["groups"]:
-        for group_str in word["groups"].split(','):
-          group_id, group_name = group_str.split('::')
-          groups.append({
-            "id": int(group_id),
-            "name": group_name
-          })
+      groups = app.membership.groups_for([word_id])[word_id]
       
       return jsonify({
         "word": {
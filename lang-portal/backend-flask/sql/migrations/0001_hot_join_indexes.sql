@@ -0,0 +1,31 @@
+-- Secondary indexes for the joins used by the words, groups, study session
+-- and dashboard routes.
+
+-- Remove duplicate word/group links before enforcing uniqueness
+DELETE FROM word_groups
+WHERE rowid NOT IN (
+  SELECT MIN(rowid) FROM word_groups GROUP BY word_id, group_id
+);
+
+UPDATE groups
+SET words_count = (
+  SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id
+);
+
+-- word_groups is queried from both sides
+CREATE UNIQUE INDEX IF NOT EXISTS idx_word_groups_word_group ON word_groups(word_id, group_id);
+CREATE INDEX IF NOT EXISTS idx_word_groups_group_word ON word_groups(group_id, word_id);
+
+-- Covering indexes for per-word and per-session review aggregates
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word ON word_review_items(word_id, correct, created_at);
+CREATE INDEX IF NOT EXISTS idx_word_review_items_session ON word_review_items(study_session_id, word_id, correct, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group ON study_sessions(group_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_activity ON study_sessions(study_activity_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created_at ON study_sessions(created_at);
+
+-- Default sort columns of the list endpoints
+CREATE INDEX IF NOT EXISTS idx_words_kanji ON words(kanji);
+CREATE INDEX IF NOT EXISTS idx_groups_name ON groups(name);
+
+ANALYZE;
@@ -0,0 +1,74 @@
+-- Keep word_reviews as a per-word rollup of word_review_items so the words
+-- listing never has to aggregate the full review history.
+
+-- Backfill from the existing review history
+DELETE FROM word_reviews;
+INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+SELECT
+  word_id,
+  SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END),
+  SUM(CASE WHEN correct = 1 THEN 0 ELSE 1 END),
+  MAX(created_at)
+FROM word_review_items
+GROUP BY word_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_word_reviews_word ON word_reviews(word_id);
+CREATE INDEX IF NOT EXISTS idx_word_reviews_correct ON word_reviews(correct_count);
+CREATE INDEX IF NOT EXISTS idx_word_reviews_wrong ON word_reviews(wrong_count);
+
+-- Triggers run inside the writing transaction, so the rollup always commits
+-- (or rolls back) together with the review items.
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_insert
+AFTER INSERT ON word_review_items
+BEGIN
+  INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+  VALUES (
+    NEW.word_id,
+    CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END,
+    CASE WHEN NEW.correct = 1 THEN 0 ELSE 1 END,
+    COALESCE(NEW.created_at, CURRENT_TIMESTAMP)
+  )
+  ON CONFLICT(word_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count,
+    last_reviewed = MAX(COALESCE(last_reviewed, ''), excluded.last_reviewed);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_delete
+AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE word_reviews
+  SET
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END),
+    wrong_count = wrong_count - (CASE WHEN OLD.correct = 1 THEN 0 ELSE 1 END),
+    last_reviewed = (SELECT MAX(created_at) FROM word_review_items WHERE word_id = OLD.word_id)
+  WHERE word_id = OLD.word_id;
+
+  DELETE FROM word_reviews
+  WHERE word_id = OLD.word_id AND correct_count <= 0 AND wrong_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_update
+AFTER UPDATE OF word_id, correct ON word_review_items
+BEGIN
+  UPDATE word_reviews
+  SET
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END),
+    wrong_count = wrong_count - (CASE WHEN OLD.correct = 1 THEN 0 ELSE 1 END)
+  WHERE word_id = OLD.word_id;
+
+  INSERT INTO word_reviews (word_id, correct_count, wrong_count, last_reviewed)
+  VALUES (
+    NEW.word_id,
+    CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END,
+    CASE WHEN NEW.correct = 1 THEN 0 ELSE 1 END,
+    NEW.created_at
+  )
+  ON CONFLICT(word_id) DO UPDATE SET
+    correct_count = correct_count + excluded.correct_count,
+    wrong_count = wrong_count + excluded.wrong_count,
+    last_reviewed = MAX(COALESCE(last_reviewed, ''), excluded.last_reviewed);
+
+  DELETE FROM word_reviews
+  WHERE word_id = OLD.word_id AND correct_count <= 0 AND wrong_count <= 0;
+END;
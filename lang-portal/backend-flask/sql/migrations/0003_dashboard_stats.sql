@@ -0,0 +1,147 @@
+-- Single-row materialization of the dashboard counters, maintained by
+-- triggers so /api/dashboard/stats and /api/dashboard/recent-session are
+-- constant-time reads. Mastery and review totals are derived from the
+-- word_reviews rollup (see 0002_word_review_rollup.sql).
+
+CREATE TABLE IF NOT EXISTS dashboard_stats (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  total_vocabulary INTEGER NOT NULL DEFAULT 0,
+  total_words_studied INTEGER NOT NULL DEFAULT 0,
+  mastered_words INTEGER NOT NULL DEFAULT 0,  -- >= 5 attempts and >= 80% correct
+  total_reviews INTEGER NOT NULL DEFAULT 0,
+  correct_reviews INTEGER NOT NULL DEFAULT 0,
+  total_sessions INTEGER NOT NULL DEFAULT 0,
+  last_session_id INTEGER  -- Most recent study session
+);
+
+-- One row per day with at least one study session (used for the streak)
+CREATE TABLE IF NOT EXISTS study_days (
+  study_date DATE PRIMARY KEY,
+  session_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+-- Backfill
+DELETE FROM dashboard_stats;
+INSERT INTO dashboard_stats (
+  id, total_vocabulary, total_words_studied, mastered_words,
+  total_reviews, correct_reviews, total_sessions, last_session_id
+)
+SELECT
+  1,
+  (SELECT COUNT(*) FROM words),
+  (SELECT COUNT(*) FROM word_reviews),
+  (SELECT COUNT(*) FROM word_reviews
+   WHERE correct_count + wrong_count >= 5
+     AND correct_count * 1.0 / (correct_count + wrong_count) >= 0.8),
+  (SELECT COALESCE(SUM(correct_count + wrong_count), 0) FROM word_reviews),
+  (SELECT COALESCE(SUM(correct_count), 0) FROM word_reviews),
+  (SELECT COUNT(*) FROM study_sessions),
+  (SELECT id FROM study_sessions ORDER BY created_at DESC, id DESC LIMIT 1);
+
+DELETE FROM study_days;
+INSERT INTO study_days (study_date, session_count)
+SELECT date(created_at), COUNT(*)
+FROM study_sessions
+GROUP BY date(created_at);
+
+-- Vocabulary size
+CREATE TRIGGER IF NOT EXISTS trg_dashboard_words_insert
+AFTER INSERT ON words
+BEGIN
+  UPDATE dashboard_stats SET total_vocabulary = total_vocabulary + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dashboard_words_delete
+AFTER DELETE ON words
+BEGIN
+  UPDATE dashboard_stats SET total_vocabulary = total_vocabulary - 1 WHERE id = 1;
+END;
+
+-- Review totals and mastery, following the word_reviews rollup
+CREATE TRIGGER IF NOT EXISTS trg_dashboard_word_reviews_insert
+AFTER INSERT ON word_reviews
+BEGIN
+  UPDATE dashboard_stats
+  SET
+    total_words_studied = total_words_studied + 1,
+    total_reviews = total_reviews + NEW.correct_count + NEW.wrong_count,
+    correct_reviews = correct_reviews + NEW.correct_count,
+    mastered_words = mastered_words + (
+      NEW.correct_count + NEW.wrong_count >= 5
+      AND NEW.correct_count * 1.0 / (NEW.correct_count + NEW.wrong_count) >= 0.8
+    )
+  WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dashboard_word_reviews_update
+AFTER UPDATE OF correct_count, wrong_count ON word_reviews
+BEGIN
+  UPDATE dashboard_stats
+  SET
+    total_reviews = total_reviews
+      + (NEW.correct_count + NEW.wrong_count)
+      - (OLD.correct_count + OLD.wrong_count),
+    correct_reviews = correct_reviews + NEW.correct_count - OLD.correct_count,
+    mastered_words = mastered_words
+      + (
+        NEW.correct_count + NEW.wrong_count >= 5
+        AND NEW.correct_count * 1.0 / (NEW.correct_count + NEW.wrong_count) >= 0.8
+      )
+      - (
+        OLD.correct_count + OLD.wrong_count >= 5
+        AND OLD.correct_count * 1.0 / (OLD.correct_count + OLD.wrong_count) >= 0.8
+      )
+  WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dashboard_word_reviews_delete
+AFTER DELETE ON word_reviews
+BEGIN
+  UPDATE dashboard_stats
+  SET
+    total_words_studied = total_words_studied - 1,
+    total_reviews = total_reviews - OLD.correct_count - OLD.wrong_count,
+    correct_reviews = correct_reviews - OLD.correct_count,
+    mastered_words = mastered_words - (
+      OLD.correct_count + OLD.wrong_count >= 5
+      AND OLD.correct_count * 1.0 / (OLD.correct_count + OLD.wrong_count) >= 0.8
+    )
+  WHERE id = 1;
+END;
+
+-- Sessions, most recent session and study days
+CREATE TRIGGER IF NOT EXISTS trg_dashboard_sessions_insert
+AFTER INSERT ON study_sessions
+BEGIN
+  UPDATE dashboard_stats
+  SET
+    total_sessions = total_sessions + 1,
+    last_session_id = CASE
+      WHEN last_session_id IS NULL
+        OR NEW.created_at >= COALESCE((SELECT created_at FROM study_sessions WHERE id = last_session_id), '')
+      THEN NEW.id
+      ELSE last_session_id
+    END
+  WHERE id = 1;
+
+  INSERT INTO study_days (study_date, session_count)
+  VALUES (date(NEW.created_at), 1)
+  ON CONFLICT(study_date) DO UPDATE SET session_count = session_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_dashboard_sessions_delete
+AFTER DELETE ON study_sessions
+BEGIN
+  UPDATE dashboard_stats
+  SET
+    total_sessions = total_sessions - 1,
+    last_session_id = CASE
+      WHEN last_session_id = OLD.id
+      THEN (SELECT id FROM study_sessions ORDER BY created_at DESC, id DESC LIMIT 1)
+      ELSE last_session_id
+    END
+  WHERE id = 1;
+
+  UPDATE study_days SET session_count = session_count - 1 WHERE study_date = date(OLD.created_at);
+  DELETE FROM study_days WHERE study_date = date(OLD.created_at) AND session_count <= 0;
+END;
@@ -0,0 +1,38 @@
+-- Make (kanji, romaji, english) the natural key of words so imports can
+-- dedupe with INSERT ... ON CONFLICT instead of a lookup per word.
+
+-- Fold duplicate words into the oldest copy
+CREATE TEMP TABLE word_dupes AS
+SELECT w.id AS dupe_id, k.keep_id
+FROM words w
+JOIN (
+  SELECT MIN(id) AS keep_id, kanji, romaji, english
+  FROM words
+  GROUP BY kanji, romaji, english
+  HAVING COUNT(*) > 1
+) k ON w.kanji = k.kanji AND w.romaji = k.romaji AND w.english = k.english
+WHERE w.id <> k.keep_id;
+
+-- The word_reviews rollup follows along through trg_word_reviews_update
+UPDATE word_review_items
+SET word_id = (SELECT keep_id FROM word_dupes WHERE dupe_id = word_review_items.word_id)
+WHERE word_id IN (SELECT dupe_id FROM word_dupes);
+
+INSERT OR IGNORE INTO word_groups (word_id, group_id)
+SELECT d.keep_id, wg.group_id
+FROM word_groups wg
+JOIN word_dupes d ON wg.word_id = d.dupe_id;
+
+DELETE FROM word_groups WHERE word_id IN (SELECT dupe_id FROM word_dupes);
+DELETE FROM words WHERE id IN (SELECT dupe_id FROM word_dupes);
+
+DROP TABLE word_dupes;
+
+UPDATE groups
+SET words_count = (
+  SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id
+);
+
+-- Also serves the kanji sort, so the single-column index is redundant
+CREATE UNIQUE INDEX IF NOT EXISTS idx_words_natural_key ON words(kanji, romaji, english);
+DROP INDEX IF EXISTS idx_words_kanji;
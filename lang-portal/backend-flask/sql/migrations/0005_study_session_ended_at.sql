@@ -0,0 +1,3 @@
+-- Sessions get a real end time, set when the session is closed
+-- (POST /api/study-sessions/:id/close). Open sessions keep NULL.
+ALTER TABLE study_sessions ADD COLUMN ended_at DATETIME;
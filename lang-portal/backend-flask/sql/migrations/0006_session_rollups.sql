@@ -0,0 +1,129 @@
+-- Per-session rollups so the session endpoints never group over
+-- word_review_items: review/correct counts and last activity on the session
+-- row, and per-word counts in session_words. Triggers keep both current
+-- while a session is open; closing a session recomputes them from the raw
+-- items (see lib/sessions.py).
+
+ALTER TABLE study_sessions ADD COLUMN review_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_sessions ADD COLUMN correct_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE study_sessions ADD COLUMN last_activity_at DATETIME;
+
+CREATE TABLE IF NOT EXISTS session_words (
+  study_session_id INTEGER NOT NULL,
+  word_id INTEGER NOT NULL,
+  review_count INTEGER NOT NULL DEFAULT 0,
+  correct_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (study_session_id, word_id)
+) WITHOUT ROWID;
+
+-- Backfill from the existing review history
+UPDATE study_sessions
+SET
+  review_count = (
+    SELECT COUNT(*) FROM word_review_items WHERE study_session_id = study_sessions.id
+  ),
+  correct_count = (
+    SELECT COUNT(*) FROM word_review_items WHERE study_session_id = study_sessions.id AND correct = 1
+  ),
+  last_activity_at = (
+    SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = study_sessions.id
+  );
+
+INSERT INTO session_words (study_session_id, word_id, review_count, correct_count)
+SELECT
+  study_session_id,
+  word_id,
+  COUNT(*),
+  SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END)
+FROM word_review_items
+GROUP BY study_session_id, word_id;
+
+-- Open sessions, for the idle sweeper
+CREATE INDEX IF NOT EXISTS idx_study_sessions_open
+ON study_sessions(COALESCE(last_activity_at, created_at))
+WHERE ended_at IS NULL;
+
+-- Reviews that arrive after a session was closed (late buffered batches)
+-- push its end time forward instead of being dropped.
+CREATE TRIGGER IF NOT EXISTS trg_session_rollups_insert
+AFTER INSERT ON word_review_items
+BEGIN
+  UPDATE study_sessions
+  SET
+    review_count = review_count + 1,
+    correct_count = correct_count + (CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END),
+    last_activity_at = MAX(COALESCE(last_activity_at, ''), NEW.created_at),
+    ended_at = CASE WHEN ended_at IS NULL THEN NULL ELSE MAX(ended_at, NEW.created_at) END
+  WHERE id = NEW.study_session_id;
+
+  INSERT INTO session_words (study_session_id, word_id, review_count, correct_count)
+  VALUES (NEW.study_session_id, NEW.word_id, 1, CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END)
+  ON CONFLICT(study_session_id, word_id) DO UPDATE SET
+    review_count = review_count + 1,
+    correct_count = correct_count + excluded.correct_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_session_rollups_delete
+AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE study_sessions
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END),
+    last_activity_at = (
+      SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = OLD.study_session_id
+    )
+  WHERE id = OLD.study_session_id;
+
+  UPDATE session_words
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END)
+  WHERE study_session_id = OLD.study_session_id AND word_id = OLD.word_id;
+
+  DELETE FROM session_words
+  WHERE study_session_id = OLD.study_session_id AND word_id = OLD.word_id AND review_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_session_rollups_update
+AFTER UPDATE OF word_id, study_session_id, correct, created_at ON word_review_items
+BEGIN
+  UPDATE study_sessions
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END)
+  WHERE id = OLD.study_session_id;
+
+  UPDATE study_sessions
+  SET
+    review_count = review_count + 1,
+    correct_count = correct_count + (CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END)
+  WHERE id = NEW.study_session_id;
+
+  UPDATE study_sessions
+  SET last_activity_at = (
+    SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = study_sessions.id
+  )
+  WHERE id IN (OLD.study_session_id, NEW.study_session_id);
+
+  UPDATE session_words
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END)
+  WHERE study_session_id = OLD.study_session_id AND word_id = OLD.word_id;
+
+  INSERT INTO session_words (study_session_id, word_id, review_count, correct_count)
+  VALUES (NEW.study_session_id, NEW.word_id, 1, CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END)
+  ON CONFLICT(study_session_id, word_id) DO UPDATE SET
+    review_count = review_count + 1,
+    correct_count = correct_count + excluded.correct_count;
+
+  DELETE FROM session_words
+  WHERE study_session_id = OLD.study_session_id AND word_id = OLD.word_id AND review_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_session_words_session_delete
+AFTER DELETE ON study_sessions
+BEGIN
+  DELETE FROM session_words WHERE study_session_id = OLD.id;
+END;
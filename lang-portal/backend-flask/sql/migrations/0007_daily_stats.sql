@@ -0,0 +1,275 @@
+-- Daily statistics buckets for /api/study-sessions/stats. Reviews count
+-- towards the day their session started (like the original DATE(created_at)
+-- filter), per activity and per group; daily_words keeps the distinct words
+-- of each bucket so "words reviewed" can be counted over any date range.
+
+CREATE TABLE IF NOT EXISTS daily_activity_stats (
+  stat_date TEXT NOT NULL,
+  study_activity_id INTEGER NOT NULL,
+  session_count INTEGER NOT NULL DEFAULT 0,
+  review_count INTEGER NOT NULL DEFAULT 0,
+  correct_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (stat_date, study_activity_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_group_stats (
+  stat_date TEXT NOT NULL,
+  group_id INTEGER NOT NULL,
+  session_count INTEGER NOT NULL DEFAULT 0,
+  review_count INTEGER NOT NULL DEFAULT 0,
+  correct_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (stat_date, group_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_words (
+  stat_date TEXT NOT NULL,
+  study_activity_id INTEGER NOT NULL,
+  group_id INTEGER NOT NULL,
+  word_id INTEGER NOT NULL,
+  review_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (stat_date, study_activity_id, group_id, word_id)
+) WITHOUT ROWID;
+
+-- Backfill from the sessions and their review items
+INSERT INTO daily_activity_stats (stat_date, study_activity_id, session_count, review_count, correct_count)
+SELECT date(created_at), study_activity_id, COUNT(*), SUM(review_count), SUM(correct_count)
+FROM study_sessions
+GROUP BY date(created_at), study_activity_id;
+
+INSERT INTO daily_group_stats (stat_date, group_id, session_count, review_count, correct_count)
+SELECT date(created_at), group_id, COUNT(*), SUM(review_count), SUM(correct_count)
+FROM study_sessions
+GROUP BY date(created_at), group_id;
+
+INSERT INTO daily_words (stat_date, study_activity_id, group_id, word_id, review_count)
+SELECT date(ss.created_at), ss.study_activity_id, ss.group_id, sw.word_id, SUM(sw.review_count)
+FROM session_words sw
+JOIN study_sessions ss ON ss.id = sw.study_session_id
+GROUP BY date(ss.created_at), ss.study_activity_id, ss.group_id, sw.word_id;
+
+-- Reviews
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_review_insert
+AFTER INSERT ON word_review_items
+BEGIN
+  INSERT INTO daily_activity_stats (stat_date, study_activity_id, review_count, correct_count)
+  SELECT date(created_at), study_activity_id, 1, CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END
+  FROM study_sessions WHERE id = NEW.study_session_id
+  ON CONFLICT(stat_date, study_activity_id) DO UPDATE SET
+    review_count = review_count + 1,
+    correct_count = correct_count + excluded.correct_count;
+
+  INSERT INTO daily_group_stats (stat_date, group_id, review_count, correct_count)
+  SELECT date(created_at), group_id, 1, CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END
+  FROM study_sessions WHERE id = NEW.study_session_id
+  ON CONFLICT(stat_date, group_id) DO UPDATE SET
+    review_count = review_count + 1,
+    correct_count = correct_count + excluded.correct_count;
+
+  INSERT INTO daily_words (stat_date, study_activity_id, group_id, word_id, review_count)
+  SELECT date(created_at), study_activity_id, group_id, NEW.word_id, 1
+  FROM study_sessions WHERE id = NEW.study_session_id
+  ON CONFLICT(stat_date, study_activity_id, group_id, word_id) DO UPDATE SET
+    review_count = review_count + 1;
+END;
+
+-- Reviews of deleted sessions no longer belong to any bucket, so the
+-- lookups below simply match nothing for them
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_review_delete
+AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE daily_activity_stats
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END)
+  WHERE (stat_date, study_activity_id) = (
+    SELECT date(created_at), study_activity_id FROM study_sessions WHERE id = OLD.study_session_id
+  );
+
+  UPDATE daily_group_stats
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END)
+  WHERE (stat_date, group_id) = (
+    SELECT date(created_at), group_id FROM study_sessions WHERE id = OLD.study_session_id
+  );
+
+  UPDATE daily_words
+  SET review_count = review_count - 1
+  WHERE word_id = OLD.word_id AND (stat_date, study_activity_id, group_id) = (
+    SELECT date(created_at), study_activity_id, group_id FROM study_sessions WHERE id = OLD.study_session_id
+  );
+
+  DELETE FROM daily_words
+  WHERE word_id = OLD.word_id AND review_count <= 0 AND (stat_date, study_activity_id, group_id) = (
+    SELECT date(created_at), study_activity_id, group_id FROM study_sessions WHERE id = OLD.study_session_id
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_review_update
+AFTER UPDATE OF word_id, study_session_id, correct ON word_review_items
+BEGIN
+  UPDATE daily_activity_stats
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END)
+  WHERE (stat_date, study_activity_id) = (
+    SELECT date(created_at), study_activity_id FROM study_sessions WHERE id = OLD.study_session_id
+  );
+
+  UPDATE daily_group_stats
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END)
+  WHERE (stat_date, group_id) = (
+    SELECT date(created_at), group_id FROM study_sessions WHERE id = OLD.study_session_id
+  );
+
+  UPDATE daily_words
+  SET review_count = review_count - 1
+  WHERE word_id = OLD.word_id AND (stat_date, study_activity_id, group_id) = (
+    SELECT date(created_at), study_activity_id, group_id FROM study_sessions WHERE id = OLD.study_session_id
+  );
+
+  INSERT INTO daily_activity_stats (stat_date, study_activity_id, review_count, correct_count)
+  SELECT date(created_at), study_activity_id, 1, CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END
+  FROM study_sessions WHERE id = NEW.study_session_id
+  ON CONFLICT(stat_date, study_activity_id) DO UPDATE SET
+    review_count = review_count + 1,
+    correct_count = correct_count + excluded.correct_count;
+
+  INSERT INTO daily_group_stats (stat_date, group_id, review_count, correct_count)
+  SELECT date(created_at), group_id, 1, CASE WHEN NEW.correct = 1 THEN 1 ELSE 0 END
+  FROM study_sessions WHERE id = NEW.study_session_id
+  ON CONFLICT(stat_date, group_id) DO UPDATE SET
+    review_count = review_count + 1,
+    correct_count = correct_count + excluded.correct_count;
+
+  INSERT INTO daily_words (stat_date, study_activity_id, group_id, word_id, review_count)
+  SELECT date(created_at), study_activity_id, group_id, NEW.word_id, 1
+  FROM study_sessions WHERE id = NEW.study_session_id
+  ON CONFLICT(stat_date, study_activity_id, group_id, word_id) DO UPDATE SET
+    review_count = review_count + 1;
+
+  DELETE FROM daily_words
+  WHERE word_id = OLD.word_id AND review_count <= 0 AND (stat_date, study_activity_id, group_id) = (
+    SELECT date(created_at), study_activity_id, group_id FROM study_sessions WHERE id = OLD.study_session_id
+  );
+END;
+
+-- Sessions
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_session_insert
+AFTER INSERT ON study_sessions
+BEGIN
+  INSERT INTO daily_activity_stats (stat_date, study_activity_id, session_count)
+  VALUES (date(NEW.created_at), NEW.study_activity_id, 1)
+  ON CONFLICT(stat_date, study_activity_id) DO UPDATE SET session_count = session_count + 1;
+
+  INSERT INTO daily_group_stats (stat_date, group_id, session_count)
+  VALUES (date(NEW.created_at), NEW.group_id, 1)
+  ON CONFLICT(stat_date, group_id) DO UPDATE SET session_count = session_count + 1;
+END;
+
+-- Moving a session (PUT /api/study-sessions/:id) moves its counts and words
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_session_update
+AFTER UPDATE OF group_id, study_activity_id, created_at ON study_sessions
+WHEN OLD.group_id IS NOT NEW.group_id
+  OR OLD.study_activity_id IS NOT NEW.study_activity_id
+  OR date(OLD.created_at) IS NOT date(NEW.created_at)
+BEGIN
+  UPDATE daily_activity_stats
+  SET
+    session_count = session_count - 1,
+    review_count = review_count - OLD.review_count,
+    correct_count = correct_count - OLD.correct_count
+  WHERE stat_date = date(OLD.created_at) AND study_activity_id = OLD.study_activity_id;
+
+  UPDATE daily_group_stats
+  SET
+    session_count = session_count - 1,
+    review_count = review_count - OLD.review_count,
+    correct_count = correct_count - OLD.correct_count
+  WHERE stat_date = date(OLD.created_at) AND group_id = OLD.group_id;
+
+  UPDATE daily_words
+  SET review_count = review_count - (
+    SELECT sw.review_count FROM session_words sw
+    WHERE sw.study_session_id = OLD.id AND sw.word_id = daily_words.word_id
+  )
+  WHERE stat_date = date(OLD.created_at)
+    AND study_activity_id = OLD.study_activity_id
+    AND group_id = OLD.group_id
+    AND word_id IN (SELECT word_id FROM session_words WHERE study_session_id = OLD.id);
+
+  INSERT INTO daily_activity_stats (stat_date, study_activity_id, session_count, review_count, correct_count)
+  VALUES (date(NEW.created_at), NEW.study_activity_id, 1, NEW.review_count, NEW.correct_count)
+  ON CONFLICT(stat_date, study_activity_id) DO UPDATE SET
+    session_count = session_count + 1,
+    review_count = review_count + excluded.review_count,
+    correct_count = correct_count + excluded.correct_count;
+
+  INSERT INTO daily_group_stats (stat_date, group_id, session_count, review_count, correct_count)
+  VALUES (date(NEW.created_at), NEW.group_id, 1, NEW.review_count, NEW.correct_count)
+  ON CONFLICT(stat_date, group_id) DO UPDATE SET
+    session_count = session_count + 1,
+    review_count = review_count + excluded.review_count,
+    correct_count = correct_count + excluded.correct_count;
+
+  INSERT INTO daily_words (stat_date, study_activity_id, group_id, word_id, review_count)
+  SELECT date(NEW.created_at), NEW.study_activity_id, NEW.group_id, word_id, review_count
+  FROM session_words WHERE study_session_id = NEW.id
+  ON CONFLICT(stat_date, study_activity_id, group_id, word_id) DO UPDATE SET
+    review_count = review_count + excluded.review_count;
+
+  DELETE FROM daily_words
+  WHERE stat_date = date(OLD.created_at)
+    AND study_activity_id = OLD.study_activity_id
+    AND group_id = OLD.group_id
+    AND review_count <= 0;
+END;
+
+-- Replaces trg_session_words_session_delete (0006): daily_words has to be
+-- decremented from session_words before those rows are removed, and the
+-- order of separate triggers on the same event is not guaranteed.
+DROP TRIGGER IF EXISTS trg_session_words_session_delete;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_session_delete
+AFTER DELETE ON study_sessions
+BEGIN
+  UPDATE daily_activity_stats
+  SET
+    session_count = session_count - 1,
+    review_count = review_count - OLD.review_count,
+    correct_count = correct_count - OLD.correct_count
+  WHERE stat_date = date(OLD.created_at) AND study_activity_id = OLD.study_activity_id;
+
+  UPDATE daily_group_stats
+  SET
+    session_count = session_count - 1,
+    review_count = review_count - OLD.review_count,
+    correct_count = correct_count - OLD.correct_count
+  WHERE stat_date = date(OLD.created_at) AND group_id = OLD.group_id;
+
+  UPDATE daily_words
+  SET review_count = review_count - (
+    SELECT sw.review_count FROM session_words sw
+    WHERE sw.study_session_id = OLD.id AND sw.word_id = daily_words.word_id
+  )
+  WHERE stat_date = date(OLD.created_at)
+    AND study_activity_id = OLD.study_activity_id
+    AND group_id = OLD.group_id
+    AND word_id IN (SELECT word_id FROM session_words WHERE study_session_id = OLD.id);
+
+  DELETE FROM session_words WHERE study_session_id = OLD.id;
+
+  DELETE FROM daily_words
+  WHERE stat_date = date(OLD.created_at)
+    AND study_activity_id = OLD.study_activity_id
+    AND group_id = OLD.group_id
+    AND review_count <= 0;
+  DELETE FROM daily_activity_stats
+  WHERE stat_date = date(OLD.created_at) AND study_activity_id = OLD.study_activity_id
+    AND session_count <= 0 AND review_count <= 0;
+  DELETE FROM daily_group_stats
+  WHERE stat_date = date(OLD.created_at) AND group_id = OLD.group_id
+    AND session_count <= 0 AND review_count <= 0;
+END;
@@ -0,0 +1,66 @@
+-- SM-2 review schedule of every word in every group (see lib/srs.py).
+-- Rows follow word_groups: a word linked to a group is due immediately,
+-- and each review of it in a session of that group moves its due date.
+-- idx_word_schedules_due serves GET /api/groups/:id/due as a plain range
+-- scan in due order.
+
+CREATE TABLE IF NOT EXISTS word_schedules (
+  group_id INTEGER NOT NULL,
+  word_id INTEGER NOT NULL,
+  ease REAL NOT NULL DEFAULT 2.5,
+  interval_days INTEGER NOT NULL DEFAULT 0,
+  repetitions INTEGER NOT NULL DEFAULT 0,
+  lapses INTEGER NOT NULL DEFAULT 0,
+  due_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  last_reviewed_at DATETIME,
+  PRIMARY KEY (group_id, word_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_word_schedules_due ON word_schedules(group_id, due_at, word_id);
+
+-- Every existing link starts out new; `invoke rebuild-word-schedules`
+-- replays the review history into it
+INSERT OR IGNORE INTO word_schedules (group_id, word_id)
+SELECT group_id, word_id FROM word_groups;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_schedules_link_insert
+AFTER INSERT ON word_groups
+BEGIN
+  INSERT OR IGNORE INTO word_schedules (group_id, word_id) VALUES (NEW.group_id, NEW.word_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_schedules_link_delete
+AFTER DELETE ON word_groups
+BEGIN
+  DELETE FROM word_schedules WHERE group_id = OLD.group_id AND word_id = OLD.word_id;
+END;
+
+-- SM-2 with a binary grade: a correct answer is quality 4 (ease unchanged,
+-- interval 1, 6, then interval * ease days), a wrong one is quality 2
+-- (ease - 0.32, floored at 1.3, and the word starts over at 1 day).
+-- Intervals are capped at 36500 days (MAX_INTERVAL_DAYS): without a cap a
+-- word answered right over and over grows its interval until datetime()
+-- runs past year 9999, returns NULL and the review insert fails on due_at.
+-- Keep in sync with lib/srs.py.
+CREATE TRIGGER IF NOT EXISTS trg_word_schedules_review
+AFTER INSERT ON word_review_items
+BEGIN
+  UPDATE word_schedules
+  SET
+    interval_days = CASE
+      WHEN NEW.correct != 1 OR repetitions = 0 THEN 1
+      WHEN repetitions = 1 THEN 6
+      ELSE MIN(36500, CAST(ROUND(interval_days * ease) AS INTEGER))
+    END,
+    repetitions = CASE WHEN NEW.correct = 1 THEN repetitions + 1 ELSE 0 END,
+    lapses = lapses + (CASE WHEN NEW.correct = 1 THEN 0 ELSE 1 END),
+    ease = CASE WHEN NEW.correct = 1 THEN ease ELSE MAX(1.3, ease - 0.32) END,
+    last_reviewed_at = NEW.created_at
+  WHERE group_id = (SELECT group_id FROM study_sessions WHERE id = NEW.study_session_id)
+    AND word_id = NEW.word_id;
+
+  UPDATE word_schedules
+  SET due_at = datetime(last_reviewed_at, '+' || interval_days || ' days')
+  WHERE group_id = (SELECT group_id FROM study_sessions WHERE id = NEW.study_session_id)
+    AND word_id = NEW.word_id;
+END;
@@ -0,0 +1,43 @@
+-- Full-text index over words for GET /api/words/search. words_fts is an
+-- external content table (the text lives in words only), kept in sync by
+-- the triggers below. Prefix indexes for 2 and 3 characters keep short
+-- prefix queries from scanning the whole term list. Kana and width
+-- normalization happen on the query side (lib/search.py).
+
+CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+  kanji,
+  romaji,
+  english,
+  content='words',
+  content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2',
+  prefix='2 3'
+);
+
+INSERT INTO words_fts(words_fts) VALUES ('rebuild');
+
+-- ORDER BY rank: a kanji match outranks romaji, which outranks english
+INSERT INTO words_fts(words_fts, rank) VALUES ('rank', 'bm25(4.0, 2.0, 1.0)');
+
+CREATE TRIGGER IF NOT EXISTS trg_words_fts_insert
+AFTER INSERT ON words
+BEGIN
+  INSERT INTO words_fts (rowid, kanji, romaji, english)
+  VALUES (NEW.id, NEW.kanji, NEW.romaji, NEW.english);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_fts_delete
+AFTER DELETE ON words
+BEGIN
+  INSERT INTO words_fts (words_fts, rowid, kanji, romaji, english)
+  VALUES ('delete', OLD.id, OLD.kanji, OLD.romaji, OLD.english);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_words_fts_update
+AFTER UPDATE OF kanji, romaji, english ON words
+BEGIN
+  INSERT INTO words_fts (words_fts, rowid, kanji, romaji, english)
+  VALUES ('delete', OLD.id, OLD.kanji, OLD.romaji, OLD.english);
+  INSERT INTO words_fts (rowid, kanji, romaji, english)
+  VALUES (NEW.id, NEW.kanji, NEW.romaji, NEW.english);
+END;
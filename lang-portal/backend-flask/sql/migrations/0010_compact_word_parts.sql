@@ -0,0 +1,7 @@
+-- Store word parts as compact JSON so list endpoints can splice them into
+-- responses without parsing (see lib/serialization.py). Rows that do not
+-- hold valid JSON are left alone and served as strings.
+
+UPDATE words
+SET parts = json(parts)
+WHERE json_valid(parts) AND parts != json(parts);
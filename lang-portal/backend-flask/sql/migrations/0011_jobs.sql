@@ -0,0 +1,22 @@
+-- Background jobs (see lib/jobs.py). Long maintenance work (history reset,
+-- group deletes, words_count recounts) is queued here and run by the
+-- JobRunner in small write transactions. Rows survive restarts: a job whose
+-- heartbeat went stale while running is picked up again.
+
+CREATE TABLE IF NOT EXISTS jobs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  kind TEXT NOT NULL,
+  params TEXT NOT NULL DEFAULT '{}',
+  status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+  progress INTEGER NOT NULL DEFAULT 0,
+  total INTEGER,
+  result TEXT,
+  error TEXT,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  started_at DATETIME,
+  heartbeat_at DATETIME,
+  finished_at DATETIME
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
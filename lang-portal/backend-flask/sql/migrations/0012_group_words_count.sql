@@ -0,0 +1,20 @@
+-- groups.words_count follows word_groups through triggers, so imports and
+-- the batched link deletes of the delete_group job (lib/jobs.py) keep it
+-- current without a recount.
+
+CREATE TRIGGER IF NOT EXISTS trg_groups_words_count_insert
+AFTER INSERT ON word_groups
+BEGIN
+  UPDATE groups SET words_count = words_count + 1 WHERE id = NEW.group_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_groups_words_count_delete
+AFTER DELETE ON word_groups
+BEGIN
+  UPDATE groups SET words_count = words_count - 1 WHERE id = OLD.group_id;
+END;
+
+UPDATE groups
+SET words_count = (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id)
+WHERE words_count IS NOT (SELECT COUNT(*) FROM word_groups WHERE group_id = groups.id);
+
@@ -0,0 +1,58 @@
+-- The review delete triggers recomputed word_reviews.last_reviewed and
+-- study_sessions.last_activity_at with a MAX over the remaining reviews for
+-- every deleted row. The existing indexes lead with (word_id, correct) and
+-- (study_session_id, word_id), so each MAX walked the word's or the
+-- session's whole history, and the batched deletes of the delete_group and
+-- reset_study_history jobs (lib/jobs.py) went quadratic on large sessions.
+--
+-- Only the newest review can move the stored value, so the MAX is now taken
+-- only when the deleted row carries it, and it is a seek on these indexes.
+
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word_created ON word_review_items(word_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_word_review_items_session_created ON word_review_items(study_session_id, created_at);
+
+DROP TRIGGER IF EXISTS trg_word_reviews_delete;
+
+CREATE TRIGGER IF NOT EXISTS trg_word_reviews_delete
+AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE word_reviews
+  SET
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END),
+    wrong_count = wrong_count - (CASE WHEN OLD.correct = 1 THEN 0 ELSE 1 END),
+    last_reviewed = CASE
+      WHEN OLD.created_at >= last_reviewed
+      THEN (SELECT MAX(created_at) FROM word_review_items WHERE word_id = OLD.word_id)
+      ELSE last_reviewed
+    END
+  WHERE word_id = OLD.word_id;
+
+  DELETE FROM word_reviews
+  WHERE word_id = OLD.word_id AND correct_count <= 0 AND wrong_count <= 0;
+END;
+
+DROP TRIGGER IF EXISTS trg_session_rollups_delete;
+
+CREATE TRIGGER IF NOT EXISTS trg_session_rollups_delete
+AFTER DELETE ON word_review_items
+BEGIN
+  UPDATE study_sessions
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END),
+    last_activity_at = CASE
+      WHEN OLD.created_at >= last_activity_at
+      THEN (SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = OLD.study_session_id)
+      ELSE last_activity_at
+    END
+  WHERE id = OLD.study_session_id;
+
+  UPDATE session_words
+  SET
+    review_count = review_count - 1,
+    correct_count = correct_count - (CASE WHEN OLD.correct = 1 THEN 1 ELSE 0 END)
+  WHERE study_session_id = OLD.study_session_id AND word_id = OLD.word_id;
+
+  DELETE FROM session_words
+  WHERE study_session_id = OLD.study_session_id AND word_id = OLD.word_id AND review_count <= 0;
+END;
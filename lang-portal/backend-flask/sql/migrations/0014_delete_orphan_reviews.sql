@@ -0,0 +1,8 @@
+-- Group deletes used to remove the sessions but keep their reviews. The
+-- review delete triggers take these out of word_reviews and the dashboard
+-- totals; the per-session and daily rollups went with the sessions.
+--
+-- This runs after 0013, so each deleted row costs an index seek in the
+-- triggers rather than a walk of the word's history.
+DELETE FROM word_review_items
+WHERE NOT EXISTS (SELECT 1 FROM study_sessions WHERE id = word_review_items.study_session_id);
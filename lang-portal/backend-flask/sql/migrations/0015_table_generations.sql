@@ -0,0 +1,91 @@
+-- Change counters of the tables behind the response cache, the CORS
+-- origins and the group membership index (lib/cache.py). Triggers bump them
+-- inside the writing transaction, so a write made by any worker process, a
+-- job or an invoke task invalidates every process's copies on their next
+-- read, not after a TTL.
+--
+-- Only tables that cached readers depend on are tracked; a cached view over
+-- another table needs a counter and triggers of its own in a new migration.
+
+CREATE TABLE IF NOT EXISTS table_generations (
+  name TEXT PRIMARY KEY,
+  generation INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO table_generations (name) VALUES
+  ('groups'),
+  ('words'),
+  ('word_groups'),
+  ('study_activities');
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_groups_insert
+AFTER INSERT ON groups
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_groups_update
+AFTER UPDATE ON groups
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_groups_delete
+AFTER DELETE ON groups
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_words_insert
+AFTER INSERT ON words
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'words';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_words_update
+AFTER UPDATE ON words
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'words';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_words_delete
+AFTER DELETE ON words
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'words';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_word_groups_insert
+AFTER INSERT ON word_groups
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'word_groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_word_groups_update
+AFTER UPDATE ON word_groups
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'word_groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_word_groups_delete
+AFTER DELETE ON word_groups
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'word_groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_study_activities_insert
+AFTER INSERT ON study_activities
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'study_activities';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_study_activities_update
+AFTER UPDATE ON study_activities
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'study_activities';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generation_study_activities_delete
+AFTER DELETE ON study_activities
+BEGIN
+  UPDATE table_generations SET generation = generation + 1 WHERE name = 'study_activities';
+END;
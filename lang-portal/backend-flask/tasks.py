@@ -1,44 +1,98 @@
 from invoke import task
-from lib.db import db
+from config import Config
+from lib.db import Db
+import lib.rollups as rollups
+import lib.srs as srs
+from lib.seed import SeedError
+from lib.sessions import close_idle_sessions
 import os
 import logging
 
+db = Db(database=Config.DATABASE)
+
 logger = logging.getLogger(__name__)
 
-def read_sql_files(sql_dir):
-    """Read SQL files from directory in sorted order"""
-    sql_files = []
-    for file in sorted(os.listdir(sql_dir)):
-        if file.endswith('.sql'):
-            with open(os.path.join(sql_dir, file), 'r') as f:
-                sql_files.append(f.read())
-    return sql_files
+@task(iterable=['seed'])
+def init_db(c, seed=None, reset=False):
+  """Create, seed and migrate the database
 
-@task
-def init_db(c, env="development"):
-  from flask import Flask
-  app = Flask(__name__)
-    # Setup logging
+  --seed "Group Name=path/to/words.json" can be repeated to load other seed
+  files instead of the default ones; --reset deletes the database first.
+  """
   logger.info("Starting database initialization")
+  if reset:
+    for suffix in ('', '-wal', '-shm'):
+      if os.path.exists(Config.DATABASE + suffix):
+        os.remove(Config.DATABASE + suffix)
+
+  word_seeds = None
+  if seed:
+    word_seeds = []
+    for spec in seed:
+      group_name, sep, path = spec.partition('=')
+      if not sep:
+        raise SystemExit(f"Invalid --seed {spec!r}, expected \"Group Name=path/to/words.json\"")
+      word_seeds.append((group_name, path))
+
   try:
-      # Get SQL scripts directory
-      sql_dir = os.path.join(app.root_path, 'sql', 'setup')
-      if not os.path.exists(sql_dir):
-          raise FileNotFoundError(f"SQL directory not found: {sql_dir}")
-      
-      # Initialize database
-      db.init(app)
-      cursor = db.cursor()
-      
-      # Execute SQL scripts in order
-      for sql in read_sql_files(sql_dir):
-          logger.info(f"Executing SQL script...")
-          cursor.executescript(sql)
-      
-      db.commit()
-      logger.info("Database initialized successfully")
-      
-  except Exception as e:
-    logger.error(f"Database initialization failed: {str(e)}")
-    db.rollback()
-    raise
+    report = db.init(word_seeds=word_seeds)
+  except SeedError as e:
+    raise SystemExit(f"{e} (use --reset)")
+
+  print(f"Seeded {report['words']} words, {report['word_groups']} links, "
+        f"{report['groups']} groups and {report['study_activities']} study activities "
+        f"in {report['seconds']:.2f}s ({report['rows_per_sec']:,.0f} rows/sec)")
+  logger.info("Database initialized successfully")
+
+@task
+def rebuild_word_reviews(c):
+  """Backfill the word_reviews rollup from word_review_items"""
+  with db.pool.writer() as conn:
+    count = rollups.rebuild_word_reviews(conn)
+  print(f"Rebuilt word_reviews for {count} words")
+
+@task
+def check_word_reviews(c):
+  """Compare the word_reviews rollup with word_review_items"""
+  with db.pool.connection() as conn:
+    mismatches = rollups.check_word_reviews(conn)
+  for mismatch in mismatches:
+    print(f"Mismatch: {mismatch}")
+  if mismatches:
+    raise SystemExit(f"{len(mismatches)} words out of sync, run `invoke rebuild-word-reviews`")
+  print("word_reviews is consistent with word_review_items")
+
+@task
+def rebuild_dashboard_stats(c):
+  """Recompute the materialized dashboard statistics"""
+  with db.pool.writer() as conn:
+    rollups.rebuild_dashboard_stats(conn)
+  print("Rebuilt dashboard_stats")
+
+@task
+def rebuild_session_rollups(c):
+  """Recompute the per-session review counters and session_words"""
+  with db.pool.writer() as conn:
+    count = rollups.rebuild_session_rollups(conn)
+  print(f"Rebuilt session rollups ({count} session words)")
+
+@task
+def rebuild_daily_stats(c):
+  """Recompute the daily stats buckets behind /api/study-sessions/stats"""
+  with db.pool.writer() as conn:
+    count = rollups.rebuild_daily_stats(conn)
+  print(f"Rebuilt daily stats ({count} daily words)")
+
+@task
+def rebuild_word_schedules(c):
+  """Replay the review history into the spaced repetition schedules"""
+  with db.pool.writer() as conn:
+    count = srs.rebuild_word_schedules(conn)
+  print(f"Rebuilt word schedules ({count} reviewed words)")
+
+@task(name='close-idle-sessions')
+def close_idle_sessions_task(c, idle_minutes=Config.SESSION_IDLE_TIMEOUT_MINUTES):
+  """Close study sessions without reviews for --idle-minutes"""
+  with db.writer() as cursor:
+    closed = close_idle_sessions(cursor, int(idle_minutes))
+  print(f"Closed {closed} idle study sessions")
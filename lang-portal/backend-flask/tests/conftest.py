@@ -1,5 +1,6 @@
 import pytest
-from app import create_app
+import json
+from app import create_app, shutdown_app
 from flask import g
 
 @pytest.fixture
@@ -61,4 +62,51 @@ def app_context(app):
         cursor.execute('DROP TABLE IF EXISTS words')
         cursor.execute('DROP TABLE IF EXISTS groups')
         app.db.get().commit()
-        app.db.close() 
\ No newline at end of file
+        app.db.close() 
+
+@pytest.fixture
+def migrated_app(tmp_path, monkeypatch):
+    """Create a test app on a fully initialized (seeded and migrated) database"""
+    from config import TestConfig
+    monkeypatch.setattr(TestConfig, 'DATABASE', str(tmp_path / 'migrated_JapaneseDB.db'))
+    app = create_app({'TESTING': True})
+    app.db.init(app)
+    yield app
+    shutdown_app(app)
+
+@pytest.fixture
+def migrated_client(migrated_app):
+    """Create a test client for the fully initialized database"""
+    return migrated_app.test_client()
+
+@pytest.fixture
+def create_session(migrated_client):
+    """Start a study session and return its id"""
+    def create(group_id=1, activity_id=1):
+        response = migrated_client.post('/api/study-sessions',
+                                        json={'group_id': group_id, 'study_activity_id': activity_id})
+        return json.loads(response.data)['session']['id']
+    return create
+
+@pytest.fixture
+def post_reviews(migrated_client):
+    """Post a batch of reviews to a session and return the response"""
+    def post(session_id, reviews):
+        return migrated_client.post(f'/api/study-sessions/{session_id}/reviews', json={'reviews': reviews})
+    return post
+
+@pytest.fixture
+def count(migrated_app):
+    """First column of the first row of a query on the migrated database"""
+    def count(sql, params=()):
+        with migrated_app.db.pool.connection() as conn:
+            return conn.execute(sql, params).fetchone()[0]
+    return count
+
+@pytest.fixture
+def column(migrated_app):
+    """First column of every row of a query on the migrated database"""
+    def column(sql, params=()):
+        with migrated_app.db.pool.connection() as conn:
+            return [row[0] for row in conn.execute(sql, params)]
+    return column
@@ -0,0 +1,71 @@
+import pytest
+from lib.cors import origin_of
+
+def test_origin_of():
+    """Test activity urls are reduced to their origin"""
+    assert origin_of('http://localhost:8080/app?x=1') == 'http://localhost:8080'
+    assert origin_of('HTTPS://Example.com') == 'https://example.com'
+    assert origin_of('/assets/typing-tutor.png') is None
+    assert origin_of('') is None
+
+def test_cors_origins_from_study_activities(migrated_app, migrated_client):
+    """Test only configured and study activity origins get CORS headers"""
+    migrated_app.cors.refresh()
+
+    response = migrated_client.get('/api/groups', headers={'Origin': 'http://localhost:8080'})
+    assert response.status_code == 200
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:8080'
+    assert 'Origin' in response.headers['Vary']
+
+    response = migrated_client.get('/api/groups', headers={'Origin': 'http://localhost:5173'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:5173'
+
+    response = migrated_client.get('/api/groups', headers={'Origin': 'http://evil.example'})
+    assert response.status_code == 200
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+    response = migrated_client.get('/api/groups')
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+    # Preflight
+    response = migrated_client.options('/api/study-sessions', headers={
+        'Origin': 'http://localhost:8080',
+        'Access-Control-Request-Method': 'POST',
+        'Access-Control-Request-Headers': 'Content-Type'
+    })
+    assert response.status_code == 200
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:8080'
+    assert 'POST' in response.headers['Access-Control-Allow-Methods']
+    assert 'Content-Type' in response.headers['Access-Control-Allow-Headers']
+    assert response.headers['Access-Control-Max-Age'] == '600'
+
+    stats = migrated_app.cors.stats()
+    assert 'http://localhost:8080' in stats['origins']
+    assert stats['rejected'] == 1
+
+def test_cors_origins_refresh(migrated_app, migrated_client):
+    """Test the origin set is rebuilt when study activities change"""
+    migrated_app.cors.refresh()
+    with migrated_app.db.writer() as cursor:
+        cursor.execute("UPDATE study_activities SET url = 'https://tutor.example/play'")
+
+    # The write moved the study_activities generation through its trigger
+    response = migrated_client.get('/api/groups', headers={'Origin': 'https://tutor.example'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'https://tutor.example'
+    response = migrated_client.get('/api/groups', headers={'Origin': 'http://localhost:8080'})
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+    # Without any known origin every origin is allowed
+    migrated_app.cors.static_origins = frozenset()
+    with migrated_app.db.writer() as cursor:
+        cursor.execute("UPDATE study_activities SET url = ''")
+    response = migrated_client.get('/api/groups', headers={'Origin': 'http://anywhere.example'})
+    assert response.headers['Access-Control-Allow-Origin'] == '*'
+
+def test_cors_refresh_uses_request_connection(migrated_app, migrated_client):
+    """Test origins reloaded at the end of a request are read on the request's own connection"""
+    migrated_app.cache.bump('study_activities')
+    checkouts = migrated_app.db.pool.stats()['checkouts']
+    response = migrated_client.get('/api/groups', headers={'Origin': 'http://localhost:8080'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:8080'
+    assert migrated_app.db.pool.stats()['checkouts'] == checkouts + 1
@@ -0,0 +1,61 @@
+import pytest
+import json
+
+def review(client, session_id, word_id, correct):
+    response = client.post(f'/api/study-sessions/{session_id}/review',
+                           json={'word_id': word_id, 'correct': correct})
+    assert response.status_code == 200
+
+def test_dashboard_stats_materialized(migrated_app, migrated_client, create_session):
+    """Test the materialized counters match a full recomputation"""
+    first = create_session()
+    for _ in range(5):
+        review(migrated_client, first, 1, True)
+    second = create_session(group_id=2)
+    review(migrated_client, second, 2, False)
+    review(migrated_client, second, 1, False)
+
+    data = json.loads(migrated_client.get('/api/dashboard/stats').data)
+
+    with migrated_app.db.pool.connection() as conn:
+        total_vocabulary = conn.execute('SELECT COUNT(*) FROM words').fetchone()[0]
+    assert data['total_vocabulary'] == total_vocabulary
+    assert data['total_words_studied'] == 2
+    assert data['mastered_words'] == 1  # word 1: 5 of 6 correct
+    assert data['success_rate'] == pytest.approx(5 / 7)
+    assert data['total_sessions'] == 2
+    assert data['active_groups'] == 2
+    assert data['current_streak'] == 1
+
+    # One more wrong answer drops word 1 below 80%
+    review(migrated_client, second, 1, False)
+    data = json.loads(migrated_client.get('/api/dashboard/stats').data)
+    assert data['mastered_words'] == 0
+
+def test_recent_session(migrated_app, migrated_client, create_session):
+    """Test the most recent session and its results"""
+    assert json.loads(migrated_client.get('/api/dashboard/recent-session').data) is None
+
+    create_session()
+    latest = create_session(group_id=2)
+    review(migrated_client, latest, 1, True)
+    review(migrated_client, latest, 2, False)
+
+    migrated_client.delete('/api/admin/queries')
+    data = json.loads(migrated_client.get('/api/dashboard/recent-session').data)
+    assert data['id'] == latest
+    assert data['group_id'] == 2
+    assert data['correct_count'] == 1
+    assert data['wrong_count'] == 1
+    # Read from the session rollups, not counted from the reviews
+    statements = json.loads(migrated_client.get('/api/admin/queries').data)['statements']
+    assert not any('word_review_items' in statement['sql'] for statement in statements)
+
+    response = migrated_client.post('/api/study-sessions/reset')
+    assert response.status_code == 202
+    job = migrated_app.jobs.wait(json.loads(response.data)['job']['id'])
+    assert job['status'] == 'succeeded'
+    assert json.loads(migrated_client.get('/api/dashboard/recent-session').data) is None
+    data = json.loads(migrated_client.get('/api/dashboard/stats').data)
+    assert data['total_sessions'] == 0
+    assert data['total_words_studied'] == 0
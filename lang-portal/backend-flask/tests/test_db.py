@@ -0,0 +1,326 @@
+import threading
+import pytest
+from lib.pool import ConnectionPool, PoolTimeout
+
+@pytest.fixture
+def pool(tmp_path):
+    """Create a small connection pool on a temporary database"""
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), size=2, timeout=0.2)
+    yield pool
+    pool.close()
+
+def test_pragmas_applied(pool):
+    """Test pooled connections are opened in WAL mode with NORMAL sync"""
+    with pool.connection() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        # 1 = NORMAL
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+
+def test_connections_are_reused(pool):
+    """Test released connections are handed out again"""
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    stats = pool.stats()
+    assert stats['checkouts'] == 2
+    assert stats['open'] == 1
+
+def test_pool_exhaustion_waits_then_times_out(pool):
+    """Test checkouts wait for a free connection and time out"""
+    first = pool.acquire()
+    pool.acquire()
+
+    # Freed connection is picked up by the waiting checkout
+    timer = threading.Timer(0.05, pool.release, args=(first,))
+    timer.start()
+    assert pool.acquire() is first
+    timer.join()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats['waits'] == 2
+    assert stats['timeouts'] == 1
+    assert stats['wait_time'] > 0
+
+def test_release_rolls_back_open_transaction(pool):
+    """Test a connection is never returned to the pool mid-transaction"""
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.commit()
+        conn.execute('INSERT INTO t VALUES (1)')
+        assert conn.in_transaction
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+
+def test_writer_lane_is_serialized(pool):
+    """Test the writer lane hands out one connection at a time"""
+    with pool.writer() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.commit()
+
+    def write(value):
+        with pool.writer() as conn:
+            conn.execute('INSERT INTO t VALUES (?)', (value,))
+            conn.commit()
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 10
+    assert pool.stats()['writer_checkouts'] == 11
+
+def test_seed_database(tmp_path):
+    """Test seeding loads every file in one pass and dedupes repeated words"""
+    import json
+    from lib.db import Db
+    from lib.seed import SeedError
+
+    words = [
+        {'kanji': '猫', 'romaji': 'neko', 'english': 'cat', 'parts': []},
+        {'kanji': '犬', 'romaji': 'inu', 'english': 'dog', 'parts': []},
+        {'kanji': '猫', 'romaji': 'neko', 'english': 'cat', 'parts': []}
+    ]
+    first = tmp_path / 'animals.json'
+    first.write_text(json.dumps(words))
+    second = tmp_path / 'pets.json'
+    second.write_text(json.dumps(words[:1]))
+
+    db = Db(database=str(tmp_path / 'seed.db'))
+    report = db.init(word_seeds=[('Animals', str(first)), ('Pets', str(second))])
+    assert report['words'] == 2
+    assert report['word_groups'] == 3
+    assert report['rows_per_sec'] > 0
+
+    with db.pool.connection() as conn:
+        counts = dict(conn.execute('SELECT name, words_count FROM groups').fetchall())
+        assert counts == {'Animals': 2, 'Pets': 1}
+        activities = [row[0] for row in conn.execute('SELECT url FROM study_activities ORDER BY id')]
+        assert activities == ['http://localhost:8080', 'http://localhost:8083', 'http://localhost:8081']
+        # Indexes are created after the load by the migrations
+        index = conn.execute("SELECT name FROM sqlite_master WHERE name = 'idx_words_natural_key'").fetchone()
+        assert index is not None
+
+    with pytest.raises(SeedError):
+        db.init(word_seeds=[('Animals', str(first))])
+    db.close_all()
+
+def test_query_profiler(migrated_app, migrated_client):
+    """Test queries are timed per request and aggregated at the admin endpoint"""
+    import json
+    migrated_app.db.profiler.slow_threshold = 0  # Treat every statement as slow
+
+    response = migrated_client.get('/api/words?words_per_page=5')
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    assert timing.startswith('db;dur=')
+    assert 'desc="2 queries"' in timing
+
+    stats = json.loads(migrated_client.get('/api/admin/queries').data)
+    assert stats['requests'] == 1
+    assert stats['queries_per_request']['<=2'] == 1
+    statements = {statement['sql'].split(' ')[1]: statement for statement in stats['statements']}
+    assert statements['COUNT(*)']['rows'] == 1
+    assert sum(statement['count'] for statement in stats['statements']) == 2
+    assert sum(statement['rows'] for statement in stats['statements']) == 6
+    slow = stats['slow_queries']
+    assert len(slow) == 2
+    assert slow[0]['path'] == '/api/words'
+    assert any('SCAN' in detail or 'SEARCH' in detail for detail in slow[-1]['plan'])
+
+    assert migrated_client.delete('/api/admin/queries').status_code == 204
+    stats = json.loads(migrated_client.get('/api/admin/queries').data)
+    # Only the DELETE itself, recorded after the reset
+    assert stats['requests'] == 1
+    assert stats['slow_queries'] == []
+
+def test_profiler_explains_on_request_connection(tmp_path):
+    """Test slow query plans are taken without a second pooled connection"""
+    import json
+    import time
+    from app import create_app, shutdown_app
+    from config import TestConfig
+
+    class SinglePoolConfig(TestConfig):
+        DATABASE = str(tmp_path / 'single.db')
+        DB_POOL_SIZE = 1
+        DB_POOL_TIMEOUT = 2
+        SLOW_QUERY_THRESHOLD_MS = 0
+
+    app = create_app(config_class=SinglePoolConfig)
+    app.db.init(app)
+    client = app.test_client()
+    started = time.perf_counter()
+    assert client.get('/api/groups/1').status_code == 200
+    assert client.post('/api/groups', json={'name': 'Slow'}).status_code == 201
+    assert time.perf_counter() - started < SinglePoolConfig.DB_POOL_TIMEOUT
+    slow = json.loads(client.get('/api/admin/queries').data)['slow_queries']
+    assert slow and not any(detail.startswith('EXPLAIN failed') for entry in slow for detail in entry['plan'])
+    assert app.db.pool.stats()['timeouts'] == 0
+    shutdown_app(app)
+
+def test_shutdown_app(tmp_path, monkeypatch):
+    """Test shutdown_app waits for the writer lane, then stops the sweeper and closes the pool"""
+    import sqlite3
+    import time
+    from app import create_app, shutdown_app
+    from config import TestConfig
+
+    class SweepingConfig(TestConfig):
+        DATABASE = str(tmp_path / 'shutdown.db')
+        SESSION_SWEEP_INTERVAL = 60
+
+    app = create_app(config_class=SweepingConfig)
+    app.db.init(app)
+    assert app.session_sweeper._thread.is_alive()
+
+    # A review batch still committing when shutdown starts
+    started = threading.Event()
+    def write():
+        with app.db.writer() as cursor:
+            started.set()
+            time.sleep(0.2)
+            cursor.execute("INSERT INTO groups (name) VALUES ('In flight')")
+    writer = threading.Thread(target=write)
+    writer.start()
+    started.wait()
+    shutdown_app(app)
+    writer.join()
+
+    assert app.session_sweeper._thread is None
+    assert app.db.stats()['open'] == 0
+    conn = sqlite3.connect(SweepingConfig.DATABASE)
+    assert conn.execute("SELECT COUNT(*) FROM groups WHERE name = 'In flight'").fetchone()[0] == 1
+
+def test_writer_cursor_closed_before_lane_is_released(tmp_path):
+    """Test Db.writer closes its cursor, so it cannot touch the shared connection later"""
+    import sqlite3
+    from lib.db import Db
+
+    db = Db(database=str(tmp_path / 'writer.db'))
+    with db.writer() as cursor:
+        cursor.execute('CREATE TABLE t (x)')
+        cursor.executemany('INSERT INTO t VALUES (?)', [(1,), (2,)])
+    with pytest.raises(sqlite3.ProgrammingError):
+        cursor.execute('SELECT x FROM t')
+    with db.pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 2
+    db.close_all()
+
+def test_snapshot_serves_analytics(migrated_app, migrated_client, tmp_path):
+    """Test the analytics routes read the snapshot while it is fresh, then the live database"""
+    import json
+    import sqlite3
+    from lib.snapshot import SnapshotReplica
+
+    snapshot = SnapshotReplica(migrated_app.db, str(tmp_path / 'snapshot.db'), interval=3600, max_age=60)
+    migrated_app.db.snapshot = snapshot
+    snapshot.refresh()
+
+    session = json.loads(migrated_client.post('/api/study-sessions', json={'group_id': 1, 'study_activity_id': 1}).data)
+    migrated_client.post(f"/api/study-sessions/{session['session']['id']}/reviews",
+                         json={'reviews': [{'word_id': 1, 'correct': False}]})
+
+    # The copy predates the session and its review
+    stats = json.loads(migrated_client.get('/api/dashboard/stats').data)
+    assert stats['total_sessions'] == 0
+    stats = json.loads(migrated_client.get('/api/study-sessions/stats').data)
+    assert stats['overall']['total_sessions'] == 0
+    words = json.loads(migrated_client.get('/api/words?sort_by=wrong_count&order=desc&words_per_page=1').data)
+    assert words['words'][0]['stats']['wrong_count'] == 0
+    # Other reads stay on the live database
+    assert json.loads(migrated_client.get(f"/api/study-sessions/{session['session']['id']}").data)
+
+    response = migrated_client.get('/api/admin/db/snapshot?refresh=true')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['copies'] == 2
+    assert data['fresh'] and data['age_seconds'] < 60
+    assert data['reads'] == 3
+    assert data['last_copy_seconds'] > 0 and data['pages'] > 0
+    assert json.loads(migrated_client.get('/api/dashboard/stats').data)['total_sessions'] == 1
+
+    # Past the staleness window the live database is read
+    migrated_client.post('/api/study-sessions', json={'group_id': 1, 'study_activity_id': 1})
+    snapshot.max_age = 0
+    assert json.loads(migrated_client.get('/api/dashboard/stats').data)['total_sessions'] == 2
+    assert snapshot.stats()['fallbacks'] == 1
+
+    with pytest.raises(sqlite3.OperationalError):
+        with snapshot.pool.connection() as conn:
+            conn.execute("INSERT INTO groups (name) VALUES ('Nope')")
+
+def test_snapshot_mode_config(tmp_path):
+    """Test DB_SNAPSHOT takes a first copy at startup and shutdown_app stops the snapshot thread"""
+    import json
+    import os
+    from app import create_app, shutdown_app
+    from config import TestConfig
+    from lib.db import Db
+
+    database = str(tmp_path / 'snapshot_mode.db')
+    db = Db(database=database)
+    db.init()
+    db.close_all()
+
+    class SnapshotConfig(TestConfig):
+        DATABASE = database
+        AUTO_MIGRATE = True
+        DB_SNAPSHOT = True
+
+    app = create_app(config_class=SnapshotConfig)
+    assert os.path.exists(str(tmp_path / 'snapshot_mode.snapshot.db'))
+    assert app.db.snapshot._thread.is_alive()
+    stats = json.loads(app.test_client().get('/api/admin/db/snapshot').data)
+    assert stats['copies'] == 1 and stats['fresh']
+    shutdown_app(app)
+    assert app.db.snapshot._thread is None
+    assert app.db.snapshot.pool is None
+
+def test_snapshot_replicas_share_path(migrated_app, tmp_path):
+    """Test replicas of several workers copy to the same snapshot path without clobbering each other"""
+    import os
+    from lib.snapshot import SnapshotReplica
+
+    path = str(tmp_path / 'shared.snapshot.db')
+    replicas = [SnapshotReplica(migrated_app.db, path) for _ in range(4)]
+    errors = []
+    def refresh(replica):
+        try:
+            for _ in range(5):
+                replica.refresh()
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=refresh, args=(replica,)) for replica in replicas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+    for replica in replicas:
+        with replica.pool.connection() as conn:
+            assert conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+        replica.close()
+
+def test_admin_endpoints_off_in_production(tmp_path):
+    """Test ProductionConfig does not register the unauthenticated /api/admin routes"""
+    from app import create_app, shutdown_app
+    from config import ProductionConfig
+
+    class LocalProductionConfig(ProductionConfig):
+        DATABASE = str(tmp_path / 'production.db')
+        JOB_WORKER = False
+        SESSION_SWEEP_INTERVAL = 0
+
+    app = create_app(config_class=LocalProductionConfig)
+    client = app.test_client()
+    assert client.get('/api/admin/db/pool').status_code == 404
+    assert not any(rule.rule.startswith('/api/admin/') for rule in app.url_map.iter_rules())
+    shutdown_app(app)
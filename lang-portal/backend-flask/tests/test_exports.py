@@ -0,0 +1,47 @@
+import pytest
+import csv
+import io
+import json
+
+def test_export_reviews_streaming(migrated_app, migrated_client, create_session, post_reviews):
+    """Test reviews are streamed as NDJSON/CSV in chunks with filters applied"""
+    migrated_app.config['EXPORT_FETCH_SIZE'] = 2
+    first = create_session()
+    second = create_session(group_id=2)
+    post_reviews(first, [
+        {'word_id': 1, 'correct': True},
+        {'word_id': 2, 'correct': False},
+        {'word_id': 3, 'correct': True, 'answered_at': '2024-01-15T09:00:00Z'}
+    ])
+    post_reviews(second, [
+        {'word_id': 1, 'correct': False}
+    ])
+
+    response = migrated_client.get('/api/exports/reviews')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [row['study_session_id'] for row in rows] == [first, first, first, second]
+    assert rows[0]['group_name'] and rows[0]['kanji']
+
+    response = migrated_client.get('/api/exports/reviews?format=csv&group_id=1')
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert [row['word_id'] for row in rows] == ['1', '2', '3']
+
+    response = migrated_client.get('/api/exports/reviews?from=2024-01-01&to=2024-01-31')
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [(row['word_id'], row['created_at']) for row in rows] == [(3, '2024-01-15 09:00:00')]
+
+    # An empty CSV export still has its header
+    response = migrated_client.get('/api/exports/reviews?format=csv&study_activity_id=999')
+    assert response.data.decode().strip() == 'id,created_at,correct,word_id,kanji,romaji,english,' \
+        'study_session_id,session_started_at,group_id,group_name,study_activity_id,activity_name'
+
+    # The streaming connection went back to the pool
+    assert migrated_app.db.stats()['in_use'] == 0
+
+    assert migrated_client.get('/api/exports/reviews?format=xml').status_code == 400
+    assert migrated_client.get('/api/exports/reviews?from=yesterday').status_code == 400
+    assert migrated_client.get('/api/exports/reviews?group_id=abc').status_code == 400
@@ -1,6 +1,7 @@
 import pytest
 import json
 from flask import g
+from datetime import datetime, timedelta
 
 def test_create_group(client, app_context):
     """Test creating a new group"""
@@ -168,4 +169,305 @@ def test_get_group_words_raw(client, app_context, test_words):
                         pytest.fail(f"Failed to clean up test data: {e}")
                     conn.commit()
         except Exception as e:
-            pytest.fail(f"Database cleanup operation failed: {e}")
\ No newline at end of file
+            pytest.fail(f"Database cleanup operation failed: {e}")
+
+def test_groups_response_cache_hit(migrated_client):
+    """Test a repeated group read is a cache hit and honours If-None-Match"""
+    response = migrated_client.get('/api/groups')
+    assert response.headers['X-Cache'] == 'MISS'
+    etag = response.headers['ETag']
+
+    response = migrated_client.get('/api/groups')
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.headers['ETag'] == etag
+    assert migrated_client.get('/api/groups', headers={'If-None-Match': etag}).status_code == 304
+
+    # Different query args are cached separately
+    assert migrated_client.get('/api/groups?sort_by=words_count').headers['X-Cache'] == 'MISS'
+
+    stats = json.loads(migrated_client.get('/api/admin/cache').data)
+    assert stats['hits'] == 2
+    assert stats['not_modified'] == 1
+
+def test_groups_response_cache_invalidated_by_write(migrated_client):
+    """Test creating a group invalidates the cached group list"""
+    generation = json.loads(migrated_client.get('/api/admin/cache').data)['generations']['groups']
+    etag = migrated_client.get('/api/groups').headers['ETag']
+    migrated_client.post('/api/groups', json={'name': 'Cached Group'})
+
+    response = migrated_client.get('/api/groups', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Cached Group' in [group['group_name'] for group in json.loads(response.data)['groups']]
+    # One from the insert trigger, one from the route's in-process bump
+    assert json.loads(migrated_client.get('/api/admin/cache').data)['generations']['groups'] == generation + 2
+
+def test_generations_shared_between_workers(migrated_app, migrated_client):
+    """Test a write made by another process invalidates this process's cache and index"""
+    import sqlite3
+    from app import create_app, shutdown_app
+
+    other = create_app({'TESTING': True})
+    other_client = other.test_client()
+    assert other_client.get('/api/groups').headers['X-Cache'] == 'MISS'
+    assert other_client.get('/api/groups').headers['X-Cache'] == 'HIT'
+    assert other.membership.words_in(1) is not None
+
+    migrated_client.post('/api/groups', json={'name': 'Other Worker'})
+    response = other_client.get('/api/groups')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Other Worker' in [group['group_name'] for group in json.loads(response.data)['groups']]
+
+    # An invoke task writing with its own connection
+    conn = sqlite3.connect(migrated_app.config['DATABASE'])
+    with conn:
+        conn.execute('DELETE FROM word_groups WHERE group_id = 1')
+    conn.close()
+    assert list(other.membership.words_in(1)) == []
+    shutdown_app(other)
+
+def test_group_study_sessions_single_query(migrated_client, create_session, post_reviews, column):
+    """Test the group session listing is one query and reports end times"""
+    reviewed, closed, idle = [create_session() for _ in range(3)]
+    post_reviews(reviewed, [
+        {'word_id': 1, 'correct': True, 'answered_at': '2030-01-01T10:05:00Z'},
+        {'word_id': 2, 'correct': False, 'answered_at': '2030-01-01T10:07:00Z'}
+    ])
+    migrated_client.post(f'/api/study-sessions/{closed}/close')
+
+    response = migrated_client.get('/api/groups/1/study-sessions?include_total=false')
+    assert response.status_code == 200
+    assert 'desc="1 queries"' in response.headers['Server-Timing']
+    sessions = {s['id']: s for s in json.loads(response.data)['study_sessions']}
+
+    assert sessions[reviewed]['review_items_count'] == 2
+    assert sessions[reviewed]['end_time'] == '2030-01-01 10:07:00'
+    ended_at = column('SELECT ended_at FROM study_sessions WHERE id = ?', (closed,))[0]
+    assert sessions[closed]['end_time'] == ended_at
+    start = datetime.fromisoformat(sessions[idle]['start_time'])
+    assert datetime.fromisoformat(sessions[idle]['end_time']) - start == timedelta(minutes=30)
+
+@pytest.fixture
+def reviewed_due_words(migrated_client, create_session, post_reviews):
+    """Review the first two due words of group 1: three right answers, one wrong"""
+    data = json.loads(migrated_client.get('/api/groups/1/due?limit=2').data)
+    first, second = data['words'][0]['id'], data['words'][1]['id']
+    post_reviews(create_session(), [
+        {'word_id': first, 'correct': True, 'answered_at': '2024-01-01T10:00:00Z'},
+        {'word_id': first, 'correct': True, 'answered_at': '2024-01-02T10:00:00Z'},
+        {'word_id': first, 'correct': True, 'answered_at': '2024-01-08T10:00:00Z'},
+        {'word_id': second, 'correct': False, 'answered_at': '2024-01-01T10:00:00Z'}
+    ])
+    return first, second
+
+def schedules(conn, word_ids):
+    return {row['word_id']: dict(row) for row in conn.execute(
+        'SELECT * FROM word_schedules WHERE group_id = 1 AND word_id IN (?, ?)', word_ids)}
+
+def test_group_due_queue_new_words(migrated_client):
+    """Test words never reviewed are new and due"""
+    data = json.loads(migrated_client.get('/api/groups/1/due?limit=3').data)
+    assert data['count'] == 3
+    assert all(w['is_new'] and w['is_due'] for w in data['words'])
+
+def test_reviews_move_word_schedules(migrated_app, reviewed_due_words):
+    """Test the review trigger moves words through the SM-2 intervals"""
+    first, second = reviewed_due_words
+    with migrated_app.db.pool.connection() as conn:
+        rows = schedules(conn, (first, second))
+    # 1 day, 6 days, then 6 * 2.5 = 15 days
+    assert (rows[first]['repetitions'], rows[first]['interval_days']) == (3, 15)
+    assert rows[first]['due_at'] == '2024-01-23 10:00:00'
+    assert rows[second]['lapses'] == 1
+    assert rows[second]['ease'] == pytest.approx(2.18)
+    assert rows[second]['due_at'] == '2024-01-02 10:00:00'
+
+def test_group_due_queue_order(migrated_app, migrated_client, reviewed_due_words):
+    """Test reviewed words are due before new ones, read in index order"""
+    first, second = reviewed_due_words
+    data = json.loads(migrated_client.get('/api/groups/1/due?limit=2').data)
+    assert [w['id'] for w in data['words']] == [second, first]
+    assert not data['words'][0]['is_new']
+
+    with migrated_app.db.pool.connection() as conn:
+        plan = ' '.join(row['detail'] for row in conn.execute('''
+            EXPLAIN QUERY PLAN SELECT word_id FROM word_schedules
+            WHERE group_id = 1 ORDER BY due_at, word_id LIMIT 10'''))
+    assert 'idx_word_schedules_due' in plan and 'TEMP B-TREE' not in plan
+
+def test_group_due_queue_bad_requests(migrated_client):
+    """Test /due refuses a zero limit and unknown groups"""
+    assert migrated_client.get('/api/groups/1/due?limit=0').status_code == 400
+    assert migrated_client.get('/api/groups/9999/due').status_code == 404
+
+def test_rebuild_word_schedules(migrated_app, reviewed_due_words):
+    """Test replaying the review history gives the same schedules as the trigger"""
+    from lib.srs import rebuild_word_schedules
+
+    word_ids = reviewed_due_words
+    with migrated_app.db.pool.writer() as conn:
+        rows = schedules(conn, word_ids)
+        assert rebuild_word_schedules(conn) == 2
+        assert schedules(conn, word_ids) == rows
+
+def test_word_schedule_interval_cap(migrated_app, create_session, post_reviews):
+    """Test a long run of correct answers stops growing at MAX_INTERVAL_DAYS"""
+    from lib.srs import MAX_INTERVAL_DAYS, rebuild_word_schedules
+
+    response = post_reviews(create_session(), [{'word_id': 1, 'correct': True}] * 40)
+    assert json.loads(response.data)['recorded'] == 40
+
+    query = 'SELECT interval_days, due_at FROM word_schedules WHERE group_id = 1 AND word_id = 1'
+    with migrated_app.db.pool.writer() as conn:
+        row = conn.execute(query).fetchone()
+        assert row['interval_days'] == MAX_INTERVAL_DAYS
+        assert row['due_at'] is not None
+        rebuild_word_schedules(conn)
+        assert tuple(conn.execute(query).fetchone()) == tuple(row)
+
+def test_word_parts_stored_compact(migrated_client, column):
+    """Test imported parts are stored as compact JSON"""
+    response = migrated_client.post('/api/vocabulary', json={'category': 'Fragments', 'data': [
+        {'kanji': '猫', 'romaji': 'neko', 'english': 'cat', 'parts': [{'kanji': '猫', 'romaji': ['neko']}]}
+    ]})
+    assert response.status_code == 200
+    assert column("SELECT parts FROM words WHERE romaji = 'neko'") == ['[{"kanji":"猫","romaji":["neko"]}]']
+
+def test_word_parts_served_as_json(migrated_app, migrated_client):
+    """Test stored parts are served as JSON, not strings"""
+    with migrated_app.db.writer() as cursor:
+        cursor.execute('''
+            INSERT INTO words (kanji, romaji, english, parts)
+            VALUES ('本', 'hon', 'book', '[{"kanji": "本", "romaji": ["hon"]}]'), ('木', 'ki', 'tree', 'noun')
+        ''')
+        cursor.execute('''
+            INSERT INTO word_groups (word_id, group_id)
+            SELECT id, 1 FROM words WHERE romaji IN ('hon', 'ki')
+        ''')
+    migrated_app.cache.bump('words', 'word_groups')
+
+    data = json.loads(migrated_client.get('/api/groups/1/words/raw').data)
+    words = {w['romaji']: w for w in data['words']}
+    assert data['count'] == len(data['words'])
+    assert words['hon']['parts'] == [{'kanji': '本', 'romaji': ['hon']}]
+    # Parts that are not JSON come back as the stored string
+    assert words['ki']['parts'] == 'noun'
+
+    data = json.loads(migrated_client.get('/api/groups/1/due?limit=100').data)
+    assert {w['romaji']: w['parts'] for w in data['words']}['hon'] == [{'kanji': '本', 'romaji': ['hon']}]
+
+def test_group_membership_set_queries(migrated_client, column):
+    """Test /api/groups/words answers intersections and unions of groups"""
+    in_1 = set(column('SELECT word_id FROM word_groups WHERE group_id = 1'))
+    in_2 = set(column('SELECT word_id FROM word_groups WHERE group_id = 2'))
+
+    data = json.loads(migrated_client.get('/api/groups/words?all=1,2').data)
+    assert data['word_ids'] == sorted(in_1 & in_2)
+    data = json.loads(migrated_client.get('/api/groups/words?any=1,2').data)
+    assert data['word_ids'] == sorted(in_1 | in_2)
+    assert data['count'] == len(in_1 | in_2)
+    data = json.loads(migrated_client.get('/api/groups/words?all=1&any=2').data)
+    assert data['word_ids'] == sorted(in_1 & in_2)
+
+def test_group_membership_bad_requests(migrated_client):
+    """Test /api/groups/words refuses missing or malformed ids and names unknown groups"""
+    assert migrated_client.get('/api/groups/words').status_code == 400
+    assert migrated_client.get('/api/groups/words?all=1,x').status_code == 400
+    response = migrated_client.get('/api/groups/words?any=1,9999')
+    assert response.status_code == 404
+    assert json.loads(response.data)['group_ids'] == [9999]
+
+def test_word_list_groups_from_index(migrated_client, column):
+    """Test /api/words takes each word's groups from the index"""
+    data = json.loads(migrated_client.get('/api/words?sort_by=romaji&words_per_page=20').data)
+    for word in data['words']:
+        expected = column('SELECT group_id FROM word_groups WHERE word_id = ? ORDER BY group_id',
+                          (word['id'],))
+        assert [group['id'] for group in word['groups']] == expected
+
+def test_group_membership_follows_imports(migrated_app, migrated_client, column):
+    """Test an import is applied to the index"""
+    word = json.loads(migrated_client.get('/api/words?sort_by=romaji&words_per_page=1').data)['words'][0]
+    response = migrated_client.post('/api/vocabulary', json={'category': 'Imported', 'data': [
+        {'kanji': word['kanji'], 'romaji': word['romaji'], 'english': word['english']}
+    ]})
+    assert response.status_code == 200
+    group_id = column("SELECT id FROM groups WHERE name = 'Imported'")[0]
+    assert list(migrated_app.membership.words_in(group_id)) == [word['id']]
+    assert group_id in migrated_app.membership.groups_of(word['id'])
+
+    stats = json.loads(migrated_client.get('/api/admin/groups/membership').data)
+    assert stats['groups'] == len(column('SELECT id FROM groups'))
+    assert stats['links'] == len(column('SELECT word_id FROM word_groups'))
+    # Applied as a delta, without reading word_groups again
+    assert stats['builds'] == 1
+    assert stats['deltas'] == 1
+
+def test_get_word_groups_from_index(migrated_app, migrated_client):
+    """Test /api/words/<id> lists group names containing ',' and '::' intact"""
+    word = json.loads(migrated_client.get('/api/words?sort_by=romaji&words_per_page=1').data)['words'][0]
+    response = migrated_client.post('/api/vocabulary', json={'category': 'Index, test::group', 'data': [
+        {'kanji': word['kanji'], 'romaji': word['romaji'], 'english': word['english']}
+    ]})
+    assert response.status_code == 200
+
+    data = json.loads(migrated_client.get(f"/api/words/{word['id']}").data)
+    assert 'Index, test::group' in [group['name'] for group in data['word']['groups']]
+    assert data['word']['groups'] == migrated_app.membership.groups_for([word['id']])[word['id']]
+    assert migrated_client.get('/api/words/999999').status_code == 404
+
+def test_membership_refresh_if_stale(migrated_app):
+    """Test a refresh that finds the index already rebuilt does not build again"""
+    index = migrated_app.membership
+    index.current()
+    builds = index.stats()['builds']
+    index.refresh(force=False)
+    assert index.stats()['builds'] == builds
+
+    migrated_app.cache.bump('word_groups')
+    index.refresh(force=False)
+    index.refresh(force=False)
+    assert index.stats()['builds'] == builds + 1
+    index.refresh()
+    assert index.stats()['builds'] == builds + 2
+
+def test_membership_deltas(migrated_app, migrated_client):
+    """Test group creates, renames, imports and deletes are applied as deltas matching a full build"""
+    index = migrated_app.membership
+    index.current()
+    builds = index.stats()['builds']
+
+    def assert_matches_build():
+        applied = index.current()
+        built = index.load()
+        assert applied.names == built.names
+        assert applied.members == built.members
+        assert applied.word_groups == built.word_groups
+        assert applied.bitmaps == built.bitmaps
+        assert applied.links == built.links
+
+    group_id = json.loads(migrated_client.post('/api/groups', json={'name': 'Delta'}).data)['id']
+    assert list(index.words_in(group_id)) == []
+    migrated_client.put(f'/api/groups/{group_id}', json={'name': 'Delta renamed'})
+    words = json.loads(migrated_client.get('/api/words?sort_by=romaji&words_per_page=3').data)['words']
+    for chunk in (words[:2], words[1:]):
+        response = migrated_client.post('/api/vocabulary', json={'category': 'Delta renamed', 'data': [
+            {'kanji': w['kanji'], 'romaji': w['romaji'], 'english': w['english']} for w in chunk
+        ]})
+        assert response.status_code == 200
+    assert sorted(index.words_in(group_id)) == sorted(w['id'] for w in words)
+    assert_matches_build()
+
+    migrated_app.jobs.batch_size = 1
+    job = json.loads(migrated_client.delete('/api/groups/1').data)['job']
+    assert migrated_app.jobs.wait(job['id'])['status'] == 'succeeded'
+    assert index.words_in(1) is None
+    assert_matches_build()
+    assert index.stats()['builds'] == builds
+
+def test_membership_rebuild_uses_request_connection(migrated_app, migrated_client):
+    """Test a rebuild made by a request reads on the request's own connection"""
+    migrated_app.cache.bump('word_groups')
+    checkouts = migrated_app.db.pool.stats()['checkouts']
+    assert migrated_client.get('/api/words?words_per_page=5').status_code == 200
+    assert migrated_app.db.pool.stats()['checkouts'] == checkouts + 1
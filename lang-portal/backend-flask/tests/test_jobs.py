@@ -0,0 +1,211 @@
+import pytest
+import json
+import time
+from lib.jobs import JobRunner
+
+def answers(word_ids):
+    return [{'word_id': word_id, 'correct': True} for word_id in word_ids]
+
+def test_delete_group_job(migrated_app, migrated_client, create_session, post_reviews, count):
+    """Test deleting a group returns 202 and a job that deletes it in batches"""
+    migrated_app.jobs.batch_size = 2
+    links = count('SELECT COUNT(*) FROM word_groups WHERE group_id = 1')
+    for _ in range(3):
+        post_reviews(create_session(), answers([1, 2, 3]))
+    other = create_session(group_id=2)
+    post_reviews(other, answers([1]))
+
+    response = migrated_client.delete('/api/groups/1')
+    assert response.status_code == 202
+    job = json.loads(response.data)['job']
+    assert job['kind'] == 'delete_group'
+    assert job['params'] == {'group_id': 1}
+    assert response.headers['Location'] == f"/api/jobs/{job['id']}"
+
+    job = migrated_app.jobs.wait(job['id'])
+    assert job['status'] == 'succeeded'
+    assert job['total'] == 1 + links + 3 + 9
+    assert job['progress'] == job['total']
+    assert job['result'] == {'group_id': 1, 'links_deleted': links, 'sessions_deleted': 3, 'reviews_deleted': 9}
+    assert job['finished_at'] is not None
+
+    assert migrated_client.get('/api/groups/1').status_code == 404
+    assert count('SELECT COUNT(*) FROM word_groups WHERE group_id = 1') == 0
+    assert count('SELECT COUNT(*) FROM study_sessions WHERE group_id = 1') == 0
+    assert count('SELECT COUNT(*) FROM study_sessions WHERE id = ?', (other,)) == 1
+
+    # No orphaned reviews, and the rollups only count the other session
+    assert count('SELECT COUNT(*) FROM word_review_items') == 1
+    assert count('SELECT SUM(correct_count) FROM word_reviews') == 1
+    assert count('SELECT SUM(review_count) FROM daily_group_stats') == 1
+    stats = json.loads(migrated_client.get('/api/dashboard/stats').data)
+    assert stats['total_sessions'] == 1
+    assert stats['total_words_studied'] == 1
+    assert migrated_client.post('/api/study-sessions', json={'group_id': 1, 'study_activity_id': 1}).status_code == 404
+
+    data = json.loads(migrated_client.get(f"/api/jobs/{job['id']}").data)
+    assert data['job'] == job
+    data = json.loads(migrated_client.get('/api/jobs?status=succeeded').data)
+    assert [listed['id'] for listed in data['jobs']] == [job['id']]
+    assert migrated_client.get('/api/jobs?status=nope').status_code == 400
+    assert migrated_client.get('/api/jobs/999').status_code == 404
+
+def test_reset_study_history_job(migrated_app, migrated_client, create_session, post_reviews, count):
+    """Test the reset deletes reviews with their sessions and starts the schedules over"""
+    migrated_app.jobs.batch_size = 2
+    for group_id in (1, 2):
+        post_reviews(create_session(group_id=group_id), answers([1, 2]))
+    reviewed = count('SELECT COUNT(*) FROM word_schedules WHERE last_reviewed_at IS NOT NULL')
+    assert reviewed > 0
+
+    response = migrated_client.post('/api/study-sessions/reset')
+    assert response.status_code == 202
+    job = migrated_app.jobs.wait(json.loads(response.data)['job']['id'])
+    assert job['status'] == 'succeeded'
+    assert job['progress'] == job['total'] == 6
+    assert job['result'] == {'reviews_deleted': 4, 'sessions_deleted': 2, 'schedules_reset': reviewed}
+
+    assert count('SELECT COUNT(*) FROM word_review_items') == 0
+    assert count('SELECT COUNT(*) FROM study_sessions') == 0
+    assert count('SELECT COUNT(*) FROM word_schedules WHERE last_reviewed_at IS NOT NULL') == 0
+    assert count('SELECT COUNT(*) FROM word_schedules WHERE repetitions > 0') == 0
+    assert count('SELECT COALESCE(SUM(review_count), 0) FROM daily_group_stats') == 0
+    stats = json.loads(migrated_client.get('/api/dashboard/stats').data)
+    assert stats['total_sessions'] == 0
+    assert stats['total_words_studied'] == 0
+
+    # Sessions started after the reset was requested are kept
+    first = create_session()
+    post_reviews(first, answers([1, 2]))
+    later = create_session()
+    post_reviews(later, answers([1]))
+    job = migrated_app.jobs.submit('reset_study_history', {'through_session_id': first})
+    job = migrated_app.jobs.wait(job['id'])
+    assert job['result']['sessions_deleted'] == 1
+    assert count('SELECT COUNT(*) FROM study_sessions') == 1
+    assert count('SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ?', (later,)) == 1
+    assert count('SELECT COUNT(*) FROM word_schedules WHERE last_reviewed_at IS NOT NULL') == (
+        count('SELECT COUNT(*) FROM word_groups WHERE group_id = 1 AND word_id = 1'))
+
+def test_words_count_follows_links(migrated_app, migrated_client):
+    """Test groups.words_count is kept by the word_groups triggers"""
+    before = json.loads(migrated_client.get('/api/groups/2').data)['word_count']
+    with migrated_app.db.writer() as cursor:
+        cursor.execute('''
+            INSERT INTO word_groups (word_id, group_id)
+            SELECT id, 2 FROM words WHERE id NOT IN (SELECT word_id FROM word_groups WHERE group_id = 2) LIMIT 2
+        ''')
+    migrated_app.cache.bump('groups')
+    assert json.loads(migrated_client.get('/api/groups/2').data)['word_count'] == before + 2
+
+    with migrated_app.db.writer() as cursor:
+        cursor.execute('DELETE FROM word_groups WHERE group_id = 2')
+    migrated_app.cache.bump('groups')
+    assert json.loads(migrated_client.get('/api/groups/2').data)['word_count'] == 0
+
+def test_recount_words_count_job(migrated_app, migrated_client, count):
+    """Test words_count is recomputed from word_groups by a job"""
+    expected = count('SELECT COUNT(*) FROM word_groups WHERE group_id = 1')
+    with migrated_app.db.writer() as cursor:
+        cursor.execute('UPDATE groups SET words_count = 0 WHERE id = 1')
+
+    response = migrated_client.post('/api/admin/groups/recount')
+    assert response.status_code == 202
+    job = migrated_app.jobs.wait(json.loads(response.data)['job']['id'])
+    assert job['status'] == 'succeeded'
+    assert job['result']['changed'] == 1
+    assert json.loads(migrated_client.get('/api/groups/1').data)['word_count'] == expected
+
+def test_interrupted_job_resumes(migrated_app, migrated_client, create_session, post_reviews, count):
+    """Test a job stopped between batches is requeued and finished by the next runner"""
+    session_id = create_session()
+    post_reviews(session_id, answers([1, 2, 3, 4, 5, 6]))
+
+    migrated_app.jobs.batch_size = 1
+    migrated_app.jobs.pause = 0.2
+    job = migrated_app.jobs.submit('reset_study_history')
+    while migrated_app.jobs.get(job['id'])['progress'] == 0:
+        time.sleep(0.01)
+    migrated_app.jobs.stop()
+
+    job = migrated_app.jobs.get(job['id'])
+    assert job['status'] == 'queued'
+    assert 0 < job['progress'] < job['total'] == 7
+    assert count('SELECT COUNT(*) FROM word_review_items') > 0
+
+    runner = JobRunner(migrated_app.db, batch_size=5000).start()
+    try:
+        job = runner.wait(job['id'])
+    finally:
+        runner.stop()
+    assert job['status'] == 'succeeded'
+    assert job['attempts'] == 2
+    assert job['progress'] == 7
+    assert count('SELECT COUNT(*) FROM word_review_items') == 0
+    assert count('SELECT COUNT(*) FROM study_sessions') == 0
+
+def test_stale_running_job_is_taken_over(migrated_app):
+    """Test a job left running by a dead process is claimed again"""
+    with migrated_app.db.writer() as cursor:
+        cursor.execute('''
+            INSERT INTO jobs (kind, status, attempts, started_at, heartbeat_at)
+            VALUES ('recount_words_count', 'running', 1, datetime('now', '-10 minutes'), datetime('now', '-10 minutes'))
+        ''')
+        job_id = cursor.lastrowid
+
+    runner = JobRunner(migrated_app.db, stale_after=60, poll_interval=0.05).start()
+    try:
+        job = runner.wait(job_id)
+    finally:
+        runner.stop()
+    assert job['status'] == 'succeeded'
+    assert job['attempts'] == 2
+
+def test_reviews_refused_for_deleted_session(migrated_app, migrated_client, create_session, count):
+    """Test reviews for a session removed by a delete job are refused, not orphaned"""
+    session_id = create_session()
+    job = migrated_app.jobs.submit('delete_group', {'group_id': 1})
+    assert migrated_app.jobs.wait(job['id'])['status'] == 'succeeded'
+
+    response = migrated_client.post(f'/api/study-sessions/{session_id}/review', json={'word_id': 1, 'correct': True})
+    assert response.status_code == 404
+    response = migrated_client.post(f'/api/study-sessions/{session_id}/reviews', json={'reviews': [
+        {'word_id': 1, 'correct': True}
+    ]})
+    assert response.status_code == 404
+    assert count('SELECT COUNT(*) FROM word_review_items') == 0
+
+def test_delete_large_session(migrated_app, create_session, count):
+    """Test review deletes keep last-seen times without a MAX over the history per row"""
+    session_id = create_session()
+    with migrated_app.db.writer() as cursor:
+        cursor.executemany('''
+            INSERT INTO word_review_items (word_id, study_session_id, correct, created_at)
+            VALUES (?, ?, 1, datetime('2024-01-01', ? || ' seconds'))
+        ''', [(i % 10 + 1, session_id, i) for i in range(20000)])
+
+        # Deleting the newest reviews moves the last-seen times back
+        cursor.execute('''
+            DELETE FROM word_review_items
+            WHERE rowid IN (SELECT rowid FROM word_review_items ORDER BY created_at DESC LIMIT 15)
+        ''')
+    assert count('SELECT last_activity_at FROM study_sessions WHERE id = ?', (session_id,)) == (
+        count('SELECT MAX(created_at) FROM word_review_items'))
+    assert count('''
+        SELECT COUNT(*) FROM word_reviews
+        WHERE last_reviewed IS NOT (SELECT MAX(created_at) FROM word_review_items WHERE word_id = word_reviews.word_id)
+    ''') == 0
+    with migrated_app.db.pool.connection() as conn:
+        plan = ' '.join(row['detail'] for row in conn.execute('''
+            EXPLAIN QUERY PLAN SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = ?
+        ''', (session_id,)))
+    assert 'idx_word_review_items_session_created' in plan
+
+    migrated_app.jobs.batch_size = 1000
+    started = time.perf_counter()
+    job = migrated_app.jobs.wait(migrated_app.jobs.submit('reset_study_history')['id'])
+    assert job['status'] == 'succeeded'
+    assert job['result']['reviews_deleted'] == 19985
+    # Quadratic triggers took over 15 s here
+    assert time.perf_counter() - started < 5
+    assert count('SELECT COUNT(*) FROM word_reviews') == 0
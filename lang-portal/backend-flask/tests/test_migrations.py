@@ -0,0 +1,61 @@
+import glob
+import sqlite3
+import pytest
+from lib.migrations import apply_migrations, list_migrations, applied_versions
+
+def index_names(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+def test_migrations_recorded(migrated_app):
+    """Test every migration is applied once and recorded"""
+    with migrated_app.db.pool.connection() as conn:
+        versions = applied_versions(conn)
+        assert versions == {version for version, _, _ in list_migrations()}
+        assert 'idx_word_review_items_word' in index_names(conn)
+        assert 'idx_word_groups_group_word' in index_names(conn)
+
+    # Second run is a no-op
+    assert migrated_app.db.migrate() == []
+
+def test_word_groups_unique(migrated_app):
+    """Test a word cannot be linked to the same group twice"""
+    with migrated_app.db.pool.connection() as conn:
+        word_id, group_id = conn.execute('SELECT word_id, group_id FROM word_groups LIMIT 1').fetchone()
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', (word_id, group_id))
+
+def test_duplicate_links_removed(tmp_path):
+    """Test existing duplicate links are removed and counts recomputed"""
+    conn = sqlite3.connect(str(tmp_path / 'dupes.db'))
+    for script in sorted(glob.glob('sql/setup/create_table_*.sql')):
+        with open(script) as f:
+            conn.execute(f.read())
+    conn.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('猫', 'neko', 'cat', '[]')")
+    conn.execute("INSERT INTO groups (name, words_count) VALUES ('Animals', 2)")
+    conn.executemany('INSERT INTO word_groups (word_id, group_id) VALUES (?, ?)', [(1, 1), (1, 1)])
+    conn.commit()
+
+    apply_migrations(conn)
+
+    assert conn.execute('SELECT COUNT(*) FROM word_groups').fetchone()[0] == 1
+    assert conn.execute('SELECT words_count FROM groups').fetchone()[0] == 1
+    conn.close()
+
+def test_orphan_reviews_removed(tmp_path):
+    """Test reviews left behind by old group deletes are removed with their rollups"""
+    conn = sqlite3.connect(str(tmp_path / 'orphans.db'))
+    for script in sorted(glob.glob('sql/setup/create_table_*.sql')):
+        with open(script) as f:
+            conn.execute(f.read())
+    conn.execute("INSERT INTO words (kanji, romaji, english, parts) VALUES ('猫', 'neko', 'cat', '[]')")
+    conn.execute("INSERT INTO groups (name) VALUES ('Animals')")
+    conn.execute('INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)')
+    conn.executemany('INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (1, ?, 1)',
+                     [(1,), (2,), (2,)])
+    conn.commit()
+
+    apply_migrations(conn)
+
+    assert conn.execute('SELECT study_session_id FROM word_review_items').fetchall() == [(1,)]
+    assert conn.execute('SELECT correct_count FROM word_reviews').fetchone()[0] == 1
+    conn.close()
@@ -91,4 +91,158 @@ def test_create_study_session_invalid_data(client, app_context, cleanup):
         'study_activity_id': 9999
     }
     response = client.post('/api/study-sessions', json=session_data)
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+BATCH = [
+    {'word_id': 1, 'correct': True, 'answered_at': '2025-02-01T09:30:00Z'},
+    {'word_id': 1, 'correct': False},
+    {'word_id': 2, 'correct': True},
+    {'word_id': 99999, 'correct': True},
+    {'word_id': 2, 'correct': 'yes'},
+    {'word_id': 2, 'correct': True, 'answered_at': 'yesterday'}
+]
+
+def test_review_session_batch_results(create_session, post_reviews):
+    """Test a review batch reports a status for every item"""
+    session_id = create_session()
+    response = post_reviews(session_id, BATCH)
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['recorded'] == 3
+    assert data['rejected'] == 3
+    assert [r['status'] for r in data['results']] == ['recorded', 'recorded', 'recorded', 'error', 'invalid', 'invalid']
+
+def test_review_session_batch_stored(migrated_app, create_session, post_reviews):
+    """Test the recorded items of a batch are stored with their answer times"""
+    session_id = create_session()
+    post_reviews(session_id, BATCH)
+    with migrated_app.db.pool.connection() as conn:
+        rows = conn.execute('''
+            SELECT word_id, correct, created_at FROM word_review_items
+            WHERE study_session_id = ? ORDER BY id
+        ''', (session_id,)).fetchall()
+        assert len(rows) == 3
+        assert rows[0]['created_at'] == '2025-02-01 09:30:00'
+        counts = conn.execute('SELECT correct_count, wrong_count FROM word_reviews WHERE word_id = 1').fetchone()
+        assert tuple(counts) == (1, 1)
+
+def test_review_session_batch_rejected(create_session, post_reviews):
+    """Test a batch for an unknown session or with no items is refused"""
+    assert post_reviews(99999, BATCH).status_code == 404
+    assert post_reviews(create_session(), []).status_code == 400
+
+def test_session_counters_kept_by_triggers(migrated_client, create_session, post_reviews):
+    """Test an open session serves its review counters and reviewed words"""
+    session_id = create_session()
+    post_reviews(session_id, BATCH[:3])
+
+    data = json.loads(migrated_client.get(f'/api/study-sessions/{session_id}').data)
+    assert data['session']['review_items_count'] == 3
+    assert data['session']['correct_count'] == 2
+    assert data['session']['status'] == 'open'
+    assert data['total'] == 2
+    assert {(w['id'], w['correct_count'], w['wrong_count']) for w in data['words']} == {(1, 1, 1), (2, 1, 0)}
+
+def test_close_session_persists_counters(migrated_app, migrated_client, create_session, post_reviews):
+    """Test closing a session stamps ended_at and keeps its counters"""
+    session_id = create_session()
+    post_reviews(session_id, BATCH[:3])
+
+    assert migrated_client.post(f'/api/study-sessions/{session_id}/close').status_code == 200
+    with migrated_app.db.pool.connection() as conn:
+        row = conn.execute('SELECT ended_at, review_count, correct_count FROM study_sessions WHERE id = ?',
+                           (session_id,)).fetchone()
+    assert row['ended_at'] is not None
+    assert (row['review_count'], row['correct_count']) == (3, 2)
+    data = json.loads(migrated_client.get('/api/study-sessions?sort_by=id').data)
+    session = next(s for s in data['items'] if s['id'] == session_id)
+    assert session['status'] == 'closed'
+    assert session['review_items_count'] == 3
+
+def test_close_session_once(migrated_client, create_session):
+    """Test closing a session reports whether it was still open"""
+    session_id = create_session()
+    assert json.loads(migrated_client.post(f'/api/study-sessions/{session_id}/close').data)['closed'] is True
+    assert json.loads(migrated_client.post(f'/api/study-sessions/{session_id}/close').data)['closed'] is False
+
+def test_sweeper_closes_idle_sessions(migrated_app, migrated_client, create_session):
+    """Test the sweeper closes sessions idle for too long, once"""
+    from lib.sessions import SessionSweeper
+
+    idle = create_session()
+    create_session()
+    with migrated_app.db.pool.connection() as conn:
+        # Pretend the session was started an hour ago
+        conn.execute("UPDATE study_sessions SET created_at = datetime('now', '-60 minutes') WHERE id = ?", (idle,))
+        conn.commit()
+
+    sweeper = SessionSweeper(migrated_app.db, idle_minutes=30)
+    assert sweeper.sweep() == 1
+    assert sweeper.sweep() == 0
+    data = json.loads(migrated_client.get('/api/study-sessions?sort_by=id').data)
+    session = next(s for s in data['items'] if s['id'] == idle)
+    assert session['status'] == 'closed'
+    assert session['end_time'] == session['start_time']
+
+def test_study_sessions_stats_by_activity(migrated_client, create_session, post_reviews):
+    """Test the stats totals and per-activity accuracy"""
+    post_reviews(create_session(), BATCH[:3])
+    create_session()
+
+    stats = json.loads(migrated_client.get('/api/study-sessions/stats').data)
+    assert stats['overall']['total_sessions'] == 2
+    assert stats['overall']['total_reviews'] == 3
+    assert stats['overall']['correct_reviews'] == 2
+    assert stats['overall']['unique_words'] == 2
+    activity = next(a for a in stats['by_activity'] if a['id'] == 1)
+    assert activity['words_reviewed'] == 2
+    assert activity['accuracy_rate'] == pytest.approx(66.67)
+
+@pytest.fixture
+def daily_buckets(migrated_app, create_session, post_reviews):
+    """A session today with two reviews and one on 2024-01-15 with one"""
+    recent, old = create_session(), create_session()
+    post_reviews(recent, [{'word_id': 1, 'correct': True}, {'word_id': 2, 'correct': False}])
+    post_reviews(old, [{'word_id': 3, 'correct': True}])
+    with migrated_app.db.pool.connection() as conn:
+        conn.execute("UPDATE study_sessions SET created_at = '2024-01-15 09:00:00' WHERE id = ?", (old,))
+        conn.commit()
+    return recent, old
+
+def test_study_sessions_stats_today(migrated_client, daily_buckets):
+    """Test ?range=today only counts today's bucket, under the session's current group"""
+    recent, _ = daily_buckets
+    # Moving a session to another group moves its counts with it
+    response = migrated_client.put(f'/api/study-sessions/{recent}', json={'group_id': 2, 'study_activity_id': 1})
+    assert response.status_code == 200
+
+    stats = json.loads(migrated_client.get('/api/study-sessions/stats').data)
+    assert stats['overall']['total_sessions'] == 2
+    assert stats['overall']['total_reviews'] == 3
+    assert stats['overall']['unique_words'] == 3
+    assert stats['overall']['unique_groups'] == 2
+
+    stats = json.loads(migrated_client.get('/api/study-sessions/stats?range=today').data)
+    assert stats['overall']['total_sessions'] == 1
+    assert stats['overall']['correct_reviews'] == 1
+    assert stats['overall']['unique_words'] == 2
+    assert [(g['id'], g['words_reviewed']) for g in stats['by_group']] == [(2, 2)]
+
+def test_study_sessions_stats_custom_range(migrated_client, daily_buckets):
+    """Test ?from=&to= only counts the buckets inside the range"""
+    stats = json.loads(migrated_client.get('/api/study-sessions/stats?from=2024-01-01&to=2024-01-31').data)
+    assert stats['time_range'] == 'custom'
+    assert (stats['from'], stats['to']) == ('2024-01-01', '2024-01-31')
+    assert stats['overall']['total_sessions'] == 1
+    assert stats['overall']['last_session_date'] == '2024-01-15 09:00:00'
+    assert [(g['id'], g['total_reviews']) for g in stats['by_group']] == [(1, 1)]
+
+    assert migrated_client.get('/api/study-sessions/stats?from=2024-13-01').status_code == 400
+
+def test_deleted_session_leaves_daily_bucket(migrated_app, daily_buckets):
+    """Test deleting a session takes its words out of its daily bucket"""
+    _, old = daily_buckets
+    with migrated_app.db.pool.connection() as conn:
+        conn.execute('DELETE FROM study_sessions WHERE id = ?', (old,))
+        conn.commit()
+        assert conn.execute("SELECT COUNT(*) FROM daily_words WHERE stat_date = '2024-01-15'").fetchone()[0] == 0
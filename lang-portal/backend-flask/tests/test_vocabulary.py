@@ -62,4 +62,60 @@ def cleanup(client):
         cursor.execute('DELETE FROM word_groups')
         cursor.execute('DELETE FROM words')
         cursor.execute('DELETE FROM groups')
-        g.db.commit()
\ No newline at end of file
+        g.db.commit()
+
+ANIMALS = [
+    {"kanji": "猫", "romaji": "neko", "english": "cat", "parts": [{"kanji": "猫", "romaji": ["neko"]}]},
+    {"kanji": "犬", "romaji": "inu", "english": "dog", "parts": [{"kanji": "犬", "romaji": ["inu"]}]},
+    {"kanji": "猫", "romaji": "neko", "english": "cat", "parts": [{"kanji": "猫", "romaji": ["neko"]}]}
+]
+
+def post_ndjson(client, category, body):
+    return client.post(f'/api/vocabulary?category={category}', data=body, content_type='application/x-ndjson')
+
+def test_post_vocabulary_set_based_import(migrated_client, count):
+    """Test importing dedupes repeated words within the batch"""
+    response = migrated_client.post('/api/vocabulary', json={"category": "Animals", "data": ANIMALS})
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['words_added'] == 2
+    assert data['count'] == 2
+    assert count('SELECT COUNT(*) FROM words WHERE kanji = ?', ('猫',)) == 1
+
+def test_post_vocabulary_links_existing_words(migrated_app, migrated_client, count):
+    """Test re-importing known words only adds the missing links and recomputes words_count"""
+    migrated_client.post('/api/vocabulary', json={"category": "Animals", "data": ANIMALS})
+    with migrated_app.db.pool.connection() as conn:
+        seeded = dict(conn.execute('SELECT kanji, romaji, english FROM words WHERE id = 1').fetchone())
+    lines = [json.dumps(item) for item in ANIMALS[:2]] + [json.dumps({**seeded, "parts": []})]
+    response = post_ndjson(migrated_client, 'Animals', '\n'.join(lines) + '\n')
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['words_added'] == 0
+    assert data['count'] == 1
+
+    assert count("SELECT COUNT(*) FROM groups WHERE name = 'Animals'") == 1
+    assert count("SELECT words_count FROM groups WHERE name = 'Animals'") == 3
+
+def test_post_vocabulary_ndjson_staged_in_chunks(migrated_client, monkeypatch):
+    """Test an NDJSON import larger than one staging chunk, with blank lines"""
+    import lib.importer
+    monkeypatch.setattr(lib.importer, 'STAGE_CHUNK', 2)
+    lines = [json.dumps({"kanji": f"字{i}", "romaji": f"ji{i}", "english": f"letter {i}"}) for i in range(5)]
+    response = post_ndjson(migrated_client, 'Chunked', '\n\n'.join(lines))
+    assert response.status_code == 200
+    assert json.loads(response.data)['words_added'] == 5
+
+def test_post_vocabulary_ndjson_invalid(migrated_client):
+    """Test NDJSON imports name the first bad line and refuse empty bodies"""
+    response = post_ndjson(migrated_client, 'Animals', '{"kanji": \n')
+    assert response.status_code == 400
+    assert json.loads(response.data)['error'] == 'Invalid JSON on line 1'
+
+    lines = [json.dumps(item) for item in ANIMALS[:2]] + [json.dumps({"kanji": "字", "romaji": "ji"})]
+    response = post_ndjson(migrated_client, 'Animals', '\n'.join(lines))
+    assert response.status_code == 400
+    assert json.loads(response.data)['error'] == 'Missing required vocabulary fields on line 3'
+
+    assert post_ndjson(migrated_client, 'Animals', '\n\n').status_code == 400
+    assert post_ndjson(migrated_client, '', lines[0]).status_code == 400
@@ -83,4 +83,134 @@ def cleanup(client):
         cursor = g.db.cursor()
         cursor.execute('DELETE FROM word_review_items')
         cursor.execute('DELETE FROM words')
-        g.db.commit()
\ No newline at end of file
+        g.db.commit()
+
+@pytest.fixture
+def study_session(create_session):
+    """Create a study session on the first seeded group and activity"""
+    return create_session()
+
+@pytest.fixture
+def reviewed(migrated_client, study_session):
+    """Word 1 answered right, right, wrong and word 2 wrong once"""
+    for word_id, correct in [(1, True), (1, True), (1, False), (2, False)]:
+        response = migrated_client.post(f'/api/study-sessions/{study_session}/review',
+                                        json={'word_id': word_id, 'correct': correct})
+        assert response.status_code == 200
+
+def test_word_reviews_rollup(migrated_client, reviewed):
+    """Test review counts are maintained in word_reviews and served by /api/words"""
+    response = migrated_client.get('/api/words?sort_by=correct_count&order=desc')
+    assert response.status_code == 200
+    top = json.loads(response.data)['words'][0]
+    assert top['id'] == 1
+    assert top['stats']['correct_count'] == 2
+    assert top['stats']['wrong_count'] == 1
+    assert top['groups'] == [{'id': 1, 'name': 'Core Verbs'}]
+
+    response = migrated_client.get('/api/words/2')
+    assert json.loads(response.data)['word']['wrong_count'] == 1
+
+def test_rebuild_word_reviews(migrated_app, reviewed):
+    """Test a lost rollup is detected and rebuilt from the review history"""
+    from lib.rollups import check_word_reviews, rebuild_word_reviews
+
+    with migrated_app.db.pool.connection() as conn:
+        assert check_word_reviews(conn) == []
+        conn.execute('DELETE FROM word_reviews')
+        conn.commit()
+        assert len(check_word_reviews(conn)) == 2
+        assert rebuild_word_reviews(conn) == 2
+        assert check_word_reviews(conn) == []
+
+@pytest.fixture
+def search(migrated_app, migrated_client):
+    """Add three drinks to the words and return a search helper"""
+    with migrated_app.db.writer() as cursor:
+        cursor.executemany('INSERT INTO words (kanji, romaji, english, parts) VALUES (?, ?, ?, ?)', [
+            ('コーヒー', 'koohii', 'coffee', '[]'),
+            ('紅茶', 'koucha', 'black tea', '[]'),
+            ('お茶', 'ocha', 'green tea, koocha style', '[]')
+        ])
+    migrated_app.cache.bump('words')
+
+    def search(query, **params):
+        response = migrated_client.get('/api/words/search', query_string=dict(params, q=query))
+        assert response.status_code == 200
+        return json.loads(response.data)
+    return search
+
+def test_search_words(search):
+    """Test prefix search matches every term and normalizes kana and width"""
+    assert [w['english'] for w in search('coff')['words']] == ['coffee']
+    # Kana and width are normalized on the query side
+    assert [w['romaji'] for w in search('こーひー')['words']] == ['koohii']
+    assert [w['romaji'] for w in search('ｺｰﾋｰ')['words']] == ['koohii']
+    # Every term has to match
+    assert [w['romaji'] for w in search('tea gre')['words']] == ['ocha']
+    # Operators in the input are plain text
+    assert search('tea OR coffee')['words'] == []
+
+def test_search_words_ranking(search):
+    """Test romaji matches outrank english ones"""
+    assert [w['romaji'] for w in search('kou')['words']] == ['koucha']
+    assert [w['romaji'] for w in search('koo')['words']][0] == 'koohii'
+
+def test_search_words_pagination(search):
+    """Test search pages follow the ranking and report has_more"""
+    matches = [w['id'] for w in search('tea', per_page=100)['words']]
+    pages = [search('tea', per_page=1, page=page) for page in range(1, len(matches) + 1)]
+    assert [p['words'][0]['id'] for p in pages] == matches
+    assert [p['pagination']['has_more'] for p in pages] == [True] * (len(matches) - 1) + [False]
+
+def test_search_words_follows_writes(migrated_app, migrated_client, search):
+    """Test words_fts is kept in sync with updates and deletes by triggers"""
+    with migrated_app.db.writer() as cursor:
+        cursor.execute("UPDATE words SET english = 'iced coffee' WHERE romaji = 'koucha'")
+        cursor.execute("DELETE FROM words WHERE romaji = 'koohii'")
+    migrated_app.cache.bump('words')
+    assert [w['romaji'] for w in search('coffee')['words']] == ['koucha']
+
+    assert migrated_client.get('/api/words/search').status_code == 400
+
+def test_orjson_provider(migrated_app):
+    """Test jsonify goes through orjson with the default provider's output"""
+    from datetime import datetime
+    from flask import jsonify
+    from flask.json.provider import DefaultJSONProvider
+    from lib.serialization import OrjsonProvider
+
+    assert isinstance(migrated_app.json, OrjsonProvider)
+    value = {'b': [1, 2.5, None, True], 'a': '猫', 'when': datetime(2024, 1, 15, 9, 0, 0)}
+    with migrated_app.app_context():
+        body = jsonify(value).get_data()
+        expected = DefaultJSONProvider(migrated_app).response(value).get_data()
+    # Same document; orjson writes non-ASCII text unescaped
+    assert json.loads(body) == json.loads(expected)
+    assert list(json.loads(body)) == ['a', 'b', 'when']
+    assert '猫' in body.decode()
+
+def test_row_mapper(migrated_app, migrated_client):
+    """Test rows are mapped by column position and the word page keeps its shape"""
+    from lib.serialization import row_mapper
+
+    with migrated_app.db.pool.connection() as conn:
+        row = conn.execute("SELECT 1 as id, 'x' as kanji, 2 as extra").fetchone()
+    assert row_mapper(row.keys(), {'word_id': 'id', 'kanji': 'kanji'})(row) == {'word_id': 1, 'kanji': 'x'}
+
+    data = json.loads(migrated_client.get('/api/words?words_per_page=5').data)
+    assert len(data['words']) == 5
+    assert set(data['words'][0]) == {'id', 'kanji', 'romaji', 'english', 'stats', 'groups'}
+    assert data['words'][0]['groups']
+
+def test_words_per_page_clamped(migrated_client, count):
+    """Test words_per_page is kept between 1 and 100"""
+    total = count('SELECT COUNT(*) FROM words')
+
+    data = json.loads(migrated_client.get('/api/words?words_per_page=100000').data)
+    assert data['pagination']['per_page'] == 100
+    assert len(data['words']) == min(total, 100)
+    for size in (0, -5):
+        data = json.loads(migrated_client.get(f'/api/words?words_per_page={size}').data)
+        assert data['pagination']['per_page'] == 1
+        assert len(data['words']) == 1
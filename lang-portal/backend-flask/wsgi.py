@@ -0,0 +1,11 @@
+"""Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+
+Every worker imports this module after the fork (preload_app is off), so
+each one gets its own connection pool, writer lane, session sweeper, job
+runner and in-process caches. The caches follow writes made by other
+workers through the table generations kept in SQLite (lib/cache.py).
+"""
+from app import create_app
+from config import ProductionConfig
+
+app = create_app(config_class=ProductionConfig)
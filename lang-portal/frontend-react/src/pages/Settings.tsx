@@ -6,11 +6,18 @@ export default function Settings() {
   const { theme, setTheme } = useTheme();
   const [showResetDialog, setShowResetDialog] = useState(false);
   const [resetConfirmation, setResetConfirmation] = useState("");
+  const [resetProgress, setResetProgress] = useState<string | null>(null);
 
   const handleReset = async () => {
     if (resetConfirmation.toLowerCase() === "reset me") {
       try {
-        await resetStudyHistory();
+        setResetProgress("Starting reset...");
+        // The reset runs as a background job; wait for it to finish
+        await resetStudyHistory((job) =>
+          setResetProgress(
+            job.total ? `Resetting... ${job.progress} / ${job.total}` : "Resetting..."
+          )
+        );
 
         // Reset was successful
         setShowResetDialog(false);
@@ -21,6 +28,8 @@ export default function Settings() {
       } catch (err) {
         console.error("Error resetting history:", err);
         alert("Failed to reset history. Please try again.");
+      } finally {
+        setResetProgress(null);
       }
     }
   };
@@ -70,15 +79,22 @@ export default function Settings() {
               onChange={(e) => setResetConfirmation(e.target.value)}
               className="border rounded px-2 py-1 mb-4 w-full text-gray-800 dark:text-white dark:bg-gray-700"
             />
+            {resetProgress && (
+              <p className="mb-4 text-gray-600 dark:text-gray-400">
+                {resetProgress}
+              </p>
+            )}
             <div className="flex justify-end space-x-2">
               <button
                 onClick={() => setShowResetDialog(false)}
+                disabled={resetProgress !== null}
                 className="bg-gray-300 hover:bg-gray-400 text-gray-800 font-bold py-2 px-4 rounded"
               >
                 Cancel
               </button>
               <button
                 onClick={handleReset}
+                disabled={resetProgress !== null}
                 className="bg-red-500 hover:bg-red-600 text-white font-bold py-2 px-4 rounded"
               >
                 Confirm Reset
@@ -298,13 +298,18 @@ export const submitStudySessionReview = async (
   reviews: WordReview[]
 ): Promise<void> => {
   const response = await fetch(
-    `${API_BASE_URL}/study-sessions/${sessionId}/review`,
+    `${API_BASE_URL}/study-sessions/${sessionId}/reviews`,
     {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
-      body: JSON.stringify({ reviews }),
+      body: JSON.stringify({
+        reviews: reviews.map((review) => ({
+          word_id: review.word_id,
+          correct: review.is_correct,
+        })),
+      }),
     }
   );
   if (!response.ok) {
@@ -397,17 +402,62 @@ export const fetchStudyStats = async (): Promise<StudyStats> => {
   return response.json();
 };
 
+// Background jobs API. Long-running writes (history reset, group delete)
+// answer 202 with a job; poll /api/jobs/:id until it has finished.
+export interface Job {
+  id: number;
+  kind: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  progress: number;
+  total: number | null;
+  result: Record<string, number> | null;
+  error: string | null;
+}
+
+export const fetchJob = async (id: number): Promise<Job> => {
+  const response = await fetch(`${API_BASE_URL}/jobs/${id}`);
+  if (!response.ok) {
+    throw new Error("Failed to fetch job");
+  }
+  const data = await response.json();
+  return data.job;
+};
+
+export const waitForJob = async (
+  id: number,
+  onProgress?: (job: Job) => void,
+  intervalMs: number = 500
+): Promise<Job> => {
+  for (;;) {
+    const job = await fetchJob(id);
+    onProgress?.(job);
+    if (job.status === "succeeded") {
+      return job;
+    }
+    if (job.status === "failed") {
+      throw new Error(job.error || `Job ${id} failed`);
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 // Study Activity API
-export const resetStudyHistory = async (): Promise<void> => {
+export const resetStudyHistory = async (
+  onProgress?: (job: Job) => void
+): Promise<Job> => {
   const response = await fetch(`${API_BASE_URL}/study-sessions/reset`, {
     method: "POST",
     headers: {
       "Content-Type": "application/json",
     },
   });
-  if (!response.ok) {
+  if (response.status !== 202) {
     throw new Error("Failed to reset history");
   }
+  // The reset runs as a background job; resolve once it has finished
+  const data = await response.json();
+  logDebug("Reset job accepted:", data.job);
+  return waitForJob(data.job.id, onProgress);
 };
 
 export const fetchStudyActivity = async (
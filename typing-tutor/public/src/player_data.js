@@ -1,8 +1,15 @@
+const REVIEW_BATCH_SIZE = 20
+const REVIEW_FLUSH_INTERVAL = 5000  // ms
+
 class PlayerData {
 	constructor() {
 		this.score = 0
 		this.correct_words = []
 		this.failed_words = []
+		this.pending_reviews = []
+		this.flush_timer = null
+		// Don't lose the tail of the buffer when the tab is closed
+		window.addEventListener('pagehide', () => this.flush_reviews(true))
 	}
 
 	add_correct_word(d_index) {
@@ -14,24 +21,44 @@ class PlayerData {
 		this.failed_words.push(d_index)
 	}
 
-	async send_review(wordId, correct) {
+	// Reviews are buffered and sent in batches to the bulk endpoint instead of
+	// one request per keystroke-level event
+	send_review(wordId, correct) {
+		this.pending_reviews.push({
+			word_id: wordId,
+			correct: correct,  // true for correct, false for wrong
+			answered_at: new Date().toISOString()
+		})
+		if (this.pending_reviews.length >= REVIEW_BATCH_SIZE) {
+			this.flush_reviews()
+		} else if (!this.flush_timer) {
+			this.flush_timer = setTimeout(() => this.flush_reviews(), REVIEW_FLUSH_INTERVAL)
+		}
+	}
+
+	async flush_reviews(keepalive = false) {
+		clearTimeout(this.flush_timer)
+		this.flush_timer = null
+		if (this.pending_reviews.length === 0) {
+			return
+		}
+		const reviews = this.pending_reviews
+		this.pending_reviews = []
 		try {
-			const apiUrl = `http://127.0.0.1:4999/study_sessions/${Data.study_session_id}/review`;
+			const apiUrl = `http://127.0.0.1:4999/api/study-sessions/${Data.study_session_id}/reviews`;
 			const response = await fetch(`${apiUrl}`, {
 				method: 'POST',
 				headers: {
 					'Content-Type': 'application/json'
 				},
-				body: JSON.stringify({
-					word_id: wordId,
-					correct: correct  // true for correct, false for wrong
-				})
+				body: JSON.stringify({ reviews: reviews }),
+				keepalive: keepalive
 			});
 	
 			const data = await response.json();  // Handle the response
-			console.log('Review submitted:', data);
+			console.log('Reviews submitted:', data);
 		} catch (error) {
-			console.error('Error sending review:', error);
+			console.error('Error sending reviews:', error);
 		}
 	}
-}
\ No newline at end of file
+}
@@ -15,6 +15,9 @@ from word import WordPracticeApp  # Add this import
 
 dotenv.load_dotenv()
 
+# Words fetched from the due queue per vocabulary load
+DUE_WORDS_LIMIT = 20
+
 def load_prompts():
     """Load prompts from YAML file"""
     with open('prompts.yaml', 'r', encoding='utf-8') as f:
@@ -46,7 +49,8 @@ class JapaneseWritingApp:
         try:
             # Get group_id from environment variable or use default
             group_id = group_id or "1"
-            url = f"http://localhost:4999/api/groups/{group_id}/words/raw"
+            # Only the words the scheduler has due next, not the whole group
+            url = f"http://localhost:4999/api/groups/{group_id}/due?limit={DUE_WORDS_LIMIT}"
             logger.debug(f"Fetching vocabulary from: {url}")
             
             response = requests.get(url)